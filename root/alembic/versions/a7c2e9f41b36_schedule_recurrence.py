@@ -0,0 +1,30 @@
+"""schedule: weekly recurrence with exception dates
+
+Revision ID: a7c2e9f41b36
+Revises: f3a9c1d7e5b2
+Create Date: 2026-10-19 21:12:47.530918
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c2e9f41b36"
+down_revision: Union[str, None] = "f3a9c1d7e5b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("schedule", sa.Column("repeat_until", sa.Date(), nullable=True))
+    op.add_column("schedule", sa.Column("exception_dates", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("schedule", "exception_dates")
+    op.drop_column("schedule", "repeat_until")
@@ -0,0 +1,45 @@
+"""calendar feeds: feed tokens and updated_at for schedule and events
+
+Revision ID: b5d8e2f7a913
+Revises: a7c2e9f41b36
+Create Date: 2026-10-19 23:04:18.216470
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5d8e2f7a913"
+down_revision: Union[str, None] = "a7c2e9f41b36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("users", sa.Column("calendar_token_hash", sa.String(), nullable=True))
+    op.create_index(
+        op.f("ix_users_calendar_token_hash"),
+        "users",
+        ["calendar_token_hash"],
+        unique=True,
+    )
+    op.add_column("schedule", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE schedule SET updated_at = CURRENT_TIMESTAMP")
+    op.create_index(
+        "ix_schedule_group_updated_at", "schedule", ["group_id", "updated_at"]
+    )
+    op.add_column("events", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE events SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("events", "updated_at")
+    op.drop_index("ix_schedule_group_updated_at", table_name="schedule")
+    op.drop_column("schedule", "updated_at")
+    op.drop_index(op.f("ix_users_calendar_token_hash"), table_name="users")
+    op.drop_column("users", "calendar_token_hash")
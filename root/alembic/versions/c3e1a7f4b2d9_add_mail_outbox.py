@@ -0,0 +1,65 @@
+"""add mail outbox
+
+Revision ID: c3e1a7f4b2d9
+Revises: 933372f5da9a
+Create Date: 2026-10-19 10:12:41.503118
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e1a7f4b2d9"
+down_revision: Union[str, None] = "933372f5da9a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "mail_outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("to_email", sa.String(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("body_text", sa.Text(), nullable=True),
+        sa.Column("body_html", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_mail_outbox_status"), "mail_outbox", ["status"], unique=False
+    )
+    op.create_index(
+        op.f("ix_mail_outbox_created_at"), "mail_outbox", ["created_at"], unique=False
+    )
+    op.create_index(
+        "ix_mail_outbox_status_next_attempt",
+        "mail_outbox",
+        ["status", "next_attempt_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_mail_outbox_dedupe",
+        "mail_outbox",
+        ["to_email", "kind", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_mail_outbox_dedupe", table_name="mail_outbox")
+    op.drop_index("ix_mail_outbox_status_next_attempt", table_name="mail_outbox")
+    op.drop_index(op.f("ix_mail_outbox_created_at"), table_name="mail_outbox")
+    op.drop_index(op.f("ix_mail_outbox_status"), table_name="mail_outbox")
+    op.drop_table("mail_outbox")
@@ -0,0 +1,111 @@
+"""move spotify presence out of users
+
+Revision ID: e8d4b6a2c1f7
+Revises: c3e1a7f4b2d9
+Create Date: 2026-10-19 14:02:17.204551
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e8d4b6a2c1f7"
+down_revision: Union[str, None] = "c3e1a7f4b2d9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_PRESENCE_COLUMNS = (
+    ("is_playing", "spotify_is_playing"),
+    ("checked_at", "spotify_last_checked_at"),
+    ("track_id", "spotify_last_track_id"),
+    ("track_name", "spotify_last_track_name"),
+    ("artist_name", "spotify_last_artist_name"),
+    ("album_name", "spotify_last_album_name"),
+    ("track_url", "spotify_last_track_url"),
+    ("album_image_url", "spotify_last_album_image_url"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "spotify_presence",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("is_playing", sa.Boolean(), nullable=False),
+        sa.Column("checked_at", sa.DateTime(), nullable=True),
+        sa.Column("track_id", sa.String(), nullable=True),
+        sa.Column("track_name", sa.String(), nullable=True),
+        sa.Column("artist_name", sa.String(), nullable=True),
+        sa.Column("album_name", sa.String(), nullable=True),
+        sa.Column("track_url", sa.String(), nullable=True),
+        sa.Column("album_image_url", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    new_cols = ", ".join(new for new, _ in _PRESENCE_COLUMNS)
+    old_cols = ", ".join(
+        f"COALESCE({old}, false)" if new == "is_playing" else old
+        for new, old in _PRESENCE_COLUMNS
+    )
+    op.execute(
+        f"INSERT INTO spotify_presence (user_id, {new_cols}) "
+        f"SELECT id, {old_cols} FROM users "
+        "WHERE spotify_last_checked_at IS NOT NULL "
+        "OR spotify_last_track_id IS NOT NULL"
+    )
+    op.drop_index(
+        op.f("ix_users_spotify_last_track_id"), table_name="users", if_exists=True
+    )
+    op.drop_index(
+        op.f("ix_users_spotify_last_checked_at"), table_name="users", if_exists=True
+    )
+    op.drop_index(
+        op.f("ix_users_spotify_is_playing"), table_name="users", if_exists=True
+    )
+    for _, old in _PRESENCE_COLUMNS:
+        op.drop_column("users", old)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column(
+            "spotify_is_playing",
+            sa.Boolean(),
+            nullable=True,
+            server_default=sa.false(),
+        ),
+    )
+    op.add_column(
+        "users", sa.Column("spotify_last_checked_at", sa.DateTime(), nullable=True)
+    )
+    for _, old in _PRESENCE_COLUMNS[2:]:
+        op.add_column("users", sa.Column(old, sa.String(), nullable=True))
+    op.execute(
+        "UPDATE users SET "
+        + ", ".join(f"{old} = spotify_presence.{new}" for new, old in _PRESENCE_COLUMNS)
+        + " FROM spotify_presence WHERE spotify_presence.user_id = users.id"
+    )
+    op.create_index(
+        op.f("ix_users_spotify_is_playing"),
+        "users",
+        ["spotify_is_playing"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_users_spotify_last_checked_at"),
+        "users",
+        ["spotify_last_checked_at"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_users_spotify_last_track_id"),
+        "users",
+        ["spotify_last_track_id"],
+        unique=False,
+    )
+    op.drop_table("spotify_presence")
@@ -0,0 +1,54 @@
+"""users directory: trigram search and keyset sort indexes
+
+Revision ID: f3a9c1d7e5b2
+Revises: e8d4b6a2c1f7
+Create Date: 2026-10-19 18:40:03.118204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a9c1d7e5b2"
+down_revision: Union[str, None] = "e8d4b6a2c1f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_users_full_name_sort",
+        "users",
+        [sa.text("COALESCE(full_name, '')"), "id"],
+    )
+    op.create_index("ix_users_role_sort", "users", ["role", "id"])
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # ILIKE '%x%' не использует btree; триграммный GIN-индекс — использует
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_users_full_name_trgm",
+        "users",
+        ["full_name"],
+        postgresql_using="gin",
+        postgresql_ops={"full_name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_users_email_trgm",
+        "users",
+        ["email"],
+        postgresql_using="gin",
+        postgresql_ops={"email": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_email_trgm", table_name="users", if_exists=True)
+    op.drop_index("ix_users_full_name_trgm", table_name="users", if_exists=True)
+    op.drop_index("ix_users_role_sort", table_name="users")
+    op.drop_index("ix_users_full_name_sort", table_name="users")
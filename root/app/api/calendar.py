@@ -0,0 +1,127 @@
+"""Tokenized iCalendar feeds for calendar apps.
+
+Calendar apps cannot send a bearer token, so each user gets a secret feed
+token (only its hash is stored). Issuing a new token revokes the old links.
+"""
+
+from __future__ import annotations
+
+import secrets
+from collections.abc import AsyncIterator
+from datetime import timezone
+from email.utils import format_datetime as http_date
+
+from app.api.deps import get_current_user
+from app.auth.security import hash_token
+from app.core.database import get_db, get_read_db
+from app.models import models
+from app.schemas import schemas
+from app.services import calendar_feed
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _feed_response(
+    request: Request,
+    version: calendar_feed.FeedVersion,
+    body: AsyncIterator[bytes],
+    filename: str,
+) -> Response:
+    headers = {"ETag": version.etag, "Cache-Control": "private, no-cache"}
+    if version.last_modified is not None:
+        headers["Last-Modified"] = http_date(
+            version.last_modified.replace(tzinfo=timezone.utc), usegmt=True
+        )
+    # Last-Modified только информативен: удаление строки не двигает max(updated_at),
+    # поэтому 304 отдаём лишь по ETag, где учтено и число строк.
+    if _matches(request, version.etag):
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    return StreamingResponse(
+        body, media_type="text/calendar; charset=utf-8", headers=headers
+    )
+
+
+async def _feed_owner(db: AsyncSession, token: str) -> models.User:
+    user = (
+        await db.execute(
+            select(models.User).where(
+                models.User.calendar_token_hash == hash_token(token),
+                models.User.is_active.is_not(False),
+            )
+        )
+    ).scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=404, detail="Календарь не найден")
+    return user
+
+
+@router.post("/token", response_model=schemas.CalendarFeedsOut)
+async def issue_calendar_token(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    """Create feed links for the current user, revoking the previous ones."""
+
+    token = secrets.token_urlsafe(32)
+    await db.execute(
+        update(models.User)
+        .where(models.User.id == user.id)
+        .values(calendar_token_hash=hash_token(token))
+    )
+    await db.commit()
+    group_url = None
+    if user.group_id is not None:
+        group_url = str(
+            request.url_for("group_calendar", token=token, group_id=user.group_id)
+        )
+    return schemas.CalendarFeedsOut(
+        group_url=group_url,
+        events_url=str(request.url_for("events_calendar", token=token)),
+    )
+
+
+@router.get("/{token}/groups/{group_id}.ics", name="group_calendar")
+async def group_calendar(
+    token: str,
+    group_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+):
+    await _feed_owner(db, token)
+    found = await calendar_feed.group_feed_version(db, group_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Группа не найдена")
+    name, version = found
+    return _feed_response(
+        request,
+        version,
+        calendar_feed.iter_group_feed(group_id, name),
+        f"group-{group_id}.ics",
+    )
+
+
+@router.get("/{token}/events.ics", name="events_calendar")
+async def events_calendar(
+    token: str,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+):
+    user = await _feed_owner(db, token)
+    version = await calendar_feed.user_feed_version(db, user.id)
+    return _feed_response(
+        request, version, calendar_feed.iter_user_feed(user.id), "events.ics"
+    )
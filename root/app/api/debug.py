@@ -0,0 +1,65 @@
+import asyncio
+import os
+import threading
+import time
+
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.profiler import StackSampler, get_request_profile
+from app.models.models import User
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+_profile_lock = asyncio.Lock()
+
+
+def _require_admin(user: User) -> None:
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+def _folded_response(collapsed: str, name: str) -> PlainTextResponse:
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="{name}.folded"'},
+    )
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    all_threads: bool = Query(False),
+    user: User = Depends(get_current_user),
+):
+    """Sample this worker's stacks for ``seconds`` and return folded stacks."""
+
+    _require_admin(user)
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="profiling is disabled")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="profile already running")
+    async with _profile_lock:
+        sampler = StackSampler(
+            interval=interval_ms / 1000,
+            thread_ids=None if all_threads else {threading.get_ident()},
+        )
+        sampler.start()
+        try:
+            await asyncio.sleep(min(seconds, settings.profiling_max_seconds))
+        finally:
+            await asyncio.to_thread(sampler.stop)
+    return _folded_response(
+        sampler.collapsed(), f"profile-{os.getpid()}-{int(time.time())}"
+    )
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def request_profile(profile_id: str, user: User = Depends(get_current_user)):
+    _require_admin(user)
+    collapsed = get_request_profile(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return _folded_response(collapsed, f"request-{profile_id}")
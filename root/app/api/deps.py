@@ -27,7 +27,25 @@ async def get_current_user(
         user_id = int(sub)
     except (TypeError, ValueError):
         raise credentials_exception
+    # Сессия подключается к БД только на первом запросе, поэтому отказ до этой
+    # строки не занимает соединение.
     user = await db.get(User, user_id)
     if not user or not user.is_active:
         raise credentials_exception
     return user
+
+
+async def get_current_user_released(
+    user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> User:
+    """``get_current_user`` that returns the connection to the pool right away.
+
+    For handlers that go on to wait without the database (storage, external
+    APIs, long streams). Everyone else keeps the connection: a commit here
+    would be an extra round trip, and their next query would have to check
+    out a connection again. ``expire_on_commit=False`` keeps ``user`` loaded.
+    """
+
+    await db.commit()
+    return user
@@ -0,0 +1,217 @@
+"""Admin report exports streamed as CSV or NDJSON.
+
+Rows are read through a server-side cursor in batches of
+``EXPORT_BATCH_SIZE`` and written to the response as they arrive, so memory
+stays flat and the first bytes go out before the query has finished. Only
+plain columns are selected: ORM entities would pile up in the session's
+identity map for the whole export.
+"""
+
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import io
+from collections.abc import AsyncIterator, Sequence
+from typing import Any, Literal, Optional
+
+from app.api.deps import get_current_user_released
+from app.core.config import settings
+from app.core.database import async_read_session
+from app.core.serialization import dumps
+from app.models import models
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, case, func, select
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+ExportFormat = Literal["csv", "ndjson"]
+
+_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _require_admin(user: models.User) -> None:
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+# Excel выполняет ячейку, начинающуюся с этих символов, как формулу;
+# пользовательские строки экранируем апострофом.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def encode_csv(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(v) for v in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+async def stream_rows(
+    stmt: Select, fmt: ExportFormat, *, batch_size: int | None = None
+) -> AsyncIterator[bytes]:
+    """Yield ``stmt`` results encoded as ``fmt``, one chunk per batch."""
+
+    batch_size = batch_size or settings.export_batch_size
+    columns = [c.name for c in stmt.selected_columns]
+    encode = encode_csv if fmt == "csv" else encode_ndjson
+    if fmt == "csv":
+        # BOM нужен Excel, чтобы кириллица открывалась без перекодировки
+        yield "\ufeff".encode("utf-8") + encode_csv(columns, [columns])
+    # Сессия живёт внутри генератора: соединение держится ровно столько,
+    # сколько идёт выгрузка, и не зависит от жизненного цикла зависимостей.
+    async with async_read_session() as session:
+        result = await session.stream(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield encode(columns, partition)
+
+
+def _export_response(stmt: Select, fmt: ExportFormat, name: str) -> StreamingResponse:
+    filename = f"{name}-{dt.date.today():%Y%m%d}.{fmt}"
+    return StreamingResponse(
+        stream_rows(stmt, fmt),
+        media_type=_MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+def users_export_query(
+    group_id: Optional[int] = None, role: Optional[str] = None
+) -> Select:
+    U = models.User
+    stmt = (
+        select(
+            U.id,
+            U.email,
+            U.full_name,
+            U.role,
+            U.group_id,
+            models.Group.name.label("group_name"),
+            U.is_active,
+            U.record_book_number,
+            U.institute,
+            U.course,
+            U.department,
+            U.position,
+        )
+        .outerjoin(models.Group, models.Group.id == U.group_id)
+        .order_by(U.id)
+    )
+    if group_id is not None:
+        stmt = stmt.where(U.group_id == group_id)
+    if role:
+        stmt = stmt.where(U.role == role)
+    return stmt
+
+
+def attendance_export_query(event_id: int) -> Select:
+    EA, U = models.EventAttendance, models.User
+    return (
+        select(
+            EA.id.label("attendance_id"),
+            EA.event_id,
+            EA.registered_at,
+            U.id.label("user_id"),
+            U.email,
+            U.full_name,
+            U.role,
+            models.Group.name.label("group_name"),
+        )
+        .join(U, U.id == EA.user_id)
+        .outerjoin(models.Group, models.Group.id == U.group_id)
+        .where(EA.event_id == event_id)
+        .order_by(EA.id)
+    )
+
+
+def notification_stats_query(
+    since: Optional[dt.datetime] = None, type: Optional[str] = None
+) -> Select:
+    N, D = models.Notification, models.NotificationDelivery
+    stmt = (
+        select(
+            N.id,
+            N.user_id,
+            N.type,
+            N.title,
+            N.created_at,
+            N.read,
+            N.read_at,
+            func.count(D.id).label("deliveries"),
+            func.sum(case((D.status == "delivered", 1), else_=0)).label("delivered"),
+            func.sum(case((D.status == "failed", 1), else_=0)).label("failed"),
+            func.max(D.delivered_at).label("last_delivered_at"),
+        )
+        .outerjoin(D, D.notification_id == N.id)
+        .group_by(N.id)
+        .order_by(N.id)
+    )
+    if since is not None:
+        stmt = stmt.where(N.created_at >= since)
+    if type:
+        stmt = stmt.where(N.type == type)
+    return stmt
+
+
+@router.get("/users")
+async def export_users(
+    format: ExportFormat = Query("csv"),
+    group_id: Optional[int] = Query(None),
+    role: Optional[str] = Query(None),
+    user: models.User = Depends(get_current_user_released),
+):
+    _require_admin(user)
+    return _export_response(users_export_query(group_id, role), format, "users")
+
+
+@router.get("/events/{event_id}/attendance")
+async def export_event_attendance(
+    event_id: int,
+    format: ExportFormat = Query("csv"),
+    user: models.User = Depends(get_current_user_released),
+):
+    if user.role not in ("admin", "teacher"):
+        raise HTTPException(status_code=403, detail="forbidden")
+    async with async_read_session() as session:
+        event = await session.get(models.Event, event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Событие не найдено")
+    if user.role != "admin" and event.created_by != user.id:
+        raise HTTPException(status_code=403, detail="forbidden")
+    return _export_response(
+        attendance_export_query(event_id), format, f"event-{event_id}-attendance"
+    )
+
+
+@router.get("/notifications")
+async def export_notification_stats(
+    format: ExportFormat = Query("csv"),
+    since: Optional[dt.datetime] = Query(None),
+    type: Optional[str] = Query(None),
+    user: models.User = Depends(get_current_user_released),
+):
+    _require_admin(user)
+    return _export_response(
+        notification_stats_query(since, type), format, "notifications"
+    )
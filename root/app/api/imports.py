@@ -0,0 +1,78 @@
+from datetime import date
+from typing import Optional
+
+from app.api.deps import get_current_user
+from app.core.database import get_db
+from app.models import models
+from app.schemas import schemas
+from app.services import schedule_import, user_import
+from app.utils.tabular import iter_table_rows
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter(tags=["imports"])
+
+
+def _require_admin(user: models.User) -> None:
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+@router.post("/users/import", response_model=schemas.UserImportResult)
+async def import_users(
+    file: UploadFile = File(...),
+    update_existing: bool = Form(False),
+    dry_run: bool = Form(False),
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    """Create (or update) users from a CSV/XLSX table.
+
+    Rows without a ``password`` column value receive an activation email.
+    """
+
+    _require_admin(user)
+    try:
+        rows = iter_table_rows(
+            file.filename or "", file.file, user_import.COLUMN_ALIASES
+        )
+        return await user_import.import_users(
+            db, rows, update_existing=update_existing, dry_run=dry_run
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/schedule/import", response_model=schemas.ScheduleImportResult)
+async def import_schedule(
+    file: UploadFile = File(...),
+    group_id: Optional[int] = Form(None),
+    date_from: Optional[date] = Form(None),
+    date_to: Optional[date] = Form(None),
+    dry_run: bool = Form(False),
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    """Replace group timetables with a JSON, CSV/XLSX or iCalendar upload.
+
+    ``group_id`` applies to rows without a group (an ``.ics`` file of one
+    group); ``date_from``/``date_to`` limit the replacement to a semester.
+    """
+
+    _require_admin(user)
+    try:
+        rows = schedule_import.read_schedule_rows(file.filename or "", file.file)
+        return await schedule_import.import_schedule(
+            db,
+            rows,
+            default_group_id=group_id,
+            date_from=date_from,
+            date_to=date_to,
+            dry_run=dry_run,
+        )
+    except schedule_import.ScheduleImportError as exc:
+        raise HTTPException(
+            status_code=422, detail=[e.model_dump() for e in exc.errors]
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
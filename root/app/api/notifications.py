@@ -2,11 +2,14 @@ from datetime import datetime, timedelta
 from typing import Optional, Tuple
 
 from app.api.deps import get_current_user
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.serialization import project_all, trusted_json_response
+from app.crud import statements
 from app.models.models import Notification, Schedule, User
 from app.schemas.schemas import NotificationOut, NotificationsListOut
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import and_, desc, func, or_, select, update
+from sqlalchemy import and_, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
@@ -33,33 +36,22 @@ async def list_notifications(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    where = [Notification.user_id == user.id]
+    params = {"user_id": user.id, "limit": limit + 1}
+    q_items = statements.NOTIFICATIONS_FIRST_PAGE
     if cursor:
         parsed = _decode_cursor(cursor)
         if not parsed:
             raise HTTPException(status_code=400, detail="bad cursor")
-        c_dt, c_id = parsed
-        where.append(
-            or_(
-                Notification.created_at < c_dt,
-                and_(Notification.created_at == c_dt, Notification.id < c_id),
-            )
-        )
+        params["cursor_at"], params["cursor_id"] = parsed
+        q_items = statements.NOTIFICATIONS_AFTER_CURSOR
 
-    q_items = (
-        select(Notification)
-        .where(and_(*where))
-        .order_by(desc(Notification.created_at), desc(Notification.id))
-        .limit(limit + 1)
-    )
-    rows = (await db.execute(q_items)).scalars().all()
+    rows = (await db.execute(q_items, params)).scalars().all()
     items = rows[:limit]
     has_more = len(rows) > limit
 
-    q_unread = select(func.count(Notification.id)).where(
-        and_(Notification.user_id == user.id, Notification.read.is_(False))
-    )
-    unread = (await db.execute(q_unread)).scalar_one() or 0
+    unread = (
+        await db.execute(statements.UNREAD_NOTIFICATIONS_COUNT, {"user_id": user.id})
+    ).scalar_one() or 0
 
     next_cursor = (
         _encode_cursor(items[-1].created_at, items[-1].id)
@@ -67,6 +59,14 @@ async def list_notifications(
         else None
     )
 
+    if settings.fast_json_enabled:
+        return trusted_json_response(
+            {
+                "items": project_all(NotificationOut, items),
+                "unread_count": int(unread),
+                "has_more": has_more,
+            }
+        )
     return NotificationsListOut(
         items=[NotificationOut.from_orm(n) for n in items],
         unread_count=int(unread),
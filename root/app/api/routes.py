@@ -1,99 +1,71 @@
-import base64
-import hashlib
 import mimetypes
+import re
 import secrets
-import smtplib
-import ssl
-import uuid
-from datetime import datetime, timedelta, timezone
-from email.message import EmailMessage
-from pathlib import Path
-from typing import List, Optional
-from urllib.parse import urlencode
-
-import httpx
+from dataclasses import asdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Literal, Optional
+from zoneinfo import ZoneInfo
+
 from app import crud
-from app.api.deps import get_current_user
-from app.auth.security import decode_token
+from app.api.deps import get_current_user, get_current_user_released
+from app.auth.security import hash_token
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.serialization import project_all, trusted_json_response
+from app.crud.statements import USER_BY_EMAIL
 from app.models import models
 from app.schemas import schemas
-from fastapi import (
-    APIRouter,
-    BackgroundTasks,
-    Depends,
-    File,
-    HTTPException,
-    Query,
-    Request,
-    UploadFile,
-    status,
-)
+from app.services.mail import enqueue_mail, recently_enqueued, wake_mail_sender
+from app.services.schedule import WEEKDAYS, wall_clock, week_parity
+from app.services.storage import PresignNotSupported, get_storage
+from app.utils.email import build_reset_email
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.responses import RedirectResponse
 
 router = APIRouter()
 
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
 MAX_IMAGE_SIZE = 5 * 1024 * 1024
+MAX_EVENT_FILE_SIZE = 50 * 1024 * 1024
+# Материалы мероприятий: документы, презентации, таблицы, архивы и картинки.
+# text/html и прочее, что браузер исполнит при открытии, сюда не входит.
+ALLOWED_EVENT_FILE_TYPES = ALLOWED_IMAGE_TYPES | {
+    "application/pdf",
+    "application/msword",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.ms-powerpoint",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.oasis.opendocument.text",
+    "application/vnd.oasis.opendocument.presentation",
+    "application/vnd.oasis.opendocument.spreadsheet",
+    "application/zip",
+    "text/plain",
+    "text/csv",
+}
+_FILE_EXT = re.compile(r"[a-z0-9]{1,10}")
+MAX_SCHEDULE_RANGE_DAYS = 366
+
+
+def _image_ext(file: UploadFile) -> str:
+    return (
+        mimetypes.guess_extension(file.content_type)
+        or f".{file.filename.split('.')[-1].lower()}"
+    )
 
 
-def _hash_token(token: str) -> str:
-    return hashlib.sha256(token.encode()).hexdigest()
-
-
-def _send_reset_email(to_email: str, link: str, full_name: str = "") -> None:
-    host = settings.smtp_host or ""
-    port = int(settings.smtp_port or 0)
-    user = settings.smtp_user or ""
-    password = settings.smtp_password or ""
-    mail_from = settings.mail_from or "no-reply@example.com"
-    security = (
-        settings.smtp_security or ("starttls" if settings.smtp_starttls else "none")
-    ).lower()
-    name = f", {full_name}" if full_name else ""
-    html = f"""
-    <div style="font-family:Inter,Arial,sans-serif">
-      <h2>Сброс пароля</h2>
-      <p>Здравствуйте{name}!</p>
-      <p>Вы запросили сброс пароля в Экосистеме ГУУ. Ссылка действует 45 минут.</p>
-      <p><a href="{link}" style="display:inline-block;padding:10px 16px;background:#1d5fff;color:#fff;border-radius:8px;text-decoration:none">Сбросить пароль</a></p>
-      <p>Если вы не запрашивали сброс, проигнорируйте это письмо.</p>
-    </div>
-    """
-    msg = EmailMessage()
-    msg["Subject"] = "Сброс пароля — Экосистема ГУУ"
-    msg["From"] = mail_from
-    msg["To"] = to_email
-    msg.set_content(f"Ссылка для сброса пароля: {link}\nОна действует 45 минут.")
-    msg.add_alternative(html, subtype="html")
-    try:
-        if not host or not port:
-            print(f"[EMAIL_FALLBACK] {to_email} <- {link}")
-            return
-        ctx = ssl.create_default_context()
-        if security == "ssl":
-            with smtplib.SMTP_SSL(host, port, context=ctx, timeout=10) as s:
-                if user:
-                    s.login(user, password)
-                s.send_message(msg)
-        elif security == "starttls":
-            with smtplib.SMTP(host, port, timeout=10) as s:
-                s.ehlo()
-                s.starttls(context=ctx)
-                s.ehlo()
-                if user:
-                    s.login(user, password)
-                s.send_message(msg)
-        else:
-            with smtplib.SMTP(host, port, timeout=10) as s:
-                if user:
-                    s.login(user, password)
-                s.send_message(msg)
-    except Exception as e:
-        print(f"[EMAIL_ERROR] {e}. Link for {to_email}: {link}")
+def _file_ext(filename: str | None) -> str:
+    """Extension of a client-supplied file name, ``.bin`` unless it is plain."""
+
+    _, dot, ext = (filename or "").rpartition(".")
+    ext = ext.lower() if dot else ""
+    return f".{ext}" if _FILE_EXT.fullmatch(ext) else ".bin"
+
+
+def _upload_key(subdir: str, prefix: str, ext: str) -> str:
+    return f"{subdir}/{prefix}_{secrets.token_hex(8)}{ext}"
 
 
 async def save_upload(file: UploadFile, subdir: str, prefix: str) -> str:
@@ -102,42 +74,44 @@ async def save_upload(file: UploadFile, subdir: str, prefix: str) -> str:
     data = await file.read(MAX_IMAGE_SIZE + 1)
     if len(data) > MAX_IMAGE_SIZE:
         raise HTTPException(status_code=413, detail="file too large")
-    ext = (
-        mimetypes.guess_extension(file.content_type)
-        or f".{file.filename.split('.')[-1].lower()}"
-    )
-    name = f"{prefix}_{secrets.token_hex(8)}{ext}"
-    base_dir = settings.static_dir_path
-    folder = base_dir / subdir
-    folder.mkdir(parents=True, exist_ok=True)
-    path = folder / name
-    path.write_bytes(data)
-    return f"/static/{subdir}/{name}"
+    key = _upload_key(subdir, prefix, _image_ext(file))
+    return await get_storage().save(key, data, file.content_type)
 
 
 @router.post("/password/forgot")
 async def forgot_password(
     payload: schemas.ForgotPasswordIn,
-    bg: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(models.User).where(models.User.email == payload.email)
-    )
+    result = await db.execute(USER_BY_EMAIL, {"email": payload.email})
     user = result.scalar_one_or_none()
-    if user:
+    if user and not await recently_enqueued(
+        db,
+        to_email=user.email,
+        kind="password_reset",
+        window_seconds=settings.mail_dedupe_window_seconds,
+    ):
         token = secrets.token_urlsafe(32)
-        token_hash = _hash_token(token)
+        token_hash = hash_token(token)
         expires = datetime.now(timezone.utc) + timedelta(minutes=45)
         db.add(
             models.PasswordResetToken(
                 user_id=user.id, token_hash=token_hash, expires_at=expires, used=False
             )
         )
-        await db.commit()
         base = settings.app_base_url_clean
         reset_link = f"{base}/reset-password?token={token}"
-        bg.add_task(_send_reset_email, user.email, reset_link, user.full_name or "")
+        subject, text, html = build_reset_email(reset_link, user.full_name or "")
+        await enqueue_mail(
+            db,
+            to_email=user.email,
+            subject=subject,
+            text=text,
+            html=html,
+            kind="password_reset",
+        )
+        await db.commit()
+        wake_mail_sender()
     return {"ok": True}
 
 
@@ -145,7 +119,7 @@ async def forgot_password(
 async def reset_password(
     payload: schemas.ResetPasswordIn, db: AsyncSession = Depends(get_db)
 ):
-    token_hash = _hash_token(payload.token)
+    token_hash = hash_token(payload.token)
     result = await db.execute(
         select(models.PasswordResetToken).where(
             models.PasswordResetToken.token_hash == token_hash,
@@ -202,7 +176,7 @@ async def update_me(
 async def upload_avatar(
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: models.User = Depends(get_current_user_released),
 ):
     url = await save_upload(file, "avatars", f"user_{user.id}_avatar")
     db_user = await db.get(models.User, user.id)
@@ -216,7 +190,7 @@ async def upload_avatar(
 async def upload_cover(
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: models.User = Depends(get_current_user_released),
 ):
     url = await save_upload(file, "covers", f"user_{user.id}_cover")
     db_user = await db.get(models.User, user.id)
@@ -226,6 +200,117 @@ async def upload_cover(
     return db_user
 
 
+def _presign_key(
+    data: schemas.UploadPresignIn, user: models.User, event: models.Event | None
+) -> str:
+    if data.kind == "event_file":
+        if data.content_type not in ALLOWED_EVENT_FILE_TYPES:
+            raise HTTPException(status_code=415, detail="unsupported media type")
+        if data.size > MAX_EVENT_FILE_SIZE:
+            raise HTTPException(status_code=413, detail="file too large")
+        return _upload_key("event_files", f"event_{event.id}", _file_ext(data.filename))
+    if data.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=415, detail="unsupported media type")
+    if data.size > MAX_IMAGE_SIZE:
+        raise HTTPException(status_code=413, detail="file too large")
+    ext = mimetypes.guess_extension(data.content_type) or ""
+    if data.kind == "avatar":
+        return _upload_key("avatars", f"user_{user.id}_avatar", ext)
+    if data.kind == "cover":
+        return _upload_key("covers", f"user_{user.id}_cover", ext)
+    if data.kind == "event_image":
+        if user.role not in ("admin", "teacher"):
+            raise HTTPException(status_code=403, detail="forbidden")
+        return _upload_key("event_images", "event", ext)
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="forbidden")
+    return _upload_key("news_images", "news", ext)
+
+
+@router.post("/uploads/presign", response_model=schemas.UploadPresignOut)
+async def presign_upload(
+    data: schemas.UploadPresignIn,
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    event = None
+    if data.kind == "event_file":
+        event = await db.get(models.Event, data.event_id) if data.event_id else None
+        if not event:
+            raise HTTPException(status_code=404, detail="Событие не найдено")
+        if user.role not in ("admin", "teacher") and event.created_by != user.id:
+            raise HTTPException(status_code=403, detail="forbidden")
+    key = _presign_key(data, user, event)
+    try:
+        presigned = get_storage().presign_upload(key, data.content_type, data.size)
+    except PresignNotSupported:
+        raise HTTPException(
+            status_code=501, detail="Прямая загрузка недоступна для этого хранилища"
+        )
+    return schemas.UploadPresignOut(**asdict(presigned))
+
+
+async def _committed_url(
+    key: str,
+    expected_prefix: str,
+    *,
+    max_size: int,
+    allowed_types: set[str] = ALLOWED_IMAGE_TYPES,
+) -> str:
+    """Public URL of an uploaded object after checking what actually landed.
+
+    The presigned PUT pins size and type, but the key could still point at
+    nothing or at an object uploaded some other way.
+    """
+
+    name = key.strip().lstrip("/")
+    if not name.startswith(expected_prefix) or ".." in name:
+        raise HTTPException(status_code=400, detail="invalid upload key")
+    storage = get_storage()
+    stored = await storage.head(name)
+    if stored is None:
+        raise HTTPException(status_code=400, detail="upload not found")
+    if stored.content_type not in allowed_types:
+        await storage.delete(name)
+        raise HTTPException(status_code=415, detail="unsupported media type")
+    if stored.size > max_size:
+        await storage.delete(name)
+        raise HTTPException(status_code=413, detail="file too large")
+    return storage.public_url(name)
+
+
+@router.post("/users/me/avatar/commit", response_model=schemas.UserOut)
+async def commit_avatar(
+    data: schemas.UploadCommitIn,
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user_released),
+):
+    url = await _committed_url(
+        data.key, f"avatars/user_{user.id}_avatar_", max_size=MAX_IMAGE_SIZE
+    )
+    db_user = await db.get(models.User, user.id)
+    db_user.avatar_url = url
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+@router.post("/users/me/cover/commit", response_model=schemas.UserOut)
+async def commit_cover(
+    data: schemas.UploadCommitIn,
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user_released),
+):
+    url = await _committed_url(
+        data.key, f"covers/user_{user.id}_cover_", max_size=MAX_IMAGE_SIZE
+    )
+    db_user = await db.get(models.User, user.id)
+    db_user.cover_url = url
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
 @router.post("/users", response_model=schemas.UserOut)
 async def create_user(data: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     code_obj = None
@@ -247,17 +332,50 @@ async def create_user(data: schemas.UserCreate, db: AsyncSession = Depends(get_d
     return user
 
 
-@router.get("/users", response_model=List[schemas.UserOut])
+@router.get("/users", response_model=schemas.UsersPageOut)
 async def get_users(
     db: AsyncSession = Depends(get_db),
     full_name: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
     group_id: Optional[int] = Query(None),
     role: Optional[str] = Query(None),
+    sort: Literal["full_name", "email", "role", "id"] = Query("full_name"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
     user: models.User = Depends(get_current_user),
 ):
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="forbidden")
-    return await crud.get_users(db, full_name=full_name, group_id=group_id, role=role)
+    position = None
+    if cursor:
+        position = crud.decode_users_cursor(cursor, sort)
+        if position is None:
+            raise HTTPException(status_code=400, detail="bad cursor")
+    filters = {
+        "full_name": full_name,
+        "search": search,
+        "group_id": group_id,
+        "role": role,
+    }
+    users, next_cursor = await crud.get_users(
+        db,
+        **filters,
+        sort=sort,
+        descending=order == "desc",
+        limit=limit,
+        cursor=position,
+    )
+    total = await crud.count_users(db, **filters)
+    if settings.fast_json_enabled:
+        return trusted_json_response(
+            {
+                "items": project_all(schemas.UserOut, users),
+                "next_cursor": next_cursor,
+                "total": total,
+            }
+        )
+    return {"items": users, "next_cursor": next_cursor, "total": total}
 
 
 @router.patch("/users/{user_id}", response_model=schemas.UserOut)
@@ -277,15 +395,13 @@ async def delete_avatar(
     db: AsyncSession = Depends(get_db), user: models.User = Depends(get_current_user)
 ):
     db_user = await db.get(models.User, user.id)
-    if db_user.avatar_url:
-        base_dir = settings.static_dir_path
-        rel_path = db_user.avatar_url.replace("/static/", "", 1).lstrip("/")
-        avatar_path = base_dir / Path(rel_path)
-        if avatar_path.exists():
-            try:
-                avatar_path.unlink()
-            except Exception:
-                pass
+    storage = get_storage()
+    key = storage.key_from_url(db_user.avatar_url)
+    if key:
+        try:
+            await storage.delete(key)
+        except Exception:
+            pass
     db_user.avatar_url = None
     await db.commit()
     await db.refresh(db_user)
@@ -304,7 +420,7 @@ async def create_group(
 
 
 @router.get("/groups", response_model=List[schemas.GroupOut])
-async def get_groups(db: AsyncSession = Depends(get_db)):
+async def get_groups(db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(models.Group))
     return result.scalars().all()
 
@@ -321,8 +437,62 @@ async def add_schedule(
 
 
 @router.get("/schedule/{group_id}", response_model=List[schemas.ScheduleOut])
-async def get_schedule(group_id: int, db: AsyncSession = Depends(get_db)):
-    return await crud.get_schedule_by_group(db, group_id)
+async def get_schedule(
+    group_id: int,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Stored lessons of the group.
+
+    With ``from``/``to`` (both inclusive) returns every occurrence in that
+    range instead, with weekly recurrences expanded.
+    """
+
+    if date_from is None and date_to is None:
+        lessons = await crud.get_schedule_by_group(db, group_id)
+    else:
+        if date_from is None or date_to is None or date_to < date_from:
+            raise HTTPException(status_code=400, detail="Укажите корректные from и to")
+        if (date_to - date_from).days > MAX_SCHEDULE_RANGE_DAYS:
+            raise HTTPException(status_code=400, detail="Слишком большой диапазон дат")
+        lessons = await crud.get_schedule_occurrences(
+            db,
+            group_id,
+            datetime.combine(date_from, time()),
+            datetime.combine(date_to + timedelta(days=1), time()),
+        )
+    if settings.fast_json_enabled:
+        return trusted_json_response(lessons)
+    return lessons
+
+
+@router.get("/schedule/{group_id}/week", response_model=schemas.ScheduleWeekOut)
+async def get_schedule_week(
+    group_id: int,
+    day: Optional[date] = Query(None, alias="date"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Lessons of the week containing ``date`` (today by default).
+
+    The week's parity decides which odd/even lessons are included.
+    """
+
+    if day is None:
+        day = datetime.now(ZoneInfo(settings.schedule_timezone)).date()
+    week_start = day - timedelta(days=day.weekday())
+    start = datetime.combine(week_start, time())
+    week = {
+        "week_start": week_start,
+        "week_end": week_start + timedelta(days=6),
+        "parity": week_parity(week_start),
+        "lessons": await crud.get_schedule_occurrences(
+            db, group_id, start, start + timedelta(days=7)
+        ),
+    }
+    if settings.fast_json_enabled:
+        return trusted_json_response(week)
+    return week
 
 
 @router.patch("/schedule/{schedule_id}", response_model=schemas.ScheduleOut)
@@ -337,10 +507,17 @@ async def update_schedule(
     sched = await db.get(models.Schedule, schedule_id)
     if not sched:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    for field, value in data.model_dump(exclude_unset=True).items():
+    old_group_id = sched.group_id
+    values = data.model_dump(exclude_unset=True)
+    for field in ("start_time", "end_time"):
+        if values.get(field) is not None:
+            values[field] = wall_clock(values[field])
+    for field, value in values.items():
         setattr(sched, field, value)
+    sched.weekday = WEEKDAYS[sched.start_time.weekday()]
     await db.commit()
     await db.refresh(sched)
+    crud.invalidate_schedule(old_group_id, sched.group_id)
     return sched
 
 
@@ -355,185 +532,13 @@ async def delete_schedule(
     sched = await db.get(models.Schedule, schedule_id)
     if not sched:
         raise HTTPException(status_code=404, detail="Schedule not found")
+    group_id = sched.group_id
     await db.delete(sched)
     await db.commit()
+    crud.invalidate_schedule(group_id)
     return {"ok": True}
 
 
-def _spotify_auth_header() -> str:
-    raw = f"{settings.spotify_client_id}:{settings.spotify_client_secret}".encode()
-    return "Basic " + base64.b64encode(raw).decode()
-
-
-async def _spotify_refresh_if_needed(db: AsyncSession, user: models.User) -> None:
-    if not getattr(user, "spotify_access_token", None) or not getattr(
-        user, "spotify_refresh_token", None
-    ):
-        raise HTTPException(status_code=400, detail="Spotify не подключён")
-    now = datetime.now(timezone.utc)
-    if getattr(
-        user, "spotify_token_expires_at", None
-    ) and user.spotify_token_expires_at > now + timedelta(seconds=30):
-        return
-    async with httpx.AsyncClient(timeout=10) as client:
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": user.spotify_refresh_token,
-        }
-        headers = {
-            "Authorization": _spotify_auth_header(),
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
-        r = await client.post(
-            "https://accounts.spotify.com/api/token", data=data, headers=headers
-        )
-        if r.status_code != 200:
-            raise HTTPException(
-                status_code=400, detail="Не удалось обновить токен Spotify"
-            )
-        j = r.json()
-        user.spotify_access_token = j.get("access_token") or user.spotify_access_token
-        expires_in = j.get("expires_in") or 3600
-        user.spotify_token_expires_at = now + timedelta(seconds=int(expires_in))
-        await db.commit()
-        await db.refresh(user)
-
-
-@router.get("/spotify/auth-url", response_model=schemas.SpotifyAuthURL)
-async def spotify_auth_url(req: Request, user: models.User = Depends(get_current_user)):
-    if not settings.spotify_client_id or not settings.spotify_redirect_uri:
-        raise HTTPException(status_code=500, detail="Spotify не сконфигурирован")
-    state = req.headers.get("authorization", "").removeprefix("Bearer ").strip()
-    scope = (
-        settings.spotify_scopes
-        or "user-read-currently-playing user-read-playback-state"
-    )
-    params = {
-        "response_type": "code",
-        "client_id": settings.spotify_client_id,
-        "redirect_uri": settings.spotify_redirect_uri,
-        "scope": scope,
-        "state": state or secrets.token_urlsafe(16),
-        "show_dialog": "false",
-    }
-    return {"url": "https://accounts.spotify.com/authorize?" + urlencode(params)}
-
-
-@router.get("/spotify/callback")
-async def spotify_callback(
-    request: Request,
-    code: Optional[str] = None,
-    state: Optional[str] = None,
-    error: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
-):
-    if error or not code:
-        url = settings.app_base_url_clean + "/profile?spotify=error"
-        return RedirectResponse(url)
-    uid = None
-    if state:
-        try:
-            payload = decode_token(state)
-            uid = int(payload.get("sub")) if payload and payload.get("sub") else None
-        except Exception:
-            uid = None
-    if not uid:
-        url = settings.app_base_url_clean + "/profile?spotify=error"
-        return RedirectResponse(url)
-    user = await db.get(models.User, uid)
-    if not user or not user.is_active:
-        url = settings.app_base_url_clean + "/profile?spotify=error"
-        return RedirectResponse(url)
-    async with httpx.AsyncClient(timeout=10) as client:
-        data = {
-            "grant_type": "authorization_code",
-            "code": code,
-            "redirect_uri": settings.spotify_redirect_uri,
-        }
-        headers = {
-            "Authorization": _spotify_auth_header(),
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
-        r = await client.post(
-            "https://accounts.spotify.com/api/token", data=data, headers=headers
-        )
-    if r.status_code != 200:
-        url = settings.app_base_url_clean + "/profile?spotify=error"
-        return RedirectResponse(url)
-    j = r.json()
-    now = datetime.now(timezone.utc)
-    user.spotify_access_token = j.get("access_token")
-    user.spotify_refresh_token = j.get("refresh_token") or user.spotify_refresh_token
-    user.spotify_token_expires_at = now + timedelta(
-        seconds=int(j.get("expires_in") or 3600)
-    )
-    user.spotify_scope = j.get("scope") or settings.spotify_scopes
-    if hasattr(user, "spotify_connected"):
-        setattr(user, "spotify_connected", True)
-    if hasattr(user, "spotify_is_connected"):
-        setattr(user, "spotify_is_connected", True)
-    await db.commit()
-    url = settings.app_base_url_clean + "/profile?spotify=connected"
-    return RedirectResponse(url)
-
-
-@router.get("/spotify/now-playing", response_model=schemas.SpotifyNowPlayingOut)
-async def spotify_now_playing(
-    db: AsyncSession = Depends(get_db), user: models.User = Depends(get_current_user)
-):
-    await _spotify_refresh_if_needed(db, user)
-    token = user.spotify_access_token
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(
-            "https://api.spotify.com/v1/me/player/currently-playing",
-            headers={"Authorization": f"Bearer {token}"},
-        )
-    now = datetime.now(timezone.utc)
-    if r.status_code == 204:
-        if hasattr(user, "spotify_is_playing"):
-            user.spotify_is_playing = False
-            user.spotify_last_checked_at = now
-            await db.commit()
-        return schemas.SpotifyNowPlayingOut(is_playing=False, fetched_at=now)
-    if r.status_code == 200:
-        data = r.json() or {}
-        item = data.get("item") or {}
-        artists = [a.get("name") for a in (item.get("artists") or []) if a.get("name")]
-        album = item.get("album") or {}
-        images = album.get("images") or []
-        album_img = images[0]["url"] if images else None
-        out = schemas.SpotifyNowPlayingOut(
-            is_playing=bool(data.get("is_playing")),
-            progress_ms=data.get("progress_ms"),
-            duration_ms=item.get("duration_ms"),
-            track_id=item.get("id"),
-            track_name=item.get("name"),
-            artists=artists,
-            album_name=album.get("name"),
-            album_image_url=album_img,
-            track_url=(item.get("external_urls") or {}).get("spotify"),
-            preview_url=item.get("preview_url"),
-            fetched_at=now,
-        )
-        try:
-            if hasattr(user, "spotify_is_playing"):
-                user.spotify_is_playing = out.is_playing
-                user.spotify_last_checked_at = now
-                user.spotify_last_track_id = out.track_id
-                user.spotify_last_track_name = out.track_name
-                user.spotify_last_artist_name = ", ".join(out.artists)
-                user.spotify_last_album_name = out.album_name
-                user.spotify_last_track_url = out.track_url
-                user.spotify_last_album_image_url = out.album_image_url
-                await db.commit()
-        except Exception:
-            pass
-        return out
-    if r.status_code == 401:
-        raise HTTPException(status_code=401, detail="Требуется переподключить Spotify")
-    raise HTTPException(status_code=400, detail="Не удалось получить трек")
-
-
 @router.post("/events", response_model=schemas.EventOut)
 async def create_event(
     data: schemas.EventCreate,
@@ -547,14 +552,14 @@ async def create_event(
 
 @router.get("/events", response_model=List[schemas.EventOut])
 async def all_events(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user: models.User = Depends(get_current_user),
     search: str = Query("", alias="search"),
     type: str = Query("", alias="type"),
     location: str = Query("", alias="location"),
     is_active: bool = Query(True, alias="is_active"),
 ):
-    return await crud.get_all_events(
+    events = await crud.get_all_events(
         db,
         user_id=user.id,
         search=search,
@@ -562,6 +567,9 @@ async def all_events(
         location=location,
         is_active=is_active,
     )
+    if settings.fast_json_enabled:
+        return trusted_json_response(project_all(schemas.EventOut, events))
+    return events
 
 
 @router.post("/events/attendance", response_model=schemas.EventAttendanceOut)
@@ -606,15 +614,35 @@ async def upload_event_file(
         raise HTTPException(status_code=404, detail="Событие не найдено")
     if user.role not in ("admin", "teacher") and event.created_by != user.id:
         raise HTTPException(status_code=403, detail="forbidden")
-    ext = file.filename.split(".")[-1].lower()
-    filename = f"event_{id}_{uuid.uuid4()}.{ext}"
-    base_dir = settings.static_dir_path
-    folder = base_dir / "event_files"
-    folder.mkdir(parents=True, exist_ok=True)
-    file_path = folder / filename
+    key = _upload_key("event_files", f"event_{id}", _file_ext(file.filename))
     data = await file.read()
-    file_path.write_bytes(data)
-    ef = models.EventFile(event_id=id, file_url=f"/static/event_files/{filename}")
+    url = await get_storage().save(key, data, file.content_type)
+    ef = models.EventFile(event_id=id, file_url=url)
+    db.add(ef)
+    await db.commit()
+    await db.refresh(ef)
+    return ef
+
+
+@router.post("/events/{id}/files/commit", response_model=schemas.EventFileOut)
+async def commit_event_file(
+    id: int,
+    data: schemas.UploadCommitIn,
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    event = await db.get(models.Event, id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Событие не найдено")
+    if user.role not in ("admin", "teacher") and event.created_by != user.id:
+        raise HTTPException(status_code=403, detail="forbidden")
+    url = await _committed_url(
+        data.key,
+        f"event_files/event_{id}_",
+        max_size=MAX_EVENT_FILE_SIZE,
+        allowed_types=ALLOWED_EVENT_FILE_TYPES,
+    )
+    ef = models.EventFile(event_id=id, file_url=url)
     db.add(ef)
     await db.commit()
     await db.refresh(ef)
@@ -638,8 +666,7 @@ async def get_event_files(id: int, db: AsyncSession = Depends(get_db)):
 @router.post("/events/upload_image")
 async def upload_event_image(
     file: UploadFile = File(...),
-    user: models.User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user_released),
 ):
     if user.role not in ("admin", "teacher"):
         raise HTTPException(status_code=403, detail="forbidden")
@@ -761,7 +788,7 @@ async def create_news(
 
 
 @router.get("/news", response_model=List[schemas.NewsOut])
-async def news_list(db: AsyncSession = Depends(get_db)):
+async def news_list(db: AsyncSession = Depends(get_read_db)):
     return await crud.get_news_list(db)
 
 
@@ -810,7 +837,7 @@ async def delete_news(
 
 @router.post("/news/upload_image")
 async def upload_news_image(
-    file: UploadFile = File(...), user: models.User = Depends(get_current_user)
+    file: UploadFile = File(...), user: models.User = Depends(get_current_user_released)
 ):
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="forbidden")
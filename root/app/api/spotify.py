@@ -1,211 +1,115 @@
-import base64
-from datetime import datetime, timedelta, timezone
 from typing import Optional
-from urllib.parse import urlencode
 
 import httpx
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_current_user_released
 from app.auth.security import create_access_token, decode_token
 from app.core.config import settings
-from app.core.database import get_db
-from app.models.models import User
+from app.core.database import async_session, get_db
+from app.models.models import SpotifyPresence, User
 from app.schemas.schemas import SpotifyAuthURL, SpotifyNowPlayingOut
-from fastapi import APIRouter, Depends, HTTPException, Query
+from app.services import spotify as spotify_service
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/spotify", tags=["spotify"])
 
 
-def _now_naive() -> datetime:
-    return datetime.utcnow().replace(tzinfo=None)
-
-
-def _as_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
-    if dt is None:
-        return None
-    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
-
-
-def _b64(s: str) -> str:
-    return base64.b64encode(s.encode()).decode()
-
-
-async def _save_tokens(
-    db: AsyncSession,
-    user: User,
-    access: str,
-    refresh: Optional[str],
-    scope: Optional[str],
-    expires_in: int,
-):
-    user.spotify_access_token = access
-    if refresh:
-        user.spotify_refresh_token = refresh
-    user.spotify_token_expires_at = _now_naive() + timedelta(seconds=expires_in - 10)
-    user.spotify_scope = scope or ""
-    user.spotify_is_connected = True
-    await db.commit()
-    await db.refresh(user)
-
-
-async def _ensure_access_token(db: AsyncSession, user: User) -> Optional[str]:
-    if not user.spotify_access_token or not user.spotify_refresh_token:
-        return None
-    exp = _as_naive_utc(user.spotify_token_expires_at)
-    if exp and exp > _now_naive():
-        return user.spotify_access_token
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.post(
-            "https://accounts.spotify.com/api/token",
-            data={
-                "grant_type": "refresh_token",
-                "refresh_token": user.spotify_refresh_token,
-            },
-            headers={
-                "Authorization": "Basic "
-                + _b64(f"{settings.spotify_client_id}:{settings.spotify_client_secret}")
-            },
-        )
-    if r.status_code != 200:
-        return None
-    data = r.json()
-    await _save_tokens(
-        db,
-        user,
-        data["access_token"],
-        data.get("refresh_token"),
-        data.get("scope"),
-        int(data.get("expires_in", 3600)),
+def _profile_redirect(result: str) -> RedirectResponse:
+    return RedirectResponse(
+        f"{settings.app_base_url_clean}/profile?spotify={result}", status_code=302
     )
-    return user.spotify_access_token
 
 
 @router.get("/auth-url", response_model=SpotifyAuthURL)
 async def spotify_auth_url(user: User = Depends(get_current_user)):
+    if not spotify_service.is_configured():
+        raise HTTPException(status_code=500, detail="Spotify не сконфигурирован")
     state = create_access_token(str(user.id), expires_delta=10)
-    params = {
-        "client_id": settings.spotify_client_id,
-        "response_type": "code",
-        "redirect_uri": settings.spotify_redirect_uri,
-        "scope": settings.spotify_scopes,
-        "state": state,
-        "show_dialog": "false",
-    }
-    url = "https://accounts.spotify.com/authorize?" + urlencode(params)
-    return {"url": url}
+    return {"url": spotify_service.authorize_url(state)}
 
 
 @router.get("/callback")
 async def spotify_callback(
-    code: str = Query(...), state: str = Query(...), db: AsyncSession = Depends(get_db)
+    code: Optional[str] = None,
+    state: Optional[str] = None,
+    error: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ):
+    if error or not code or not state:
+        return _profile_redirect("error")
     payload = decode_token(state) or {}
-    if not payload.get("sub"):
-        raise HTTPException(status_code=400, detail="invalid state")
-    user = await db.get(User, int(payload["sub"]))
-    if not user:
-        raise HTTPException(status_code=400, detail="user not found")
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.post(
-            "https://accounts.spotify.com/api/token",
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": settings.spotify_redirect_uri,
-            },
-            headers={
-                "Authorization": "Basic "
-                + _b64(f"{settings.spotify_client_id}:{settings.spotify_client_secret}")
-            },
-        )
-    if r.status_code != 200:
-        raise HTTPException(status_code=400, detail="token exchange failed")
-    data = r.json()
-    await _save_tokens(
-        db,
-        user,
-        data["access_token"],
-        data.get("refresh_token"),
-        data.get("scope"),
-        int(data.get("expires_in", 3600)),
-    )
-    async with httpx.AsyncClient(timeout=15) as client:
-        me = await client.get(
-            "https://api.spotify.com/v1/me",
-            headers={"Authorization": f"Bearer {user.spotify_access_token}"},
-        )
-    if me.status_code == 200:
-        info = me.json()
-        user.spotify_user_id = info.get("id") or None
-        user.spotify_display_name = info.get("display_name") or None
-        await db.commit()
-    target = settings.app_base_url_clean + "/profile?spotify=connected"
-    return RedirectResponse(target, status_code=302)
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return _profile_redirect("error")
+    user = await db.get(User, user_id)
+    if not user or not user.is_active:
+        return _profile_redirect("error")
+
+    data = await spotify_service.exchange_code(code)
+    if not data or not data.get("access_token"):
+        return _profile_redirect("error")
+    spotify_service.store_tokens(user, data)
+    info = await spotify_service.fetch_profile(user.spotify_access_token)
+    if info.get("id"):
+        user.spotify_user_id = info["id"]
+    if info.get("display_name"):
+        user.spotify_display_name = info["display_name"]
+    await db.commit()
+    spotify_service.now_playing_cache.invalidate(user.id)
+    return _profile_redirect("connected")
 
 
 @router.get("/now-playing", response_model=SpotifyNowPlayingOut)
-async def now_playing(
-    db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
-):
-    token = await _ensure_access_token(db, user)
-    if not token:
-        return SpotifyNowPlayingOut(is_playing=False, fetched_at=_now_naive())
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.get(
-            "https://api.spotify.com/v1/me/player/currently-playing",
-            headers={"Authorization": f"Bearer {token}"},
+async def now_playing(user: User = Depends(get_current_user_released)):
+    if not user.spotify_access_token or not user.spotify_refresh_token:
+        return SpotifyNowPlayingOut(
+            is_playing=False, fetched_at=spotify_service.utcnow_naive()
+        )
+    user_id = user.id
+
+    async def load() -> SpotifyNowPlayingOut:
+        # Загрузка общая для всех ждущих и переживает отмену запроса, который
+        # её начал, поэтому у неё своя сессия, а не сессия этого запроса.
+        fetched_at = spotify_service.utcnow_naive()
+        async with async_session() as db:
+            owner = await db.get(User, user_id)
+            token = (
+                await spotify_service.ensure_access_token(db, owner) if owner else None
+            )
+            if not token:
+                return SpotifyNowPlayingOut(is_playing=False, fetched_at=fetched_at)
+            try:
+                np = await spotify_service.fetch_now_playing(token, fetched_at)
+            except httpx.HTTPError:
+                return SpotifyNowPlayingOut(is_playing=False, fetched_at=fetched_at)
+            # пишем в БД только при смене трека или состояния воспроизведения
+            current = await db.get(SpotifyPresence, user_id)
+            if spotify_service.presence_changed(current, np):
+                values = spotify_service.presence_values(np, current)
+                await spotify_service.save_presence(
+                    db, [{"user_id": user_id, **values}]
+                )
+                await db.commit()
+            return np
+
+    try:
+        return await spotify_service.now_playing_cache.get(user_id, load)
+    except spotify_service.SpotifyRateLimited as exc:
+        raise HTTPException(
+            status_code=429,
+            detail="Spotify rate limit",
+            headers={"Retry-After": str(exc.retry_after)},
         )
-    if r.status_code == 204:
-        user.spotify_is_playing = False
-        user.spotify_last_checked_at = _now_naive()
-        await db.commit()
-        return SpotifyNowPlayingOut(is_playing=False, fetched_at=_now_naive())
-    if r.status_code != 200:
-        return SpotifyNowPlayingOut(is_playing=False, fetched_at=_now_naive())
-    j = r.json()
-    item = j.get("item") or {}
-    artists = [a.get("name") for a in item.get("artists", []) if a.get("name")]
-    album = item.get("album") or {}
-    images = album.get("images") or []
-    img = images[0]["url"] if images else None
-    url = item.get("external_urls", {}).get("spotify")
-    preview = item.get("preview_url")
-    user.spotify_is_playing = bool(j.get("is_playing"))
-    user.spotify_last_checked_at = _now_naive()
-    user.spotify_last_track_id = item.get("id")
-    user.spotify_last_track_name = item.get("name")
-    user.spotify_last_artist_name = ", ".join(artists) if artists else None
-    user.spotify_last_album_name = album.get("name")
-    user.spotify_last_track_url = url
-    user.spotify_last_album_image_url = img
-    await db.commit()
-    return SpotifyNowPlayingOut(
-        is_playing=bool(j.get("is_playing")),
-        progress_ms=j.get("progress_ms"),
-        duration_ms=(item.get("duration_ms") if item else None),
-        track_id=item.get("id"),
-        track_name=item.get("name"),
-        artists=artists,
-        album_name=album.get("name"),
-        album_image_url=img,
-        track_url=url,
-        preview_url=preview,
-        fetched_at=_now_naive(),
-    )
 
 
 @router.post("/disconnect")
 async def disconnect(
     db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
 ):
-    user.spotify_access_token = None
-    user.spotify_refresh_token = None
-    user.spotify_token_expires_at = None
-    user.spotify_scope = None
-    user.spotify_display_name = None
-    user.spotify_user_id = None
-    user.spotify_is_connected = False
-    user.spotify_is_playing = False
+    spotify_service.disconnect(user)
+    await spotify_service.clear_presence(db, user.id)
     await db.commit()
+    spotify_service.now_playing_cache.invalidate(user.id)
     return {"ok": True}
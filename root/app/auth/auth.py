@@ -1,11 +1,11 @@
 from app.auth.security import create_access_token, get_password_hash, verify_password
 from app.core.database import get_db
+from app.crud.statements import USER_BY_EMAIL
 from app.models.models import User
 from app.schemas.schemas import Token, UserCreate
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -22,7 +22,7 @@ async def login(
     db: AsyncSession = Depends(get_db),
 ):
     email = form_data.username.strip().lower()
-    res = await db.execute(select(User).where(User.email == email))
+    res = await db.execute(USER_BY_EMAIL, {"email": email})
     user = res.scalars().first()
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
@@ -43,7 +43,7 @@ async def login(
 @router.post("/login-json", response_model=Token)
 async def login_json(payload: LoginIn, db: AsyncSession = Depends(get_db)):
     email = payload.email.strip().lower()
-    res = await db.execute(select(User).where(User.email == email))
+    res = await db.execute(USER_BY_EMAIL, {"email": email})
     user = res.scalars().first()
     if not user or not verify_password(payload.password, user.hashed_password):
         raise HTTPException(
@@ -64,7 +64,7 @@ async def login_json(payload: LoginIn, db: AsyncSession = Depends(get_db)):
 @router.post("/register")
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     email = user.email.strip().lower()
-    res = await db.execute(select(User).where(User.email == email))
+    res = await db.execute(USER_BY_EMAIL, {"email": email})
     if res.scalars().first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
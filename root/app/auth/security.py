@@ -1,3 +1,5 @@
+import hashlib
+import secrets
 from datetime import datetime, timedelta, timezone
 from typing import Any, Union
 
@@ -7,8 +9,13 @@ from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Пароль ещё не задан (аккаунт ждёт активации): с таким хешем войти нельзя.
+UNUSABLE_PASSWORD_PREFIX = "!"
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    if not hashed_password or hashed_password.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return False
     return pwd_context.verify(plain_password, hashed_password)
 
 
@@ -16,6 +23,20 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash a batch of passwords; runs in a worker process during imports."""
+
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def make_unusable_password() -> str:
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_hex(16)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def create_access_token(
     sub: Union[str, Any], expires_delta: int | None = None, extra: dict | None = None
 ) -> str:
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Small in-process cache with per-entry expiry and an LRU size bound.
+
+    Values are per worker; use it for data where a few seconds of staleness
+    is fine (counters, directory totals), not for anything that must agree
+    across processes.
+    """
+
+    def __init__(self, *, ttl: float, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._locks: dict[K, asyncio.Lock] = {}
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def discard(self, predicate: Callable[[K], bool]) -> None:
+        """Drop every entry whose key matches ``predicate``."""
+
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
+    async def get_or_set(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        """Return the cached value, computing it once for concurrent callers."""
+
+        value = self.get(key)
+        if value is not None:
+            return value
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                value = self.get(key)
+                if value is None:
+                    value = await factory()
+                    self.set(key, value)
+                return value
+        finally:
+            if not lock.locked():
+                self._locks.pop(key, None)
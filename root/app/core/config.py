@@ -34,6 +34,13 @@ def _coerce_str_list(values: Iterable[str] | str | None) -> list[str]:
 
 class Settings(BaseSettings):
     database_url: str
+    database_read_url: str = ""
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: float = 10.0
+    db_pool_pre_ping: bool = False
+    db_prepared_statement_cache_size: int = 500
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
@@ -41,6 +48,15 @@ class Settings(BaseSettings):
     frontend_origins: str | list[str] = ""
     app_base_url: str = "http://localhost:5173"
     static_dir: str = "app/static"
+    static_immutable_max_age: int = 31536000
+    storage_backend: str = "local"
+    storage_presign_expires: int = 900
+    s3_endpoint_url: str = ""
+    s3_bucket: str = ""
+    s3_region: str = "us-east-1"
+    s3_access_key_id: str = ""
+    s3_secret_access_key: str = ""
+    s3_public_base_url: str = ""
     trusted_hosts: str | list[str] = "localhost,127.0.0.1"
     environment: str = "development"
     auto_create_schema: bool = True
@@ -51,10 +67,32 @@ class Settings(BaseSettings):
     smtp_security: str = "none"
     smtp_starttls: bool = False
     mail_from: str = "no-reply@example.com"
+    smtp_pool_size: int = 2
+    smtp_idle_timeout_seconds: float = 30.0
+    mail_batch_size: int = 50
+    mail_poll_seconds: float = 5.0
+    mail_max_attempts: int = 6
+    mail_retry_base_seconds: int = 30
+    mail_dedupe_window_seconds: int = 300
     spotify_client_id: str = ""
     spotify_client_secret: str = ""
     spotify_redirect_uri: str = "http://localhost:8000/spotify/callback"
     spotify_scopes: str = "user-read-currently-playing user-read-playback-state"
+    spotify_now_playing_ttl_seconds: float = 5.0
+    spotify_now_playing_idle_ttl_seconds: float = 15.0
+    spotify_presence_poll_enabled: bool = False
+    spotify_presence_active_interval_seconds: float = 10.0
+    spotify_presence_idle_interval_seconds: float = 120.0
+    spotify_presence_concurrency: int = 8
+    spotify_presence_rate_per_second: float = 5.0
+    spotify_presence_batch_size: int = 200
+    http_client_http2: bool = True
+    http_client_timeout: float = 10.0
+    http_client_connect_timeout: float = 5.0
+    http_client_max_connections: int = 100
+    http_client_max_keepalive: int = 20
+    http_client_keepalive_expiry: float = 60.0
+    http_client_connect_retries: int = 2
     vapid_public_key: str = ""
     vapid_private_key: str = ""
     vapid_subject: str = ""
@@ -70,6 +108,33 @@ class Settings(BaseSettings):
     sentry_profiles_sample_rate: float = 0.0
     sentry_environment: str = ""
     log_level: str = "INFO"
+    fast_json_enabled: bool = False
+    users_count_cache_seconds: float = 60.0
+    schedule_cache_seconds: float = 300.0
+    export_batch_size: int = 1000
+    user_import_batch_size: int = 500
+    user_import_max_rows: int = 20000
+    user_import_hash_workers: int = 0
+    user_import_activation_hours: int = 72
+    schedule_timezone: str = "Europe/Moscow"
+    schedule_import_max_rows: int = 50000
+    metrics_enabled: bool = True
+    metrics_path: str = "/metrics"
+    metrics_token: str = ""
+    prometheus_multiproc_dir: str = ""
+    query_stats_enabled: bool = True
+    slow_query_ms: float = 200.0
+    slow_query_explain: bool = True
+    request_query_warn_threshold: int = 50
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_seconds: float = 0.5
+    loop_block_threshold_seconds: float = 0.3
+    loop_debug: bool = False
+    loop_slow_callback_seconds: float = 0.1
+    profiling_enabled: bool = True
+    profiling_max_seconds: float = 60.0
+    profiling_interval_ms: float = 5.0
+    profiling_request_token: str = ""
     request_id_header: str = "x-request-id"
     cors_allow_credentials: bool = True
     cors_allow_methods: str | list[str] = "GET,POST,PUT,PATCH,DELETE,OPTIONS"
@@ -169,6 +234,10 @@ class Settings(BaseSettings):
     def is_development(self) -> bool:
         return str(self.environment).lower() in {"dev", "development", "local"}
 
+    @cached_property
+    def is_production(self) -> bool:
+        return str(self.environment).lower() in {"prod", "production"}
+
     @cached_property
     def cors_allow_methods_list(self) -> list[str]:
         methods = _coerce_str_list(self.cors_allow_methods)
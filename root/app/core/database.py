@@ -6,22 +6,58 @@ from typing import AsyncGenerator
 
 from app.core.config import settings
 from sqlalchemy import text
-from sqlalchemy.exc import DBAPIError
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.pool import NullPool
 
 logger = logging.getLogger(__name__)
 
-_engine_kwargs: dict[str, object] = {
-    "pool_pre_ping": True,
-    "echo": False,
-}
 
-if settings.is_development:
-    _engine_kwargs["poolclass"] = NullPool
+def engine_options(url: str) -> dict[str, object]:
+    """Pool settings for an engine connecting to ``url``."""
 
-engine = create_async_engine(settings.database_url, **_engine_kwargs)
+    options: dict[str, object] = {
+        "echo": False,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    parsed = make_url(url)
+    # Кеш подготовленных выражений на соединение: повторяющиеся запросы не
+    # разбираются и не планируются сервером заново. За pgbouncer в режиме
+    # transaction его нужно выключить (DB_PREPARED_STATEMENT_CACHE_SIZE=0).
+    cache_size = settings.db_prepared_statement_cache_size
+    if parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": cache_size}
+    elif parsed.get_driver_name() == "psycopg" and cache_size <= 0:
+        options["connect_args"] = {"prepare_threshold": None}
+    if settings.is_development:
+        options["poolclass"] = NullPool
+    elif parsed.get_backend_name() != "sqlite":
+        # Вместо pre-ping на каждый checkout: соединения пересоздаются до того,
+        # как их закроет сервер или балансировщик, а при обрыве SQLAlchemy
+        # помечает недействительным весь пул, и следующие checkout берут
+        # свежие соединения.
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_timeout=settings.db_pool_timeout_seconds,
+        )
+    return options
+
+
+engine = create_async_engine(
+    settings.database_url, **engine_options(settings.database_url)
+)
+
+# Реплика для чтения; без DATABASE_READ_URL читаем с основной базы.
+read_engine = (
+    create_async_engine(
+        settings.database_read_url, **engine_options(settings.database_read_url)
+    )
+    if settings.database_read_url
+    else engine
+)
 
 async_session: async_sessionmaker[AsyncSession] = async_sessionmaker(
     engine,
@@ -29,22 +65,27 @@ async_session: async_sessionmaker[AsyncSession] = async_sessionmaker(
     class_=AsyncSession,
 )
 
+async_read_session: async_sessionmaker[AsyncSession] = async_sessionmaker(
+    read_engine,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    while True:
-        try:
-            async with async_session() as session:
-                yield session
-            break
-        except DBAPIError as exc:  # pragma: no cover - defensive guard
-            if exc.connection_invalidated:
-                logger.warning("Database connection invalidated; retrying session")
-                continue
-            raise
+    async with async_session() as session:
+        yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only endpoints; may lag slightly behind the primary."""
+
+    async with async_read_session() as session:
+        yield session
 
 
 async def wait_db(max_attempts: int = 5, delay: float = 1.0) -> None:
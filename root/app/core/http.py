@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import logging
+import ssl
+
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_http_client(
+    *, verify: ssl.SSLContext | bool = True, **kwargs
+) -> httpx.AsyncClient:
+    """Create an ``AsyncClient`` configured from settings.
+
+    Other keyword arguments are passed to ``httpx.AsyncClient`` and override
+    the defaults (tests use ``transport=`` to plug in a mock).
+    """
+
+    http2 = settings.http_client_http2 and _http2_available()
+    if settings.http_client_http2 and not http2:
+        logger.info("h2 is not installed; outgoing HTTP client uses HTTP/1.1")
+    # retries повторяют только неудачное установление соединения,
+    # отправленные запросы не дублируются
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        verify=verify,
+        retries=max(0, settings.http_client_connect_retries),
+        limits=httpx.Limits(
+            max_connections=settings.http_client_max_connections,
+            max_keepalive_connections=settings.http_client_max_keepalive,
+            keepalive_expiry=settings.http_client_keepalive_expiry,
+        ),
+    )
+    options: dict[str, object] = {
+        "transport": transport,
+        "timeout": httpx.Timeout(
+            settings.http_client_timeout,
+            connect=settings.http_client_connect_timeout,
+        ),
+    }
+    options.update(kwargs)
+    return httpx.AsyncClient(**options)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the app-wide client, creating it on first use outside ``lifespan``."""
+
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_http_client()
+    return _client
+
+
+def set_http_client(client: httpx.AsyncClient | None) -> None:
+    global _client
+    _client = client
+
+
+async def close_http_client() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Awaitable, Callable
+
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+    """Measures event-loop lag and reports what blocks the loop.
+
+    A coroutine on the loop sleeps for ``interval`` and records how late it
+    wakes up. A daemon thread watches its heartbeat: when the loop has not
+    come back for ``threshold`` seconds the thread takes the loop thread's
+    current stack, i.e. the code that is blocking it right now.
+    """
+
+    def __init__(self, *, interval: float, threshold: float) -> None:
+        self._interval = interval
+        self._threshold = threshold
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    async def _beat(self) -> None:
+        while True:
+            started = time.monotonic()
+            self._heartbeat = started
+            await asyncio.sleep(self._interval)
+            EVENT_LOOP_LAG.observe(
+                max(0.0, time.monotonic() - started - self._interval)
+            )
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stopped.wait(self._threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self._interval
+            # об одной остановке сообщаем один раз, даже если она длится долго
+            if blocked < self._threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+            EVENT_LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id or 0)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            logger.warning(
+                "Event loop blocked for %.0f ms; loop thread stack:\n%s",
+                blocked * 1000,
+                stack,
+            )
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+
+
+async def start_loop_monitor() -> Callable[[], Awaitable[None]] | None:
+    """Start the loop watchdog and return a stopper (None when disabled)."""
+
+    if settings.loop_debug:
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        # в debug-режиме asyncio сам логирует колбэки дольше этого порога
+        loop.slow_callback_duration = settings.loop_slow_callback_seconds
+    if not settings.loop_monitor_enabled:
+        return None
+
+    watchdog = LoopWatchdog(
+        interval=settings.loop_monitor_interval_seconds,
+        threshold=settings.loop_block_threshold_seconds,
+    )
+    watchdog.start()
+    return watchdog.stop
@@ -0,0 +1,185 @@
+"""Built-in Prometheus metrics, independent of the OTLP pipeline.
+
+With several worker processes (``uvicorn --workers``, gunicorn) set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty writable directory: every process
+then writes its samples to memory-mapped files there and ``/metrics``
+aggregates them, whichever worker answers the scrape.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+from app.core.config import settings
+
+# prometheus_client выбирает хранилище значений при импорте, поэтому каталог
+# для многопроцессного режима нужно выставить до него.
+if settings.prometheus_multiproc_dir:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.prometheus_multiproc_dir)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+from starlette.types import ASGIApp, Message, Receive, Scope, Send  # noqa: E402
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Метка для запросов, не попавших ни в один маршрут (сканеры, опечатки):
+# сырой путь в метке раздул бы число временных рядов.
+UNMATCHED_ROUTE = "<unmatched>"
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+    ("method",),
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Database connections currently checked out of the pool.",
+    ("pool",),
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts",
+    "Database connection checkouts.",
+    ("pool",),
+    registry=REGISTRY,
+)
+DB_POOL_CONNECTS = Counter(
+    "db_pool_connects",
+    "New database connections opened by the pool.",
+    ("pool",),
+    registry=REGISTRY,
+)
+DB_POOL_INVALIDATIONS = Counter(
+    "db_pool_invalidations",
+    "Database connections invalidated (dropped) by the pool.",
+    ("pool",),
+    registry=REGISTRY,
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between a timer's due time and the moment the event loop ran it.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    registry=REGISTRY,
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls",
+    "Times the event loop stayed blocked longer than the watchdog threshold.",
+    registry=REGISTRY,
+)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware recording latency per route template."""
+
+    def __init__(self, app: ASGIApp, *, skip_paths: tuple[str, ...] = ()) -> None:
+        self.app = app
+        self._skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self._skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method, route_template(scope), status).observe(
+                time.perf_counter() - started
+            )
+            in_flight.dec()
+
+
+def instrument_engine(engine: AsyncEngine, *, name: str = "primary") -> None:
+    """Track pool checkouts through SQLAlchemy pool events."""
+
+    pool = engine.sync_engine.pool
+    if getattr(pool, "_prometheus_instrumented", False):
+        return
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        DB_POOL_CONNECTS.labels(name).inc()
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        DB_POOL_CHECKOUTS.labels(name).inc()
+        DB_POOL_CHECKED_OUT.labels(name).inc()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record) -> None:
+        DB_POOL_CHECKED_OUT.labels(name).dec()
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        DB_POOL_INVALIDATIONS.labels(name).inc()
+
+    pool._prometheus_instrumented = True  # type: ignore[attr-defined]
+
+
+def render_latest() -> bytes:
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    token = settings.metrics_token
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """Drop a finished worker's live gauges (call from gunicorn ``child_exit``)."""
+
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid if pid is not None else os.getpid())
@@ -24,9 +24,7 @@ from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 try:
     from sentry_sdk import init as sentry_init
@@ -46,6 +44,8 @@ except Exception:
     SentrySpanProcessor = None  # type: ignore[assignment]
 
 from app.core.config import settings
+from app.core.query_stats import current_query_stats
+from app.core.serialization import dumps
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 _logging_configured = False
@@ -61,21 +61,42 @@ def get_request_id() -> str | None:
     return _request_id_ctx.get(None)
 
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: FastAPI, header_name: str = "x-request-id") -> None:
-        super().__init__(app)
-        self._header_name = header_name
+class CorrelationIdMiddleware:
+    """Pure ASGI middleware; the request id stays in context for the whole
+    response, including streamed bodies."""
+
+    def __init__(self, app: ASGIApp, header_name: str = "x-request-id") -> None:
+        self.app = app
+        self._header_name = header_name.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = ""
+        for name, value in scope["headers"]:
+            if name == self._header_name:
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or uuid.uuid4().hex
+        header = (self._header_name, request_id.encode("latin-1"))
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [
+                    item
+                    for item in message.get("headers", ())
+                    if item[0].lower() != self._header_name
+                ]
+                headers.append(header)
+                message["headers"] = headers
+            await send(message)
 
-    async def dispatch(self, request: Request, call_next):
-        header_value = request.headers.get(self._header_name)
-        request_id = header_value or uuid.uuid4().hex
         token = _request_id_ctx.set(request_id)
         try:
-            response: Response = await call_next(request)
+            await self.app(scope, receive, send_with_request_id)
         finally:
             _request_id_ctx.reset(token)
-        response.headers[self._header_name] = request_id
-        return response
 
 
 class TraceContextFilter(logging.Filter):
@@ -92,6 +113,9 @@ class TraceContextFilter(logging.Filter):
         record.request_id = request_id or ""
         record.service_name = settings.otel_service_name
         record.environment = settings.environment
+        stats = current_query_stats()
+        record.db_queries = stats.count if stats is not None else 0
+        record.db_time_ms = round(stats.milliseconds, 1) if stats is not None else 0
         return True
 
 
@@ -112,6 +136,8 @@ class JSONLogFormatter(logging.Formatter):
             "request_id": getattr(record, "request_id", None),
             "service_name": getattr(record, "service_name", None),
             "environment": getattr(record, "environment", None),
+            "db_queries": getattr(record, "db_queries", None),
+            "db_time_ms": getattr(record, "db_time_ms", None),
         }
         for key, value in extras.items():
             if value:
@@ -120,6 +146,8 @@ class JSONLogFormatter(logging.Formatter):
             log_record["exc_info"] = self.formatException(record.exc_info)
         if record.stack_info:
             log_record["stack_info"] = self.formatStack(record.stack_info)
+        if settings.fast_json_enabled:
+            return dumps(log_record).decode("utf-8")
         return json.dumps(log_record, ensure_ascii=False)
 
 
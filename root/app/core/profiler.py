@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from types import CodeType, FrameType
+
+from app.core.config import settings
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+MAX_STORED_PROFILES = 32
+
+
+class StackSampler:
+    """Wall-clock sampling profiler producing collapsed (folded) stacks.
+
+    A background thread reads ``sys._current_frames()`` every ``interval``
+    seconds; nothing is hooked into the interpreter, so the profiled code
+    runs unchanged and the cost disappears once the sampler stops. The
+    output is the ``frame;frame;frame count`` format understood by
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(
+        self, *, interval: float = 0.005, thread_ids: set[int] | None = None
+    ) -> None:
+        self._interval = interval
+        self._thread_ids = thread_ids
+        self._stacks: Counter[str] = Counter()
+        self._labels: dict[CodeType, str] = {}
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.samples = 0
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            filename = os.path.basename(code.co_filename)
+            label = f"{name} ({filename}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame: FrameType | None) -> list[str]:
+        stack: list[str] = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stopped.wait(self._interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if self._thread_ids is not None and thread_id not in self._thread_ids:
+                    continue
+                stack = self._stack(frame)
+                if self._thread_ids is None:
+                    stack.insert(0, names.get(thread_id) or str(thread_id))
+                self._stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self._stacks.most_common()
+        )
+
+
+_recent_profiles: OrderedDict[str, str] = OrderedDict()
+
+
+def get_request_profile(profile_id: str) -> str | None:
+    return _recent_profiles.get(profile_id)
+
+
+def _store_profile(profile_id: str, collapsed: str) -> None:
+    _recent_profiles[profile_id] = collapsed
+    while len(_recent_profiles) > MAX_STORED_PROFILES:
+        _recent_profiles.popitem(last=False)
+
+
+class RequestProfilerMiddleware:
+    """Profiles single requests that carry ``X-Profile: <token>``.
+
+    Without ``PROFILING_REQUEST_TOKEN`` every request passes straight through.
+    Only the event-loop thread is sampled, so requests running concurrently
+    on the same worker show up in the profile as well.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        token = settings.profiling_request_token
+        if not token or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        expected = token.encode("latin-1")
+        if not any(
+            name == PROFILE_HEADER and value == expected
+            for name, value in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((PROFILE_ID_HEADER, profile_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        sampler = StackSampler(
+            interval=settings.profiling_interval_ms / 1000,
+            thread_ids={threading.get_ident()},
+        )
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            # join ждёт до одного интервала выборки — не держим на нём event loop
+            await asyncio.to_thread(sampler.stop)
+            _store_profile(profile_id, sampler.collapsed())
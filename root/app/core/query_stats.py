@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_EXPLAIN_KEY = "query_stats_explaining"
+_STARTED_KEY = "query_stats_started"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    statements: list[str] = field(default_factory=list)
+    keep_statements: bool = False
+    parent: QueryStats | None = field(default=None, repr=False)
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+    def add(self, statement: str, seconds: float) -> None:
+        # вложенные замеры (запрос внутри теста с бюджетом) учитываются во всех
+        stats: QueryStats | None = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            if stats.keep_statements:
+                stats.statements.append(statement)
+            stats = stats.parent
+
+
+_stats_ctx: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _stats_ctx.get()
+
+
+@contextmanager
+def track_queries(*, keep_statements: bool = False) -> Iterator[QueryStats]:
+    stats = QueryStats(keep_statements=keep_statements, parent=_stats_ctx.get())
+    token = _stats_ctx.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats_ctx.reset(token)
+
+
+def _explain(conn: Connection, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    conn.info[_EXPLAIN_KEY] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    finally:
+        conn.info.pop(_EXPLAIN_KEY, None)
+    return "\n".join(" ".join(str(col) for col in row) for row in rows)
+
+
+def _log_slow_query(
+    conn: Connection, statement: str, parameters, elapsed: float, executemany: bool
+) -> None:
+    plan = ""
+    explainable = statement.lstrip()[:6].upper() == "SELECT"
+    if (
+        settings.slow_query_explain
+        and not settings.is_production
+        and explainable
+        and not executemany
+    ):
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception:
+            logger.debug("EXPLAIN failed for slow query", exc_info=True)
+    logger.warning(
+        "Slow query (%.1f ms): %s%s",
+        elapsed * 1000,
+        statement,
+        f"\n{plan}" if plan else "",
+    )
+
+
+def instrument_query_stats(engine: AsyncEngine) -> None:
+    """Count statements and DB time per request through cursor events."""
+
+    sync_engine = engine.sync_engine
+    if getattr(sync_engine, "_query_stats_instrumented", False):
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        if not conn.info.get(_EXPLAIN_KEY):
+            conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        if conn.info.get(_EXPLAIN_KEY):
+            return
+        started = conn.info.get(_STARTED_KEY)
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        stats = _stats_ctx.get()
+        if stats is not None:
+            stats.add(statement, elapsed)
+        threshold = settings.slow_query_ms
+        if threshold > 0 and elapsed * 1000 >= threshold:
+            _log_slow_query(conn, statement, parameters, elapsed, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(exception_context) -> None:
+        conn = exception_context.connection
+        if conn is not None and conn.info.get(_STARTED_KEY):
+            conn.info[_STARTED_KEY].pop()
+
+    sync_engine._query_stats_instrumented = True  # type: ignore[attr-defined]
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware adding per-request DB totals as ``Server-Timing``."""
+
+    def __init__(self, app: ASGIApp, *, warn_threshold: int = 0) -> None:
+        self.app = app
+        self._warn_threshold = warn_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    timing = (
+                        f'db;dur={stats.milliseconds:.1f};desc="{stats.count} queries"'
+                    )
+                    headers = list(message.get("headers", ()))
+                    headers.append((b"server-timing", timing.encode("latin-1")))
+                    message["headers"] = headers
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+            if self._warn_threshold and stats.count > self._warn_threshold:
+                logger.warning(
+                    "%s %s ran %d queries (%.1f ms)",
+                    scope["method"],
+                    scope["path"],
+                    stats.count,
+                    stats.milliseconds,
+                )
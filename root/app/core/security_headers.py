@@ -1,91 +1,79 @@
 from __future__ import annotations
 
 from app.core.config import Settings
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.responses import Response
-from starlette.types import ASGIApp
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp, *, settings: Settings):
-        super().__init__(app)
-        self._settings = settings
-
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:  # type: ignore[override]
-        response = await call_next(request)
-        self._apply_hsts(response)
-        self._apply_csp(response)
-        self._apply_frame_options(response)
-        self._apply_permissions_policy(response)
-        return response
-
-    def _apply_hsts(self, response: Response) -> None:
-        headers = response.headers
-        if not self._settings.security_hsts_enabled:
-            try:
-                del headers["Strict-Transport-Security"]
-            except KeyError:
-                pass
-            return
-        value = f"max-age={int(self._settings.security_hsts_max_age)}"
-        if self._settings.security_hsts_include_subdomains:
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_MANAGED_HEADERS = (
+    "strict-transport-security",
+    "content-security-policy",
+    "content-security-policy-report-only",
+    "x-frame-options",
+    "permissions-policy",
+)
+
+
+def build_security_headers(settings: Settings) -> list[tuple[str, str]]:
+    """Headers to send with every response; anything managed but not listed is
+    stripped from the response."""
+
+    headers: list[tuple[str, str]] = []
+
+    if settings.security_hsts_enabled:
+        value = f"max-age={int(settings.security_hsts_max_age)}"
+        if settings.security_hsts_include_subdomains:
             value += "; includeSubDomains"
-        if self._settings.security_hsts_preload:
+        if settings.security_hsts_preload:
             value += "; preload"
-        headers["Strict-Transport-Security"] = value
-
-    def _apply_csp(self, response: Response) -> None:
-        headers = response.headers
-        policy = self._settings.security_csp.strip()
-        report_uri = self._settings.security_csp_report_uri.strip()
-        header_name = "Content-Security-Policy"
-        if self._settings.security_csp_report_only:
-            header_name = "Content-Security-Policy-Report-Only"
-        alternate = (
-            "Content-Security-Policy"
-            if header_name.endswith("Report-Only")
-            else "Content-Security-Policy-Report-Only"
-        )
-        if not policy:
-            for name in (
-                "Content-Security-Policy",
-                "Content-Security-Policy-Report-Only",
-            ):
-                try:
-                    del headers[name]
-                except KeyError:
-                    pass
-            return
-        normalized = policy.rstrip("; ")
+        headers.append(("Strict-Transport-Security", value))
+
+    policy = settings.security_csp.strip()
+    if policy:
+        policy = policy.rstrip("; ")
+        report_uri = settings.security_csp_report_uri.strip()
         if report_uri:
-            normalized = f"{normalized}; report-uri {report_uri}"
-        headers[header_name] = normalized
-        try:
-            del headers[alternate]
-        except KeyError:
-            pass
-
-    def _apply_frame_options(self, response: Response) -> None:
-        headers = response.headers
-        value = self._settings.security_x_frame_options.strip()
-        if value:
-            headers["X-Frame-Options"] = value
-        else:
-            try:
-                del headers["X-Frame-Options"]
-            except KeyError:
-                pass
-
-    def _apply_permissions_policy(self, response: Response) -> None:
-        headers = response.headers
-        value = self._settings.security_permissions_policy.strip()
-        if value:
-            headers["Permissions-Policy"] = value
-        else:
-            try:
-                del headers["Permissions-Policy"]
-            except KeyError:
-                pass
+            policy = f"{policy}; report-uri {report_uri}"
+        name = "Content-Security-Policy"
+        if settings.security_csp_report_only:
+            name = "Content-Security-Policy-Report-Only"
+        headers.append((name, policy))
+
+    frame_options = settings.security_x_frame_options.strip()
+    if frame_options:
+        headers.append(("X-Frame-Options", frame_options))
+
+    permissions_policy = settings.security_permissions_policy.strip()
+    if permissions_policy:
+        headers.append(("Permissions-Policy", permissions_policy))
+
+    return headers
+
+
+class SecurityHeadersMiddleware:
+    """Pure ASGI middleware: rewrites headers in ``http.response.start`` only,
+    so streaming bodies pass through untouched."""
+
+    def __init__(self, app: ASGIApp, *, settings: Settings) -> None:
+        self.app = app
+        self._headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in build_security_headers(settings)
+        ]
+        self._managed = frozenset(name.encode("latin-1") for name in _MANAGED_HEADERS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", ())
+                    if name.lower() not in self._managed
+                ]
+                headers.extend(self._headers)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
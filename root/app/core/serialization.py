@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import uuid
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Any, Iterable, List, get_args, get_origin
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+_MISSING = object()
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (dt.datetime, dt.date, dt.time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; uses orjson when it is installed."""
+
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _nested_model(annotation: Any) -> tuple[type[BaseModel] | None, bool]:
+    args = [a for a in get_args(annotation) if a is not type(None)]
+    if get_origin(annotation) in (list, List) and args:
+        inner, _ = _nested_model(args[0])
+        return inner, True
+    if args and get_origin(annotation) is not None:
+        # Optional[Model]
+        return _nested_model(args[0]) if len(args) == 1 else (None, False)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+class _Plan:
+    __slots__ = ("names", "defaults", "nested", "from_attrs", "from_items")
+
+    def __init__(self, model: type[BaseModel]) -> None:
+        fields = model.model_fields
+        self.names = tuple(fields)
+        self.defaults = {
+            name: (
+                field.default_factory,
+                None if field.is_required() else field.default,
+            )
+            for name, field in fields.items()
+        }
+        self.nested = []
+        for name, field in fields.items():
+            inner, many = _nested_model(field.annotation)
+            if inner is not None:
+                self.nested.append((name, inner, many))
+        # attrgetter/itemgetter читают все поля за один вызов на уровне C
+        self.from_attrs = attrgetter(*self.names)
+        self.from_items = itemgetter(*self.names)
+
+
+@lru_cache(maxsize=None)
+def _plan(model: type[BaseModel]) -> _Plan:
+    return _Plan(model)
+
+
+def _project_slow(plan: _Plan, obj: Any) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for name in plan.names:
+        if isinstance(obj, dict):
+            value = obj.get(name, _MISSING)
+        else:
+            value = getattr(obj, name, _MISSING)
+        if value is _MISSING:
+            factory, default = plan.defaults[name]
+            value = factory() if factory is not None else default
+        out[name] = value
+    return out
+
+
+def project(model: type[BaseModel], obj: Any) -> dict[str, Any]:
+    """Pick ``model``'s fields from an ORM object or dict without validating.
+
+    Only for data the app produced itself (CRUD output), where validation
+    would just repeat what the database already guarantees.
+    """
+
+    plan = _plan(model)
+    try:
+        if isinstance(obj, dict):
+            values = plan.from_items(obj)
+        else:
+            values = plan.from_attrs(obj)
+        out = dict(zip(plan.names, values if len(plan.names) > 1 else (values,)))
+    except (KeyError, AttributeError):
+        out = _project_slow(plan, obj)
+    for name, inner, many in plan.nested:
+        value = out[name]
+        if value is None:
+            continue
+        if many:
+            out[name] = [project(inner, item) for item in value]
+        else:
+            out[name] = project(inner, value)
+    return out
+
+
+def project_all(model: type[BaseModel], objs: Iterable[Any]) -> list[dict[str, Any]]:
+    return [project(model, obj) for obj in objs]
+
+
+def trusted_json_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    """Return ``content`` as-is: FastAPI skips ``response_model`` validation for
+    ``Response`` objects, so only pass data shaped by ``project``."""
+
+    return FastJSONResponse(content, status_code=status_code)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import os
+import re
+import stat
+from mimetypes import guess_type
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Scope
+
+# Загрузки получают случайный суффикс (secrets.token_hex / uuid4), поэтому
+# содержимое по такому имени никогда не меняется и его можно кешировать навсегда.
+_RANDOMIZED_NAME = re.compile(
+    r"(?:^|_)(?:[0-9a-f]{16,32}|[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12})"
+    r"\.[A-Za-z0-9]+$"
+)
+
+# (Accept-Encoding token, file suffix) in order of preference
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+_COMPRESSIBLE_PREFIXES = ("text/", "application/json", "application/javascript")
+_COMPRESSIBLE_TYPES = {
+    "application/xml",
+    "application/pdf",
+    "application/manifest+json",
+    "image/svg+xml",
+}
+
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def is_randomized_name(path: PathLike) -> bool:
+    return bool(_RANDOMIZED_NAME.search(os.path.basename(os.fspath(path))))
+
+
+def _is_compressible(media_type: str) -> bool:
+    return media_type.startswith(_COMPRESSIBLE_PREFIXES) or (
+        media_type in _COMPRESSIBLE_TYPES
+    )
+
+
+def _accepted_encodings(headers: Headers) -> set[str]:
+    accepted: set[str] = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = params.strip().lower().removeprefix("q=")
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(token)
+    return accepted
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with long-lived caching for upload names and precompressed siblings.
+
+    Conditional requests (``If-None-Match``/``If-Modified-Since``) and ``Range``
+    are answered by Starlette itself; this class only decides which file to send
+    and which ``Cache-Control`` to attach.
+    """
+
+    def __init__(self, *args, immutable_max_age: int = 31536000, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._immutable_cache_control = (
+            f"public, max-age={int(immutable_max_age)}, immutable"
+        )
+
+    def cache_control_for(self, full_path: PathLike) -> str:
+        if is_randomized_name(full_path):
+            return self._immutable_cache_control
+        return REVALIDATE_CACHE_CONTROL
+
+    def _precompressed_variant(
+        self, full_path: PathLike, request_headers: Headers
+    ) -> tuple[str, os.stat_result, str] | None:
+        # Range-запросы относятся к исходному файлу, сжатую копию не подменяем.
+        if "range" in request_headers:
+            return None
+        accepted = _accepted_encodings(request_headers)
+        if not accepted:
+            return None
+        for encoding, suffix in _PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            candidate = os.fspath(full_path) + suffix
+            try:
+                candidate_stat = os.stat(candidate)
+            except OSError:
+                continue
+            if stat.S_ISREG(candidate_stat.st_mode):
+                return candidate, candidate_stat, encoding
+        return None
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = guess_type(os.fspath(full_path))[0] or "application/octet-stream"
+        headers = {"Cache-Control": self.cache_control_for(full_path)}
+
+        variant = None
+        if _is_compressible(media_type):
+            headers["Vary"] = "Accept-Encoding"
+            variant = self._precompressed_variant(full_path, request_headers)
+
+        if variant is not None:
+            variant_path, variant_stat, encoding = variant
+            headers["Content-Encoding"] = encoding
+            response = FileResponse(
+                variant_path,
+                status_code=status_code,
+                headers=headers,
+                media_type=media_type,
+                stat_result=variant_stat,
+            )
+        else:
+            response = FileResponse(
+                full_path,
+                status_code=status_code,
+                headers=headers,
+                media_type=media_type,
+                stat_result=stat_result,
+            )
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
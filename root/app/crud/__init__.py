@@ -1,11 +1,23 @@
+import base64
+import json
+import time
 import uuid
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
 from app.auth.security import get_password_hash
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.serialization import project_all
+from app.crud import statements
 from app.models import models
 from app.schemas import schemas
-from sqlalchemy import and_, func, or_, select
+from app.services.schedule import WEEKDAYS
+from app.services.schedule import expand as expand_schedule
+from app.services.schedule import wall_clock
+from sqlalchemy import and_, func, literal, or_, select, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -70,6 +82,7 @@ async def create_user(db: AsyncSession, user_in: schemas.UserCreate):
         await db.rollback()
         raise ValueError("Ошибка создания пользователя")
 
+    users_count_cache.clear()
     await db.refresh(db_user)
 
     if code:
@@ -91,24 +104,14 @@ async def create_news(db: AsyncSession, news: schemas.NewsCreate):
 
 
 async def get_news_list(db: AsyncSession, skip: int = 0, limit: int = 10):
-    stmt = (
-        select(models.News)
-        .order_by(models.News.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    result = await db.execute(stmt)
+    result = await db.execute(statements.NEWS_PAGE, {"skip": skip, "limit": limit})
     return result.scalars().all()
 
 
 async def _attendance_counts(db: AsyncSession, event_ids: List[int]) -> Dict[int, int]:
     if not event_ids:
         return {}
-    rows = await db.execute(
-        select(models.EventAttendance.event_id, func.count(models.EventAttendance.id))
-        .where(models.EventAttendance.event_id.in_(event_ids))
-        .group_by(models.EventAttendance.event_id)
-    )
+    rows = await db.execute(statements.ATTENDANCE_COUNTS, {"event_ids": event_ids})
     return {eid: cnt for eid, cnt in rows.all()}
 
 
@@ -117,9 +120,7 @@ async def _files_by_event(
 ) -> Dict[int, List[models.EventFile]]:
     if not event_ids:
         return {}
-    rows = await db.execute(
-        select(models.EventFile).where(models.EventFile.event_id.in_(event_ids))
-    )
+    rows = await db.execute(statements.FILES_BY_EVENTS, {"event_ids": event_ids})
     files = rows.scalars().all()
     out: Dict[int, List[models.EventFile]] = {}
     for f in files:
@@ -163,11 +164,7 @@ async def get_all_events(
 
     registered_ids = set()
     if user_id:
-        reg_q = await db.execute(
-            select(models.EventAttendance.event_id).where(
-                models.EventAttendance.user_id == user_id
-            )
-        )
+        reg_q = await db.execute(statements.ATTENDED_EVENT_IDS, {"user_id": user_id})
         registered_ids = set(reg_q.scalars().all())
 
     result = []
@@ -267,13 +264,7 @@ async def unregister_attendance(
 
 async def get_my_events(db: AsyncSession, user_id: int):
     ids = (
-        (
-            await db.execute(
-                select(models.EventAttendance.event_id).where(
-                    models.EventAttendance.user_id == user_id
-                )
-            )
-        )
+        (await db.execute(statements.ATTENDED_EVENT_IDS, {"user_id": user_id}))
         .scalars()
         .all()
     )
@@ -312,38 +303,100 @@ async def get_my_events(db: AsyncSession, user_id: int):
     return result
 
 
-async def get_schedule_by_group(db: AsyncSession, group_id: int):
-    result = await db.execute(
-        select(models.Schedule)
-        .where(models.Schedule.group_id == group_id)
-        .order_by(models.Schedule.weekday, models.Schedule.start_time)
-    )
-    return result.scalars().all()
+# Расписание группы запрашивают все её студенты, а меняется оно редко.
+# Кешируем уже спроецированные в ScheduleOut списки по (группа, начало, конец)
+# и сбрасываем все записи группы при изменении её занятий. Кеш локален для
+# воркера, поэтому в остальных воркерах изменения видны через TTL.
+schedule_cache: TTLCache[tuple, list[dict]] = TTLCache(
+    ttl=settings.schedule_cache_seconds, maxsize=4096
+)
+# Поколение группы входит в ключ: загрузка, начатая до записи, кладёт
+# результат под старый ключ, и его никто больше не прочитает.
+_schedule_generations: Dict[int, int] = {}
+# Реплика может отставать от записи, а промах сразу после неё закешировал бы
+# старые занятия на весь TTL. Поэтому в течение TTL после изменения группы
+# кеш заполняется с основной базы.
+_schedule_written_at: Dict[int, float] = {}
+
+
+def invalidate_schedule(*group_ids: Optional[int]) -> None:
+    groups = {group_id for group_id in group_ids if group_id is not None}
+    now = time.monotonic()
+    for group_id in groups:
+        _schedule_generations[group_id] = _schedule_generations.get(group_id, 0) + 1
+        _schedule_written_at[group_id] = now
+    schedule_cache.discard(lambda key: key[0] in groups)
+
+
+async def _cached_schedule(
+    db: AsyncSession,
+    group_id: int,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    load: Callable[[AsyncSession], Awaitable[list[dict]]],
+) -> list[dict]:
+    async def _fill() -> list[dict]:
+        written_at = _schedule_written_at.get(group_id)
+        if written_at is None or time.monotonic() - written_at > schedule_cache.ttl:
+            return await load(db)
+        async with async_session() as primary:
+            return await load(primary)
+
+    key = (group_id, start, end, _schedule_generations.get(group_id, 0))
+    return await schedule_cache.get_or_set(key, _fill)
+
+
+async def get_schedule_by_group(db: AsyncSession, group_id: int) -> list[dict]:
+    async def _load(session: AsyncSession) -> list[dict]:
+        result = await session.execute(
+            statements.SCHEDULE_BY_GROUP, {"group_id": group_id}
+        )
+        return project_all(schemas.ScheduleOut, result.scalars())
+
+    return await _cached_schedule(db, group_id, None, None, _load)
+
+
+async def get_schedule_occurrences(
+    db: AsyncSession, group_id: int, start: datetime, end: datetime
+) -> list[dict]:
+    """Concrete lessons of ``group_id`` in ``[start, end)``, recurrences expanded."""
+
+    async def _load(session: AsyncSession) -> list[dict]:
+        result = await session.execute(
+            statements.SCHEDULE_IN_RANGE,
+            {
+                "group_id": group_id,
+                "range_start": start,
+                "range_end": end,
+                "range_start_date": start.date(),
+            },
+        )
+        return expand_schedule(result.scalars().all(), start, end)
+
+    return await _cached_schedule(db, group_id, start, end, _load)
 
 
 async def create_schedule(db: AsyncSession, data: schemas.ScheduleCreate):
-    start_time = (
-        data.start_time.replace(tzinfo=None)
-        if data.start_time.tzinfo
-        else data.start_time
-    )
-    end_time = (
-        data.end_time.replace(tzinfo=None) if data.end_time.tzinfo else data.end_time
-    )
+    start_time = wall_clock(data.start_time)
+    # День недели берём из начала занятия, как импорт: по нему напоминания
+    # отбирают повторяющиеся занятия, а переданное значение может не совпасть.
     record = models.Schedule(
         group_id=data.group_id,
         subject=data.subject,
         teacher=data.teacher,
         room=data.room,
-        weekday=data.weekday,
+        weekday=WEEKDAYS[start_time.weekday()],
         start_time=start_time,
-        end_time=end_time,
+        end_time=wall_clock(data.end_time),
         parity=getattr(data, "parity", "both"),
         lesson_type=getattr(data, "lesson_type", "Лекция"),
+        repeat_until=data.repeat_until,
+        exception_dates=data.exception_dates,
     )
     db.add(record)
     await db.commit()
     await db.refresh(record)
+    invalidate_schedule(record.group_id)
     return record
 
 
@@ -355,21 +408,117 @@ async def create_group(db: AsyncSession, data: schemas.GroupCreate):
     return group
 
 
+users_count_cache: TTLCache[tuple, int] = TTLCache(
+    ttl=settings.users_count_cache_seconds, maxsize=256
+)
+
+# Ключи сортировки справочника пользователей. NULL в full_name приводим к
+# пустой строке: keyset-сравнение по NULL не работает, а под это выражение
+# есть индекс ix_users_full_name_sort.
+USER_SORT_KEYS = {
+    "full_name": func.coalesce(models.User.full_name, ""),
+    "email": models.User.email,
+    "role": models.User.role,
+    "id": models.User.id,
+}
+
+
+def encode_users_cursor(sort: str, value, user_id: int) -> str:
+    raw = json.dumps([sort, value, user_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_users_cursor(cursor: str, sort: str) -> Optional[tuple]:
+    """``(value, user_id)`` of a cursor issued for ``sort``, else ``None``.
+
+    The value goes into the keyset comparison as a literal, so a cursor from
+    another sort order or a crafted one is rejected here rather than by the
+    database.
+    """
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, user_id = json.loads(raw)
+    except Exception:
+        return None
+    value_type = int if sort == "id" else str
+    if cursor_sort != sort or type(value) is not value_type or type(user_id) is not int:
+        return None
+    return value, user_id
+
+
+def _users_filters(
+    group_id: Optional[int],
+    full_name: Optional[str],
+    role: Optional[str],
+    search: Optional[str],
+) -> list:
+    where = []
+    if group_id:
+        where.append(models.User.group_id == group_id)
+    if full_name:
+        where.append(models.User.full_name.ilike(f"%{full_name}%"))
+    if search:
+        pattern = f"%{search}%"
+        where.append(
+            or_(models.User.full_name.ilike(pattern), models.User.email.ilike(pattern))
+        )
+    if role:
+        where.append(models.User.role == role)
+    return where
+
+
+async def count_users(
+    db: AsyncSession,
+    group_id: Optional[int] = None,
+    full_name: Optional[str] = None,
+    role: Optional[str] = None,
+    search: Optional[str] = None,
+) -> int:
+    """Number of matching users, cached for ``USERS_COUNT_CACHE_SECONDS``."""
+
+    where = _users_filters(group_id, full_name, role, search)
+
+    async def _count() -> int:
+        stmt = select(func.count(models.User.id)).where(*where)
+        return int((await db.execute(stmt)).scalar_one())
+
+    key = (group_id, full_name or None, role or None, search or None)
+    return await users_count_cache.get_or_set(key, _count)
+
+
 async def get_users(
     db: AsyncSession,
     group_id: Optional[int] = None,
     full_name: Optional[str] = None,
     role: Optional[str] = None,
-) -> List[models.User]:
-    stmt = select(models.User)
-    if group_id:
-        stmt = stmt.where(models.User.group_id == group_id)
-    if full_name:
-        stmt = stmt.where(models.User.full_name.ilike(f"%{full_name}%"))
-    if role:
-        stmt = stmt.where(models.User.role == role)
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    search: Optional[str] = None,
+    sort: str = "full_name",
+    descending: bool = False,
+    limit: int = 50,
+    cursor: Optional[tuple] = None,
+) -> tuple[List[models.User], Optional[str]]:
+    """One keyset page of users ordered by ``sort`` and id.
+
+    Returns the page and the cursor of the next one (None on the last page).
+    """
+
+    key = USER_SORT_KEYS[sort]
+    where = _users_filters(group_id, full_name, role, search)
+    if cursor is not None:
+        position = tuple_(key, models.User.id)
+        bound = tuple_(literal(cursor[0]), literal(cursor[1]))
+        where.append(position < bound if descending else position > bound)
+    order = (key.desc(), models.User.id.desc()) if descending else (key, models.User.id)
+    stmt = select(models.User).where(*where).order_by(*order).limit(limit + 1)
+    rows = list((await db.execute(stmt)).scalars().all())
+    users = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = users[-1]
+        value = (last.full_name or "") if sort == "full_name" else getattr(last, sort)
+        next_cursor = encode_users_cursor(sort, value, last.id)
+    return users, next_cursor
 
 
 async def admin_update_user(
@@ -381,6 +530,7 @@ async def admin_update_user(
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(user, field, value)
     await db.commit()
+    users_count_cache.clear()
     await db.refresh(user)
     return user
 
@@ -391,3 +541,4 @@ async def delete_user(db: AsyncSession, user_id: int):
         raise ValueError("Пользователь не найден")
     await db.delete(user)
     await db.commit()
+    users_count_cache.clear()
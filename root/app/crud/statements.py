@@ -0,0 +1,82 @@
+"""Prebuilt statements for the hottest queries.
+
+Each statement is built once at import with ``bindparam`` placeholders and
+executed as ``db.execute(STATEMENT, {...})``. Building a ``select()`` per
+call costs more Python time than running a short indexed query, and a
+constant statement also always hits SQLAlchemy's compiled-SQL cache.
+"""
+
+from app.models import models
+from sqlalchemy import and_, bindparam, desc, func, or_, select
+
+_Attendance = models.EventAttendance
+_Notification = models.Notification
+
+USER_BY_EMAIL = select(models.User).where(models.User.email == bindparam("email"))
+
+ATTENDED_EVENT_IDS = select(_Attendance.event_id).where(
+    _Attendance.user_id == bindparam("user_id")
+)
+
+ATTENDANCE_COUNTS = (
+    select(_Attendance.event_id, func.count(_Attendance.id))
+    .where(_Attendance.event_id.in_(bindparam("event_ids", expanding=True)))
+    .group_by(_Attendance.event_id)
+)
+
+FILES_BY_EVENTS = select(models.EventFile).where(
+    models.EventFile.event_id.in_(bindparam("event_ids", expanding=True))
+)
+
+SCHEDULE_BY_GROUP = (
+    select(models.Schedule)
+    .where(models.Schedule.group_id == bindparam("group_id"))
+    .order_by(models.Schedule.start_time, models.Schedule.id)
+)
+
+# Занятия группы, у которых может быть повторение в [range_start, range_end):
+# диапазон по (group_id, start_time) идёт по ix_schedule_group_start_time.
+SCHEDULE_IN_RANGE = select(models.Schedule).where(
+    models.Schedule.group_id == bindparam("group_id"),
+    models.Schedule.start_time < bindparam("range_end"),
+    or_(
+        models.Schedule.end_time > bindparam("range_start"),
+        models.Schedule.repeat_until >= bindparam("range_start_date"),
+    ),
+)
+
+NEWS_PAGE = (
+    select(models.News)
+    .order_by(models.News.created_at.desc())
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+_notifications_order = (desc(_Notification.created_at), desc(_Notification.id))
+
+NOTIFICATIONS_FIRST_PAGE = (
+    select(_Notification)
+    .where(_Notification.user_id == bindparam("user_id"))
+    .order_by(*_notifications_order)
+    .limit(bindparam("limit"))
+)
+
+NOTIFICATIONS_AFTER_CURSOR = (
+    select(_Notification)
+    .where(
+        _Notification.user_id == bindparam("user_id"),
+        or_(
+            _Notification.created_at < bindparam("cursor_at"),
+            and_(
+                _Notification.created_at == bindparam("cursor_at"),
+                _Notification.id < bindparam("cursor_id"),
+            ),
+        ),
+    )
+    .order_by(*_notifications_order)
+    .limit(bindparam("limit"))
+)
+
+UNREAD_NOTIFICATIONS_COUNT = select(func.count(_Notification.id)).where(
+    _Notification.user_id == bindparam("user_id"), _Notification.read.is_(False)
+)
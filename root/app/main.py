@@ -2,19 +2,38 @@ from __future__ import annotations
 
 from contextlib import asynccontextmanager
 
+from app.api.calendar import router as calendar_router
+from app.api.debug import router as debug_router
+from app.api.exports import router as exports_router
+from app.api.imports import router as imports_router
 from app.api.notifications import router as notifications_router
 from app.api.push import router as push_router
 from app.api.routes import router as main_router
 from app.api.spotify import router as spotify_router
 from app.auth.auth import router as auth_router
 from app.core.config import settings
-from app.core.database import Base, engine, wait_db
+from app.core.database import Base, engine, read_engine, wait_db
+from app.core.http import close_http_client, get_http_client
+from app.core.loop_monitor import start_loop_monitor
+from app.core.metrics import (
+    PrometheusMiddleware,
+    instrument_engine,
+    mark_process_dead,
+    metrics_endpoint,
+)
 from app.core.observability import configure_observability, shutdown_observability
+from app.core.profiler import RequestProfilerMiddleware
+from app.core.query_stats import QueryStatsMiddleware, instrument_query_stats
 from app.core.security_headers import SecurityHeadersMiddleware
+from app.core.serialization import FastJSONResponse
+from app.core.static_files import CachedStaticFiles
+from app.services.mail import start_mail_outbox_worker
 from app.services.notifications import start_notifications_scheduler
+from app.services.spotify import start_spotify_presence_poller
+from app.services.user_import import shutdown_hash_pool
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 from sqlalchemy import text
 
 try:
@@ -29,16 +48,45 @@ async def lifespan(app: FastAPI):
     if settings.auto_create_schema:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+    get_http_client()
+    stop_loop_monitor = await start_loop_monitor()
     stop_scheduler = await start_notifications_scheduler()
+    stop_mail_worker = await start_mail_outbox_worker()
+    stop_presence_poller = await start_spotify_presence_poller()
     try:
         yield
     finally:
+        if stop_presence_poller is not None:
+            await stop_presence_poller()
+        await stop_mail_worker()
         if stop_scheduler is not None:
             await stop_scheduler()
+        await close_http_client()
+        shutdown_hash_pool()
+        if stop_loop_monitor is not None:
+            await stop_loop_monitor()
         shutdown_observability()
+        mark_process_dead()
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=(
+        FastJSONResponse if settings.fast_json_enabled else JSONResponse
+    ),
+)
 
+# QueryStatsMiddleware добавляется раньше CorrelationIdMiddleware, чтобы
+# оказаться внутри неё и логировать с request id.
+if settings.query_stats_enabled:
+    instrument_query_stats(engine)
+    if read_engine is not engine:
+        instrument_query_stats(read_engine)
+    app.add_middleware(
+        QueryStatsMiddleware, warn_threshold=settings.request_query_warn_threshold
+    )
 
-app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestProfilerMiddleware)
 
 configure_observability(app, engine=engine)
 
@@ -58,9 +106,23 @@ if ProxyHeadersMiddleware:
     if trusted_hosts:
         app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=trusted_hosts)
 
+if settings.metrics_enabled:
+    instrument_engine(engine)
+    if read_engine is not engine:
+        instrument_engine(read_engine, name="replica")
+    app.add_middleware(PrometheusMiddleware, skip_paths=(settings.metrics_path,))
+    app.add_route(settings.metrics_path, metrics_endpoint, include_in_schema=False)
+
 static_dir = settings.static_dir_path
 static_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+app.mount(
+    "/static",
+    CachedStaticFiles(
+        directory=str(static_dir),
+        immutable_max_age=settings.static_immutable_max_age,
+    ),
+    name="static",
+)
 
 
 @app.get("/")
@@ -85,4 +147,8 @@ app.include_router(auth_router)
 app.include_router(spotify_router)
 app.include_router(notifications_router)
 app.include_router(push_router)
+app.include_router(debug_router)
+app.include_router(exports_router)
+app.include_router(imports_router)
+app.include_router(calendar_router)
 app.include_router(main_router)
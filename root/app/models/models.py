@@ -3,9 +3,11 @@ import secrets
 
 from app.core.database import Base
 from sqlalchemy import (
+    JSON,
     Boolean,
     CheckConstraint,
     Column,
+    Date,
     DateTime,
     ForeignKey,
     Index,
@@ -13,8 +15,27 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    func,
 )
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
+
+
+class DateList(TypeDecorator):
+    """List of dates stored as a JSON array of ISO strings."""
+
+    impl = JSON
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return sorted({d.isoformat() for d in value})
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return []
+        return [datetime.date.fromisoformat(d) for d in value]
 
 
 class User(Base):
@@ -51,14 +72,8 @@ class User(Base):
     spotify_scope = Column(String)
     spotify_display_name = Column(String)
     spotify_is_connected = Column(Boolean, default=False, index=True)
-    spotify_is_playing = Column(Boolean, default=False, index=True)
-    spotify_last_checked_at = Column(DateTime, index=True)
-    spotify_last_track_id = Column(String, index=True)
-    spotify_last_track_name = Column(String)
-    spotify_last_artist_name = Column(String)
-    spotify_last_album_name = Column(String)
-    spotify_last_track_url = Column(String)
-    spotify_last_album_image_url = Column(String)
+    # sha256 токена из ссылок на .ics-ленты; сам токен показывается один раз
+    calendar_token_hash = Column(String, unique=True, index=True)
 
     group = relationship("Group", back_populates="students", passive_deletes=True)
     notifications = relationship(
@@ -73,11 +88,36 @@ class User(Base):
         passive_deletes=True,
     )
 
+    # Триграммные GIN-индексы для поиска по full_name/email создаёт миграция
+    # f3a9c1d7e5b2: им нужно расширение pg_trgm, которого нет в SQLite.
+    __table_args__ = (
+        Index("ix_users_full_name_sort", func.coalesce(full_name, ""), "id"),
+        Index("ix_users_role_sort", "role", "id"),
+    )
+
     @property
     def spotify_connected(self) -> bool:
         return bool(self.spotify_is_connected)
 
 
+# Частые обновления now-playing пишут в узкую таблицу без вторичных индексов,
+# а не в широкую строку users, которую читает каждый запрос.
+class SpotifyPresence(Base):
+    __tablename__ = "spotify_presence"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    is_playing = Column(Boolean, nullable=False, default=False)
+    checked_at = Column(DateTime)
+    track_id = Column(String)
+    track_name = Column(String)
+    artist_name = Column(String)
+    album_name = Column(String)
+    track_url = Column(String)
+    album_image_url = Column(String)
+
+
 class Group(Base):
     __tablename__ = "groups"
 
@@ -104,10 +144,20 @@ class Schedule(Base):
     end_time = Column(DateTime, index=True, nullable=False)
     parity = Column(String, default="both", index=True)
     lesson_type = Column(String, default="Лекция")
+    # Повторение: без repeat_until занятие разовое (в день start_time), иначе
+    # оно идёт каждую неделю (или через неделю по parity) до repeat_until
+    # включительно, кроме дат из exception_dates.
+    repeat_until = Column(Date)
+    exception_dates = Column(DateList, default=list)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
 
     __table_args__ = (
         CheckConstraint("end_time > start_time", name="ck_schedule_time_order"),
         Index("ix_schedule_group_start_time", "group_id", "start_time"),
+        # ETag .ics-ленты группы считается по этому индексу, не трогая таблицу
+        Index("ix_schedule_group_updated_at", "group_id", "updated_at"),
     )
 
 
@@ -129,6 +179,9 @@ class Event(Base):
     speaker = Column(String)
     image_url = Column(String)
     about = Column(Text)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
 
 
 class EventAttendance(Base):
@@ -205,6 +258,28 @@ class PasswordResetToken(Base):
         return secrets.token_urlsafe(32)
 
 
+class MailOutbox(Base):
+    __tablename__ = "mail_outbox"
+
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String, nullable=False)
+    kind = Column(String, nullable=False, default="generic")
+    subject = Column(String, nullable=False)
+    body_text = Column(Text)
+    body_html = Column(Text)
+    status = Column(String, nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_mail_outbox_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_mail_outbox_dedupe", "to_email", "kind", "created_at"),
+    )
+
+
 class Notification(Base):
     __tablename__ = "notifications"
 
@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
@@ -55,6 +55,42 @@ class UserOut(OrmModel, UserBase):
     spotify_is_connected: Optional[bool] = None
 
 
+class UsersPageOut(BaseModel):
+    items: List[UserOut]
+    next_cursor: Optional[str] = None
+    total: int
+
+
+class UserImportRow(BaseModel):
+    email: EmailStr
+    full_name: Optional[str] = None
+    role: Literal["student", "teacher"] = "student"
+    group_id: Optional[int] = None
+    record_book_number: Optional[str] = None
+    institute: Optional[str] = None
+    course: Optional[str] = None
+    education_level: Optional[str] = None
+    program: Optional[str] = None
+    department: Optional[str] = None
+    position: Optional[str] = None
+    password: Optional[str] = None
+
+
+class ImportRowError(BaseModel):
+    row: int
+    key: Optional[str] = None
+    error: str
+
+
+class UserImportResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    activation_sent: int = 0
+    dry_run: bool = False
+    errors: List[ImportRowError] = Field(default_factory=list)
+
+
 class UserAdminUpdate(BaseModel):
     full_name: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -102,6 +138,8 @@ class ScheduleBase(BaseModel):
     end_time: datetime
     parity: Optional[str] = "both"
     lesson_type: Optional[str] = "Лекция"
+    repeat_until: Optional[date] = None
+    exception_dates: List[date] = Field(default_factory=list)
 
 
 class ScheduleCreate(ScheduleBase):
@@ -118,12 +156,35 @@ class ScheduleUpdate(BaseModel):
     end_time: Optional[datetime] = None
     parity: Optional[str] = None
     lesson_type: Optional[str] = None
+    repeat_until: Optional[date] = None
+    exception_dates: Optional[List[date]] = None
 
 
 class ScheduleOut(OrmModel, ScheduleBase):
     id: int
 
 
+class ScheduleWeekOut(BaseModel):
+    week_start: date
+    week_end: date
+    parity: str
+    lessons: List[ScheduleOut]
+
+
+class CalendarFeedsOut(BaseModel):
+    group_url: Optional[str] = None
+    events_url: str
+
+
+class ScheduleImportResult(BaseModel):
+    groups: List[int] = Field(default_factory=list)
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    dry_run: bool = False
+
+
 class NewsCreate(BaseModel):
     title: str
     content: str
@@ -198,6 +259,27 @@ class EventAttendanceOut(OrmModel):
     qr_code: Optional[str] = None
 
 
+class UploadPresignIn(BaseModel):
+    kind: Literal["avatar", "cover", "event_image", "news_image", "event_file"]
+    content_type: str
+    size: int = Field(..., gt=0)
+    filename: Optional[str] = None
+    event_id: Optional[int] = None
+
+
+class UploadPresignOut(BaseModel):
+    key: str
+    url: str
+    method: str
+    headers: Dict[str, str] = Field(default_factory=dict)
+    public_url: str
+    expires_in: int
+
+
+class UploadCommitIn(BaseModel):
+    key: str
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
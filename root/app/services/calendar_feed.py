@@ -0,0 +1,251 @@
+"""iCalendar feeds of group timetables and of a user's registered events.
+
+Calendar clients poll a feed every few minutes. Each feed has a version:
+the row count plus the latest ``updated_at`` of its rows, read with one
+aggregate over an index. The version becomes the ETag, so a poll that
+finds nothing new is answered with 304 without reading the lessons.
+Full feeds are written batch by batch as rows arrive from the database.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+from app.core.database import async_read_session
+from app.models.models import Event, EventAttendance, Group, Schedule
+from app.services.schedule import week_parity
+from app.utils.icalendar import (
+    END_CALENDAR,
+    begin_calendar,
+    content_line,
+    escape,
+    format_datetime,
+    format_utc,
+    vevent,
+)
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Меняется вместе с форматом ленты, чтобы клиенты не получили 304 на старый.
+FEED_FORMAT = 2
+
+_WEEK = dt.timedelta(weeks=1)
+
+
+@dataclass(frozen=True)
+class FeedVersion:
+    etag: str
+    last_modified: Optional[dt.datetime]  # naive UTC
+
+
+def _feed_version(
+    kind: str, key: int, count: int, *stamps: Optional[dt.datetime]
+) -> FeedVersion:
+    known = [stamp for stamp in stamps if stamp is not None]
+    # Количество строк в ETag ловит удаления: max(updated_at) от них не меняется.
+    # Год тоже входит в ETag: от него зависит окно переходов в VTIMEZONE.
+    year = str(dt.date.today().year)
+    raw = ":".join(
+        [str(FEED_FORMAT), kind, str(key), str(count), settings.schedule_timezone, year]
+        + [stamp.isoformat() if stamp else "-" for stamp in stamps]
+    )
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    return FeedVersion(f'"{digest}"', max(known) if known else None)
+
+
+async def group_feed_version(
+    db: AsyncSession, group_id: int
+) -> Optional[tuple[str, FeedVersion]]:
+    """Name and feed version of the group, ``None`` if it does not exist."""
+
+    in_group = Schedule.group_id == group_id
+    count = select(func.count(Schedule.id)).where(in_group).scalar_subquery()
+    updated_at = select(func.max(Schedule.updated_at)).where(in_group)
+    row = (
+        await db.execute(
+            select(Group.name, count, updated_at.scalar_subquery()).where(
+                Group.id == group_id
+            )
+        )
+    ).first()
+    if row is None:
+        return None
+    name, count, updated_at = row
+    return name or str(group_id), _feed_version("group", group_id, count, updated_at)
+
+
+def _registered_events(user_id: int) -> Select:
+    return (
+        select(
+            Event.id,
+            Event.title,
+            Event.description,
+            Event.location,
+            Event.starts_at,
+            Event.ends_at,
+            Event.updated_at,
+        )
+        .join(EventAttendance, EventAttendance.event_id == Event.id)
+        .where(EventAttendance.user_id == user_id, Event.is_active.is_not(False))
+    )
+
+
+async def user_feed_version(db: AsyncSession, user_id: int) -> FeedVersion:
+    count, registered_at, updated_at = (
+        await db.execute(
+            select(
+                func.count(EventAttendance.id),
+                func.max(EventAttendance.registered_at),
+                func.max(Event.updated_at),
+            )
+            .join(Event, Event.id == EventAttendance.event_id)
+            .where(EventAttendance.user_id == user_id, Event.is_active.is_not(False))
+        )
+    ).one()
+    return _feed_version("user", user_id, count, registered_at, updated_at)
+
+
+def _uid(kind: str, key: int) -> str:
+    return f"{kind}-{key}@{urlparse(settings.app_base_url).hostname or 'localhost'}"
+
+
+def _stamp_lines(updated_at: Optional[dt.datetime]) -> list[str]:
+    stamp = format_utc(updated_at or dt.datetime.utcnow())
+    return [content_line("DTSTAMP", stamp), content_line("LAST-MODIFIED", stamp)]
+
+
+def _text_lines(**fields: Optional[str]) -> list[str]:
+    return [
+        content_line(name.upper(), escape(value))
+        for name, value in fields.items()
+        if value
+    ]
+
+
+def _recurrence(
+    lesson: Any,
+) -> Optional[tuple[dt.datetime, int, list[dt.datetime]]]:
+    """First occurrence, RRULE interval and skipped starts of a weekly lesson.
+
+    ``INTERVAL=2`` matches ISO week parity only until a year with 53 weeks,
+    where two odd weeks follow each other; then the lesson is written as
+    weekly with the off-parity weeks excluded.
+    """
+
+    weeks = []
+    start = lesson.start_time
+    while start.date() <= lesson.repeat_until:
+        weeks.append(start)
+        start += _WEEK
+    parity = lesson.parity if lesson.parity in ("odd", "even") else None
+    if parity is None:
+        return (weeks[0], 1, []) if weeks else None
+    first = next((w for w in weeks if week_parity(w.date()) == parity), None)
+    if first is None:
+        return None
+    weeks = weeks[weeks.index(first) :]
+    off = [w for w in weeks if week_parity(w.date()) != parity]
+    if off == weeks[1::2]:
+        return first, 2, []
+    return first, 1, off
+
+
+def lesson_event(lesson: Any, tz: ZoneInfo) -> str:
+    """``VEVENT`` of a stored lesson; an empty string if it never occurs."""
+
+    start, interval, skipped = lesson.start_time, 1, []
+    if lesson.repeat_until is not None:
+        recurrence = _recurrence(lesson)
+        if recurrence is None:
+            return ""
+        start, interval, skipped = recurrence
+    end = start + (lesson.end_time - lesson.start_time)
+    tzid = settings.schedule_timezone
+    lines = [
+        content_line("UID", _uid("lesson", lesson.id)),
+        *_stamp_lines(lesson.updated_at),
+        content_line("DTSTART", format_datetime(start), tzid=tzid),
+        content_line("DTEND", format_datetime(end), tzid=tzid),
+        *_text_lines(
+            summary=lesson.subject,
+            location=lesson.room,
+            description="\n".join(
+                part for part in (lesson.lesson_type, lesson.teacher) if part
+            ),
+        ),
+    ]
+    if lesson.repeat_until is not None:
+        until = dt.datetime.combine(lesson.repeat_until, dt.time(23, 59, 59))
+        until = until.replace(tzinfo=tz).astimezone(dt.timezone.utc)
+        lines.append(
+            content_line(
+                "RRULE",
+                f"FREQ=WEEKLY;INTERVAL={interval};UNTIL={format_utc(until)}",
+            )
+        )
+        excluded = sorted(
+            {*skipped}
+            | {
+                dt.datetime.combine(day, start.time())
+                for day in lesson.exception_dates or ()
+            }
+        )
+        if excluded:
+            lines.append(
+                content_line(
+                    "EXDATE", ",".join(map(format_datetime, excluded)), tzid=tzid
+                )
+            )
+    return vevent(*lines)
+
+
+def attended_event(event: Any, tz: ZoneInfo) -> str:
+    tzid = settings.schedule_timezone
+    return vevent(
+        content_line("UID", _uid("event", event.id)),
+        *_stamp_lines(event.updated_at),
+        content_line("DTSTART", format_datetime(event.starts_at), tzid=tzid),
+        content_line("DTEND", format_datetime(event.ends_at), tzid=tzid),
+        *_text_lines(
+            summary=event.title,
+            location=event.location,
+            description=event.description,
+        ),
+    )
+
+
+async def _iter_feed(
+    name: str, stmt: Select, render: Callable[[Any, ZoneInfo], str]
+) -> AsyncIterator[bytes]:
+    tz = ZoneInfo(settings.schedule_timezone)
+    header = begin_calendar(name, settings.schedule_timezone, dt.date.today().year)
+    yield header.encode("utf-8")
+    # Как и в выгрузках, сессия живёт внутри генератора и читает курсором.
+    async with async_read_session() as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=settings.export_batch_size)
+        )
+        async for partition in result.partitions():
+            yield "".join(render(row, tz) for row in partition).encode("utf-8")
+    yield END_CALENDAR.encode("utf-8")
+
+
+def iter_group_feed(group_id: int, group_name: str) -> AsyncIterator[bytes]:
+    stmt = (
+        select(*Schedule.__table__.columns)
+        .where(Schedule.group_id == group_id)
+        .order_by(Schedule.start_time, Schedule.id)
+    )
+    return _iter_feed(f"Расписание {group_name}", stmt, lesson_event)
+
+
+def iter_user_feed(user_id: int) -> AsyncIterator[bytes]:
+    stmt = _registered_events(user_id).order_by(Event.starts_at, Event.id)
+    return _iter_feed("Мои мероприятия", stmt, attended_event)
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import ssl
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from email.message import EmailMessage
+from typing import Optional
+
+import aiosmtplib
+from app.core.config import settings
+from app.core.database import async_session
+from app.models.models import MailOutbox
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Время, на которое воркер «захватывает» письмо; если процесс упадёт посреди
+# отправки, письмо снова станет доступно другим воркерам после истечения аренды.
+CLAIM_LEASE_SECONDS = 120
+
+_wakeup: asyncio.Event | None = None
+
+
+def _utcnow() -> dt.datetime:
+    return dt.datetime.utcnow()
+
+
+def _smtp_security() -> str:
+    return (
+        settings.smtp_security or ("starttls" if settings.smtp_starttls else "none")
+    ).lower()
+
+
+def build_message(row: MailOutbox) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = row.subject
+    msg["From"] = settings.mail_from or "no-reply@example.com"
+    msg["To"] = row.to_email
+    msg.set_content(row.body_text or "")
+    if row.body_html:
+        msg.add_alternative(row.body_html, subtype="html")
+    return msg
+
+
+async def enqueue_mail(
+    db: AsyncSession,
+    *,
+    to_email: str,
+    subject: str,
+    text: str,
+    html: Optional[str] = None,
+    kind: str = "generic",
+) -> MailOutbox:
+    """Add a message to the outbox; it is sent once the caller commits."""
+
+    row = MailOutbox(
+        to_email=to_email,
+        kind=kind,
+        subject=subject,
+        body_text=text,
+        body_html=html,
+        status="pending",
+        attempts=0,
+        next_attempt_at=_utcnow(),
+    )
+    db.add(row)
+    return row
+
+
+async def recently_enqueued(
+    db: AsyncSession, *, to_email: str, kind: str, window_seconds: int
+) -> bool:
+    if window_seconds <= 0:
+        return False
+    since = _utcnow() - dt.timedelta(seconds=window_seconds)
+    q = select(func.count(MailOutbox.id)).where(
+        and_(
+            MailOutbox.to_email == to_email,
+            MailOutbox.kind == kind,
+            MailOutbox.created_at >= since,
+            MailOutbox.status != "failed",
+        )
+    )
+    return bool((await db.execute(q)).scalar_one())
+
+
+def wake_mail_sender() -> None:
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP connections open between batches."""
+
+    def __init__(self, *, size: int = 2, idle_timeout: float = 30.0) -> None:
+        self._size = max(1, size)
+        self._idle_timeout = idle_timeout
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(self._size)
+
+    def _new_client(self) -> aiosmtplib.SMTP:
+        security = _smtp_security()
+        return aiosmtplib.SMTP(
+            hostname=settings.smtp_host,
+            port=int(settings.smtp_port),
+            username=settings.smtp_user or None,
+            password=settings.smtp_password or None,
+            use_tls=security == "ssl",
+            start_tls=security == "starttls",
+            tls_context=ssl.create_default_context(),
+            timeout=10,
+        )
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        now = time.monotonic()
+        while self._idle:
+            client, released_at = self._idle.pop()
+            if client.is_connected and now - released_at < self._idle_timeout:
+                return client
+            await self._discard(client)
+        client = self._new_client()
+        await client.connect()
+        return client
+
+    async def _discard(self, client: aiosmtplib.SMTP) -> None:
+        try:
+            if client.is_connected:
+                await client.quit()
+        except Exception:
+            client.close()
+
+    async def _send_chunk(
+        self, messages: Sequence[EmailMessage]
+    ) -> list[Exception | None]:
+        """Send ``messages`` over one connection; never raises.
+
+        If the connection breaks, the messages not yet accepted get the
+        error, while the ones already sent keep ``None``. A retry of the
+        batch then does not send them twice.
+        """
+
+        results: list[Exception | None] = []
+        async with self._slots:
+            client: aiosmtplib.SMTP | None = None
+            try:
+                client = await self._checkout()
+                for msg in messages:
+                    try:
+                        await client.send_message(msg)
+                    except aiosmtplib.SMTPServerDisconnected:
+                        await self._discard(client)
+                        client = self._new_client()
+                        await client.connect()
+                        try:
+                            await client.send_message(msg)
+                        except aiosmtplib.SMTPException as exc:
+                            results.append(exc)
+                            continue
+                    except aiosmtplib.SMTPException as exc:
+                        results.append(exc)
+                        continue
+                    results.append(None)
+            except Exception as exc:
+                if client is not None:
+                    await self._discard(client)
+                return results + [exc] * (len(messages) - len(results))
+            self._idle.append((client, time.monotonic()))
+            return results
+
+    async def send(self, messages: Sequence[EmailMessage]) -> list[Exception | None]:
+        """Spread a batch over the pooled connections and send it."""
+
+        chunk = -(-len(messages) // self._size) or 1
+        parts = [messages[i : i + chunk] for i in range(0, len(messages), chunk)]
+        sent = await asyncio.gather(*(self._send_chunk(p) for p in parts))
+        return [result for part in sent for result in part]
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for client, _ in idle:
+            await self._discard(client)
+
+
+MailSender = Callable[[Sequence[EmailMessage]], Awaitable[list[Exception | None]]]
+
+
+async def _log_only_sender(messages: Sequence[EmailMessage]) -> list[Exception | None]:
+    for msg in messages:
+        logger.warning("SMTP is not configured; mail to %s not sent", msg["To"])
+        logger.info("[EMAIL_FALLBACK] %s\n%s", msg["To"], msg.get_body(("plain",)))
+    return [None] * len(messages)
+
+
+def _backoff(attempts: int) -> dt.timedelta:
+    base = max(1, settings.mail_retry_base_seconds)
+    return dt.timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 3600))
+
+
+async def _claim_batch(db: AsyncSession, limit: int) -> list[MailOutbox]:
+    now = _utcnow()
+    q = (
+        select(MailOutbox)
+        .where(and_(MailOutbox.status == "pending", MailOutbox.next_attempt_at <= now))
+        .order_by(MailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = list((await db.execute(q)).scalars().all())
+    if not rows:
+        await db.rollback()
+        return []
+    lease_until = now + dt.timedelta(seconds=CLAIM_LEASE_SECONDS)
+    for row in rows:
+        row.attempts = (row.attempts or 0) + 1
+        row.next_attempt_at = lease_until
+    await db.commit()
+    return rows
+
+
+async def process_outbox_batch(
+    db: AsyncSession, sender: MailSender, *, limit: Optional[int] = None
+) -> int:
+    """Send one batch of due messages. Returns the number of claimed rows."""
+
+    rows = await _claim_batch(db, limit or settings.mail_batch_size)
+    if not rows:
+        return 0
+    try:
+        results = await sender([build_message(r) for r in rows])
+    except Exception as exc:  # connection or auth failure: whole batch retries
+        results = [exc] * len(rows)
+
+    now = _utcnow()
+    for row, error in zip(rows, results):
+        if error is None:
+            row.status = "sent"
+            row.sent_at = now
+            row.last_error = None
+        elif row.attempts >= settings.mail_max_attempts:
+            row.status = "failed"
+            row.last_error = str(error)[:1000]
+            logger.error("Giving up on mail #%s to %s: %s", row.id, row.to_email, error)
+        else:
+            row.next_attempt_at = now + _backoff(row.attempts)
+            row.last_error = str(error)[:1000]
+            continue
+        # письма со ссылками сброса не храним дольше, чем нужно для отправки
+        row.body_text = None
+        row.body_html = None
+    await db.commit()
+    return len(rows)
+
+
+async def _outbox_loop(sender: MailSender, poll_seconds: float) -> None:
+    assert _wakeup is not None
+    while True:
+        try:
+            async with async_session() as db:
+                while await process_outbox_batch(db, sender):
+                    pass
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Mail outbox iteration failed")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+async def start_mail_outbox_worker(
+    *, poll_seconds: Optional[float] = None
+) -> Callable[[], Awaitable[None]]:
+    """Start the outbox sender task and return a stopper."""
+
+    global _wakeup
+    _wakeup = asyncio.Event()
+    pool: SMTPConnectionPool | None = None
+    sender: MailSender = _log_only_sender
+    if settings.smtp_host and settings.smtp_port:
+        pool = SMTPConnectionPool(
+            size=settings.smtp_pool_size,
+            idle_timeout=settings.smtp_idle_timeout_seconds,
+        )
+        sender = pool.send
+
+    task = asyncio.get_running_loop().create_task(
+        _outbox_loop(sender, poll_seconds or settings.mail_poll_seconds)
+    )
+
+    async def _stop() -> None:
+        global _wakeup
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        if pool is not None:
+            await pool.close()
+        _wakeup = None
+
+    return _stop
@@ -1,12 +1,16 @@
 import asyncio
 import datetime as dt
+from types import SimpleNamespace
 from typing import Awaitable, Callable, Optional, Sequence
+from zoneinfo import ZoneInfo
 
 from app.core.config import settings
 from app.core.database import async_session
 from app.models.models import Notification, PushSubscription, Schedule, User
+from app.services.schedule import WEEKDAYS
+from app.services.schedule import expand as expand_schedule
 from app.services.webpush import send_web_push
-from sqlalchemy import and_, insert, select
+from sqlalchemy import and_, insert, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -66,16 +70,31 @@ async def create_notifications_for_users(
 async def generate_schedule_reminders(
     db: AsyncSession, *, window_minutes: int = 6
 ) -> int:
-    now = dt.datetime.utcnow()
+    # Занятия хранятся по местному времени SCHEDULE_TIMEZONE, уведомления — в UTC.
+    now = dt.datetime.now(ZoneInfo(settings.schedule_timezone)).replace(tzinfo=None)
     soon = now + dt.timedelta(minutes=window_minutes)
+    # разовые занятия — по start_time, повторяющиеся — по дню недели
     q = select(Schedule).where(
-        and_(Schedule.start_time >= now, Schedule.start_time <= soon)
+        Schedule.start_time <= soon,
+        or_(
+            and_(Schedule.repeat_until.is_(None), Schedule.start_time >= now),
+            and_(
+                Schedule.repeat_until >= now.date(),
+                Schedule.weekday.in_(
+                    {WEEKDAYS[now.weekday()], WEEKDAYS[soon.weekday()]}
+                ),
+            ),
+        ),
     )
-    rows = (await db.execute(q)).scalars().all()
-    if not rows:
+    lessons = (await db.execute(q)).scalars().all()
+    occurrences = expand_schedule(lessons, now, soon + dt.timedelta(microseconds=1))
+    if not occurrences:
         return 0
     total_created = 0
-    for sch in rows:
+    for occurrence in occurrences:
+        sch = SimpleNamespace(**occurrence)
+        if sch.start_time < now:
+            continue
         title = f"Скоро пара: {sch.subject}"
         time_str = sch.start_time.strftime("%H:%M")
         body = f"{sch.lesson_type or ''} в {sch.room or 'ауд.'}, начало в {time_str}"
@@ -86,7 +105,7 @@ async def generate_schedule_reminders(
         )
         if not uids_all:
             continue
-        dup_since = now - dt.timedelta(minutes=30)
+        dup_since = dt.datetime.utcnow() - dt.timedelta(minutes=30)
         existing_q = (
             select(Notification.user_id)
             .where(
@@ -0,0 +1,118 @@
+"""Recurring lessons and their expansion into concrete occurrences.
+
+A ``Schedule`` row is stored once per lesson slot: ``start_time`` and
+``end_time`` give the first occurrence. If ``repeat_until`` is set, the
+lesson repeats every week up to and including that date (only in odd or
+even ISO weeks when ``parity`` says so), skipping ``exception_dates``.
+Occurrences are computed on the fly for the requested range and never
+stored.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from collections.abc import Iterable, Iterator
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+
+WEEKDAYS = (
+    "Понедельник",
+    "Вторник",
+    "Среда",
+    "Четверг",
+    "Пятница",
+    "Суббота",
+    "Воскресенье",
+)
+
+_WEEK = dt.timedelta(weeks=1)
+
+OCCURRENCE_FIELDS = (
+    "id",
+    "group_id",
+    "subject",
+    "teacher",
+    "room",
+    "weekday",
+    "parity",
+    "lesson_type",
+    "repeat_until",
+    "exception_dates",
+)
+
+
+def wall_clock(value: dt.datetime) -> dt.datetime:
+    """``value`` as naive wall-clock time in ``SCHEDULE_TIMEZONE``.
+
+    Lessons are stored this way; naive values are taken as already local.
+    """
+
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(ZoneInfo(settings.schedule_timezone)).replace(tzinfo=None)
+
+
+def week_parity(day: dt.date) -> str:
+    """``odd``/``even`` by the ISO week number of ``day``."""
+
+    return "odd" if day.isocalendar().week % 2 else "even"
+
+
+def iter_occurrences(
+    lesson: Any, start: dt.datetime, end: dt.datetime
+) -> Iterator[tuple[dt.datetime, dt.datetime]]:
+    """Yield ``(starts_at, ends_at)`` of ``lesson`` overlapping ``[start, end)``."""
+
+    first_start, first_end = lesson.start_time, lesson.end_time
+    duration = first_end - first_start
+    if lesson.repeat_until is None:
+        if first_start < end and first_end > start:
+            yield first_start, first_end
+        return
+    last_day = min(lesson.repeat_until, (end - dt.timedelta(microseconds=1)).date())
+    # сразу перескакиваем к первой неделе, пересекающейся с диапазоном
+    skip = max(0, (start - duration - first_start) // _WEEK)
+    occurrence = first_start + skip * _WEEK
+    parity = lesson.parity if lesson.parity in ("odd", "even") else None
+    exceptions = set(lesson.exception_dates or ())
+    while occurrence.date() <= last_day:
+        ends_at = occurrence + duration
+        if (
+            ends_at > start
+            and occurrence < end
+            and (parity is None or week_parity(occurrence.date()) == parity)
+            and occurrence.date() not in exceptions
+        ):
+            yield occurrence, ends_at
+        occurrence += _WEEK
+
+
+def expand(
+    lessons: Iterable[Any], start: dt.datetime, end: dt.datetime
+) -> list[dict[str, Any]]:
+    """Occurrences of ``lessons`` in ``[start, end)`` sorted by start time.
+
+    Each occurrence is a plain dict with the lesson's fields and the
+    concrete ``start_time``/``end_time``, ready for ``ScheduleOut``.
+    """
+
+    occurrences = []
+    for lesson in lessons:
+        base = None
+        for starts_at, ends_at in iter_occurrences(lesson, start, end):
+            if base is None:
+                base = {name: getattr(lesson, name) for name in OCCURRENCE_FIELDS}
+                base["parity"] = base["parity"] or "both"
+                base["exception_dates"] = base["exception_dates"] or []
+            occurrences.append(
+                {
+                    **base,
+                    "weekday": WEEKDAYS[starts_at.weekday()],
+                    "start_time": starts_at,
+                    "end_time": ends_at,
+                }
+            )
+    occurrences.sort(key=lambda o: (o["start_time"], o["id"]))
+    return occurrences
@@ -0,0 +1,346 @@
+"""Bulk timetable import: diff an uploaded schedule against the database.
+
+The upload (JSON, CSV/XLSX or iCalendar) defines the complete timetable of
+every group it mentions, optionally limited to a semester window. Existing
+lessons of those groups are matched by ``(group, start, parity)``. Matches
+with different details are updated, unmatched uploads are inserted and
+unmatched existing lessons are deleted. All of it goes through a handful of
+batched statements in one transaction.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+from collections.abc import Iterable, Iterator
+from typing import IO, Any
+from zoneinfo import ZoneInfo
+
+from app import crud
+from app.core.config import settings
+from app.models.models import Group, Schedule
+from app.schemas.schemas import ImportRowError, ScheduleCreate, ScheduleImportResult
+from app.services.schedule import WEEKDAYS, wall_clock, week_parity
+from app.utils.icalendar import (
+    Property,
+    VEvent,
+    iter_vevents,
+    parse_datetime,
+    parse_rrule,
+)
+from app.utils.tabular import describe_error, iter_table_rows
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_WEEKDAY_ALIASES = {
+    **{name.lower(): name for name in WEEKDAYS},
+    **dict(zip(("пн", "вт", "ср", "чт", "пт", "сб", "вс"), WEEKDAYS)),
+}
+_PARITY_ALIASES = {
+    "odd": "odd",
+    "even": "even",
+    "both": "both",
+    "нечетная": "odd",
+    "числитель": "odd",
+    "четная": "even",
+    "знаменатель": "even",
+    "все": "both",
+    "каждая": "both",
+}
+COLUMN_ALIASES = {
+    "группа": "group",
+    "предмет": "subject",
+    "дисциплина": "subject",
+    "преподаватель": "teacher",
+    "аудитория": "room",
+    "день": "weekday",
+    "день недели": "weekday",
+    "начало": "start_time",
+    "окончание": "end_time",
+    "конец": "end_time",
+    "неделя": "parity",
+    "четность": "parity",
+    "тип": "lesson_type",
+    "тип занятия": "lesson_type",
+    "повторять до": "repeat_until",
+    "до": "repeat_until",
+    "кроме": "exception_dates",
+    "исключения": "exception_dates",
+}
+_COMPARED = (
+    "subject",
+    "teacher",
+    "room",
+    "weekday",
+    "end_time",
+    "lesson_type",
+    "repeat_until",
+    "exception_dates",
+)
+
+Row = tuple[int, dict[str, Any]]
+
+
+class ScheduleImportError(ValueError):
+    def __init__(self, errors: list[ImportRowError]) -> None:
+        super().__init__(f"{len(errors)} ошибок в расписании")
+        self.errors = errors
+
+
+def _json_rows(fileobj: IO[bytes]) -> Iterator[Row]:
+    try:
+        data = json.load(fileobj)
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Некорректный JSON: {exc}") from exc
+    if isinstance(data, dict):
+        data = data.get("lessons")
+    if not isinstance(data, list):
+        raise ValueError("Ожидается список занятий или объект с полем lessons")
+    for number, item in enumerate(data, 1):
+        yield number, item if isinstance(item, dict) else {"_invalid": item}
+
+
+def _ics_recurrence(event: VEvent, start: dt.datetime, tz: ZoneInfo) -> dict:
+    rrule = event.first("RRULE")
+    if rrule is None:
+        return {}
+    rule = parse_rrule(rrule.value)
+    if rule.get("FREQ") != "WEEKLY" or rule.get("INTERVAL", "1") not in ("1", "2"):
+        raise ValueError(
+            "Поддерживается только повторение каждую неделю или через одну"
+        )
+    interval = int(rule.get("INTERVAL", "1"))
+    # занятие через неделю — это занятие по чётным или нечётным неделям
+    data: dict[str, Any] = {
+        "parity": week_parity(start.date()) if interval == 2 else "both"
+    }
+    if "UNTIL" in rule:
+        data["repeat_until"] = parse_datetime(Property(rule["UNTIL"]), tz).date()
+    elif "COUNT" in rule:
+        weeks = (int(rule["COUNT"]) - 1) * interval
+        data["repeat_until"] = (start + dt.timedelta(weeks=weeks)).date()
+    else:
+        data["_open_ended"] = True
+    data["exception_dates"] = [
+        parse_datetime(Property(value, prop.params), tz).date()
+        for prop in event.all("EXDATE")
+        for value in prop.value.split(",")
+        if value
+    ]
+    return data
+
+
+def _ics_rows(fileobj: IO[bytes]) -> Iterator[Row]:
+    try:
+        text = fileobj.read().decode("utf-8-sig")
+    except UnicodeDecodeError as exc:
+        raise ValueError("iCalendar должен быть в кодировке UTF-8") from exc
+    tz = ZoneInfo(settings.schedule_timezone)
+    for event in iter_vevents(text):
+        row: dict[str, Any] = {
+            "subject": event.text("SUMMARY"),
+            "room": event.text("LOCATION"),
+            "lesson_type": event.text("CATEGORIES"),
+        }
+        organizer = event.first("ORGANIZER")
+        description = event.text("DESCRIPTION")
+        if organizer and organizer.params.get("CN"):
+            row["teacher"] = organizer.params["CN"]
+        elif description:
+            row["teacher"] = description.splitlines()[0]
+        try:
+            if event.first("DTSTART"):
+                row["start_time"] = parse_datetime(event.first("DTSTART"), tz)
+                row.update(_ics_recurrence(event, row["start_time"], tz))
+            if event.first("DTEND"):
+                row["end_time"] = parse_datetime(event.first("DTEND"), tz)
+        except ValueError as exc:
+            row["_invalid"] = str(exc)
+        yield event.line, row
+
+
+def read_schedule_rows(filename: str, fileobj: IO[bytes]) -> Iterator[Row]:
+    name = filename.lower()
+    if name.endswith(".json"):
+        return _json_rows(fileobj)
+    if name.endswith((".ics", ".ical")):
+        return _ics_rows(fileobj)
+    return iter_table_rows(filename, fileobj, COLUMN_ALIASES)
+
+
+def _parse_row(
+    raw: dict[str, Any],
+    groups_by_name: dict[str, int],
+    group_ids: set[int],
+    default_group_id: int | None,
+    date_to: dt.date | None = None,
+) -> ScheduleCreate:
+    if "_invalid" in raw:
+        raise ValueError(f"Некорректное занятие: {raw['_invalid']}")
+    data = {k: v for k, v in raw.items() if v not in (None, "", [])}
+    if data.pop("_open_ended", False):
+        if date_to is None:
+            raise ValueError("Бесконечное повторение: укажите date_to")
+        data["repeat_until"] = date_to
+    if isinstance(data.get("exception_dates"), str):
+        data["exception_dates"] = [
+            d.strip() for d in data["exception_dates"].split(",") if d.strip()
+        ]
+    group = str(data.pop("group", "")).strip()
+    if "group_id" not in data:
+        if group:
+            group_id = groups_by_name.get(group.lower())
+            if group_id is None and group.isdigit():
+                group_id = int(group)
+        else:
+            group_id = default_group_id
+        if group_id is None:
+            raise ValueError(f"Группа «{group}» не найдена" if group else "Нет группы")
+        data["group_id"] = group_id
+    if "parity" in data:
+        parity = str(data["parity"]).strip().lower().replace("ё", "е")
+        if parity not in _PARITY_ALIASES:
+            raise ValueError(f"Неизвестная чётность недели «{data['parity']}»")
+        data["parity"] = _PARITY_ALIASES[parity]
+    weekday = str(data.pop("weekday", "")).strip().lower()
+    if weekday and weekday not in _WEEKDAY_ALIASES:
+        raise ValueError(f"Неизвестный день недели «{weekday}»")
+    lesson = ScheduleCreate.model_validate({**data, "weekday": weekday or "-"})
+    if lesson.group_id not in group_ids:
+        raise ValueError(f"Группа с id {lesson.group_id} не найдена")
+    start, end = wall_clock(lesson.start_time), wall_clock(lesson.end_time)
+    if end <= start:
+        raise ValueError("Окончание занятия раньше начала")
+    if weekday and _WEEKDAY_ALIASES[weekday] != WEEKDAYS[start.weekday()]:
+        raise ValueError(f"{start:%d.%m.%Y} — не {_WEEKDAY_ALIASES[weekday].lower()}")
+    if lesson.repeat_until is not None and lesson.repeat_until < start.date():
+        raise ValueError("Дата окончания повторений раньше первого занятия")
+    return lesson.model_copy(
+        update={
+            "start_time": start,
+            "end_time": end,
+            "weekday": WEEKDAYS[start.weekday()],
+            "parity": lesson.parity or "both",
+            "exception_dates": sorted(set(lesson.exception_dates)),
+        }
+    )
+
+
+async def import_schedule(
+    db: AsyncSession,
+    rows: Iterable[Row],
+    *,
+    default_group_id: int | None = None,
+    date_from: dt.date | None = None,
+    date_to: dt.date | None = None,
+    dry_run: bool = False,
+) -> ScheduleImportResult:
+    """Replace the timetable of every group present in ``rows``.
+
+    With ``date_from``/``date_to`` only lessons starting inside that window
+    are replaced, so one semester can be reloaded without touching the
+    others. Any invalid row rejects the whole upload with
+    :class:`ScheduleImportError`: a partial timetable would silently delete
+    the lessons whose rows failed.
+    """
+
+    group_rows = (await db.execute(select(Group.id, Group.name))).all()
+    groups_by_name = {name.strip().lower(): gid for gid, name in group_rows if name}
+    group_ids = {gid for gid, _ in group_rows}
+    if default_group_id is not None and default_group_id not in group_ids:
+        raise ValueError(f"Группа с id {default_group_id} не найдена")
+    window_start = dt.datetime.combine(date_from, dt.time()) if date_from else None
+    window_end = (
+        dt.datetime.combine(date_to + dt.timedelta(days=1), dt.time())
+        if date_to
+        else None
+    )
+
+    errors: list[ImportRowError] = []
+    wanted: dict[tuple[int, dt.datetime, str], ScheduleCreate] = {}
+    for count, (line, raw) in enumerate(rows, 1):
+        if count > settings.schedule_import_max_rows:
+            raise ValueError(
+                f"Превышен лимит в {settings.schedule_import_max_rows} занятий"
+            )
+        try:
+            lesson = _parse_row(
+                raw, groups_by_name, group_ids, default_group_id, date_to
+            )
+        except (ValueError, ValidationError) as exc:
+            errors.append(ImportRowError(row=line, error=describe_error(exc)))
+            continue
+        if (window_start and lesson.start_time < window_start) or (
+            window_end and lesson.start_time >= window_end
+        ):
+            errors.append(ImportRowError(row=line, error="Занятие вне периода"))
+            continue
+        key = (lesson.group_id, lesson.start_time, lesson.parity)
+        if key in wanted:
+            errors.append(
+                ImportRowError(row=line, error="Занятие с таким временем уже есть")
+            )
+            continue
+        wanted[key] = lesson
+    if errors:
+        raise ScheduleImportError(errors)
+
+    groups = sorted({key[0] for key in wanted} | {default_group_id} - {None})
+    result = ScheduleImportResult(groups=groups, dry_run=dry_run)
+    if not groups:
+        return result
+
+    # блокируем группы, чтобы два импорта одной группы не перемешали строки
+    await db.execute(select(Group.id).where(Group.id.in_(groups)).with_for_update())
+    existing_q = select(
+        Schedule.id,
+        Schedule.group_id,
+        Schedule.start_time,
+        Schedule.parity,
+        *(getattr(Schedule, f) for f in _COMPARED),
+    )
+    existing_q = existing_q.where(Schedule.group_id.in_(groups))
+    if window_start:
+        existing_q = existing_q.where(Schedule.start_time >= window_start)
+    if window_end:
+        existing_q = existing_q.where(Schedule.start_time < window_end)
+
+    now = dt.datetime.utcnow()
+    to_update: list[dict[str, Any]] = []
+    to_delete: list[int] = []
+    for row in (await db.execute(existing_q)).mappings():
+        key = (row["group_id"], row["start_time"], row["parity"] or "both")
+        lesson = wanted.pop(key, None)
+        if lesson is None:
+            to_delete.append(row["id"])
+            continue
+        changes = {
+            name: getattr(lesson, name)
+            for name in _COMPARED
+            if getattr(lesson, name) != row[name]
+        }
+        if changes:
+            to_update.append({"id": row["id"], **changes, "updated_at": now})
+        else:
+            result.unchanged += 1
+    to_insert = [lesson.model_dump() for lesson in wanted.values()]
+
+    result.created = len(to_insert)
+    result.updated = len(to_update)
+    result.deleted = len(to_delete)
+    if dry_run:
+        await db.rollback()
+        return result
+
+    for start in range(0, len(to_delete), 1000):
+        await db.execute(
+            delete(Schedule).where(Schedule.id.in_(to_delete[start : start + 1000]))
+        )
+    if to_update:
+        await db.execute(update(Schedule), to_update)
+    if to_insert:
+        await db.execute(insert(Schedule), to_insert)
+    await db.commit()
+    crud.invalidate_schedule(*groups)
+    return result
@@ -0,0 +1,582 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import time
+import weakref
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from urllib.parse import quote, urlencode
+
+import httpx
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.http import get_http_client
+from app.models.models import SpotifyPresence, User
+from app.schemas.schemas import SpotifyNowPlayingOut
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+AUTHORIZE_URL = "https://accounts.spotify.com/authorize"
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+PROFILE_URL = "https://api.spotify.com/v1/me"
+CURRENTLY_PLAYING_URL = "https://api.spotify.com/v1/me/player/currently-playing"
+
+# токен обновляем чуть раньше фактического истечения
+REFRESH_EARLY_SECONDS = 30
+
+# не даём кешу расти без ограничений, если пользователей много
+_MAX_CACHE_ENTRIES = 10000
+
+
+class SpotifyRateLimited(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Spotify rate limit, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _retry_after(value: Optional[str]) -> int:
+    try:
+        return max(1, int(value or 1))
+    except ValueError:
+        return 1
+
+
+def utcnow_naive() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def basic_auth_header() -> str:
+    raw = f"{settings.spotify_client_id}:{settings.spotify_client_secret}".encode()
+    return "Basic " + base64.b64encode(raw).decode()
+
+
+def token_is_fresh(user: User, now: Optional[datetime] = None) -> bool:
+    expires_at = _as_naive_utc(user.spotify_token_expires_at)
+    if not user.spotify_access_token or expires_at is None:
+        return False
+    now = now or utcnow_naive()
+    return expires_at > now + timedelta(seconds=REFRESH_EARLY_SECONDS)
+
+
+def store_tokens(user: User, data: dict[str, Any]) -> None:
+    """Copy a token endpoint response onto ``user`` (caller commits)."""
+
+    user.spotify_access_token = data.get("access_token") or user.spotify_access_token
+    if data.get("refresh_token"):
+        user.spotify_refresh_token = data["refresh_token"]
+    user.spotify_token_expires_at = utcnow_naive() + timedelta(
+        seconds=int(data.get("expires_in") or 3600)
+    )
+    if data.get("scope"):
+        user.spotify_scope = data["scope"]
+    user.spotify_is_connected = True
+
+
+_refresh_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _refresh_lock(user_id: int) -> asyncio.Lock:
+    lock = _refresh_locks.get(user_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _refresh_locks[user_id] = lock
+    return lock
+
+
+def is_configured() -> bool:
+    return bool(
+        settings.spotify_client_id
+        and settings.spotify_client_secret
+        and settings.spotify_redirect_uri
+    )
+
+
+def authorize_url(state: str) -> str:
+    params = {
+        "response_type": "code",
+        "client_id": settings.spotify_client_id,
+        "redirect_uri": settings.spotify_redirect_uri,
+        "scope": settings.spotify_scopes,
+        "state": state,
+        "show_dialog": "false",
+    }
+    return AUTHORIZE_URL + "?" + urlencode(params, quote_via=quote)
+
+
+async def _token_request(data: dict[str, str]) -> Optional[dict[str, Any]]:
+    try:
+        r = await get_http_client().post(
+            TOKEN_URL, data=data, headers={"Authorization": basic_auth_header()}
+        )
+    except httpx.HTTPError as exc:
+        logger.warning("Spotify token request (%s) failed: %s", data["grant_type"], exc)
+        return None
+    if r.status_code != 200:
+        logger.warning(
+            "Spotify token request (%s) returned %s", data["grant_type"], r.status_code
+        )
+        return None
+    return r.json()
+
+
+async def exchange_code(code: str) -> Optional[dict[str, Any]]:
+    return await _token_request(
+        {
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": settings.spotify_redirect_uri,
+        }
+    )
+
+
+async def _request_refresh(refresh_token: str) -> Optional[dict[str, Any]]:
+    return await _token_request(
+        {"grant_type": "refresh_token", "refresh_token": refresh_token}
+    )
+
+
+async def fetch_profile(token: str) -> dict[str, Any]:
+    try:
+        r = await get_http_client().get(
+            PROFILE_URL, headers={"Authorization": f"Bearer {token}"}
+        )
+    except httpx.HTTPError:
+        return {}
+    return r.json() if r.status_code == 200 else {}
+
+
+def disconnect(user: User) -> None:
+    user.spotify_access_token = None
+    user.spotify_refresh_token = None
+    user.spotify_token_expires_at = None
+    user.spotify_scope = None
+    user.spotify_display_name = None
+    user.spotify_user_id = None
+    user.spotify_is_connected = False
+
+
+async def ensure_access_token(db: AsyncSession, user: User) -> Optional[str]:
+    """Return a usable access token for ``user``, refreshing it if needed.
+
+    Only one refresh per user runs at a time: coroutines in this process wait
+    on a per-user lock, other workers on ``SELECT ... FOR UPDATE`` of the user
+    row. Whoever gets the lock second sees the new token and reuses it.
+    """
+
+    if token_is_fresh(user):
+        return user.spotify_access_token
+    if not user.spotify_refresh_token:
+        return None
+
+    async with _refresh_lock(user.id):
+        try:
+            await db.execute(
+                select(User)
+                .where(User.id == user.id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+            if token_is_fresh(user):
+                return user.spotify_access_token
+            if not user.spotify_refresh_token:
+                return None
+            data = await _request_refresh(user.spotify_refresh_token)
+            if data is None:
+                return None
+            store_tokens(user, data)
+            return user.spotify_access_token
+        finally:
+            # commit снимает блокировку строки и в случае неудачи
+            await db.commit()
+
+
+def parse_now_playing(
+    data: dict[str, Any], fetched_at: datetime
+) -> SpotifyNowPlayingOut:
+    item = data.get("item") or {}
+    album = item.get("album") or {}
+    images = album.get("images") or []
+    return SpotifyNowPlayingOut(
+        is_playing=bool(data.get("is_playing")),
+        progress_ms=data.get("progress_ms"),
+        duration_ms=item.get("duration_ms") if item else None,
+        track_id=item.get("id"),
+        track_name=item.get("name"),
+        artists=[a.get("name") for a in item.get("artists") or [] if a.get("name")],
+        album_name=album.get("name"),
+        album_image_url=next((i.get("url") for i in images if i.get("url")), None),
+        track_url=(item.get("external_urls") or {}).get("spotify"),
+        preview_url=item.get("preview_url"),
+        fetched_at=fetched_at,
+    )
+
+
+async def fetch_now_playing(token: str, fetched_at: datetime) -> SpotifyNowPlayingOut:
+    """Ask Spotify what ``token``'s owner is playing; raises on 429."""
+
+    r = await get_http_client().get(
+        CURRENTLY_PLAYING_URL, headers={"Authorization": f"Bearer {token}"}
+    )
+    if r.status_code == 429:
+        raise SpotifyRateLimited(_retry_after(r.headers.get("Retry-After")))
+    if r.status_code != 200:
+        return SpotifyNowPlayingOut(is_playing=False, fetched_at=fetched_at)
+    return parse_now_playing(r.json() or {}, fetched_at)
+
+
+PRESENCE_FIELDS = (
+    "is_playing",
+    "checked_at",
+    "track_id",
+    "track_name",
+    "artist_name",
+    "album_name",
+    "track_url",
+    "album_image_url",
+)
+
+
+def presence_changed(current: Any, np: SpotifyNowPlayingOut) -> bool:
+    """``current`` is a ``SpotifyPresence``, a row with its columns or ``None``."""
+
+    if current is None:
+        return True
+    if bool(current.is_playing) != np.is_playing:
+        return True
+    # в паузе Spotify не всегда отдаёт трек; последний известный сохраняем
+    return bool(np.track_id) and current.track_id != np.track_id
+
+
+def presence_values(np: SpotifyNowPlayingOut, current: Any = None) -> dict[str, Any]:
+    values = {name: getattr(current, name, None) for name in PRESENCE_FIELDS}
+    values.update(is_playing=np.is_playing, checked_at=np.fetched_at)
+    if np.track_id:
+        values.update(
+            track_id=np.track_id,
+            track_name=np.track_name,
+            artist_name=", ".join(np.artists) or None,
+            album_name=np.album_name,
+            track_url=np.track_url,
+            album_image_url=np.album_image_url,
+        )
+    return values
+
+
+async def save_presence(db: AsyncSession, rows: Sequence[dict[str, Any]]) -> None:
+    """Upsert presence rows (``user_id`` plus every field in ``PRESENCE_FIELDS``)
+    with a single statement; the caller commits."""
+
+    if not rows:
+        return
+    dialect = db.bind.dialect.name if db.bind is not None else ""
+    if dialect == "postgresql":
+        stmt = pg_insert(SpotifyPresence).values(list(rows))
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(SpotifyPresence).values(list(rows))
+    else:
+        for row in rows:
+            await db.merge(SpotifyPresence(**row))
+        return
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SpotifyPresence.user_id],
+        set_={name: stmt.excluded[name] for name in PRESENCE_FIELDS},
+    )
+    await db.execute(stmt)
+
+
+async def clear_presence(db: AsyncSession, user_id: int) -> None:
+    await db.execute(delete(SpotifyPresence).where(SpotifyPresence.user_id == user_id))
+
+
+@dataclass
+class _Entry:
+    value: SpotifyNowPlayingOut
+    stored_at: float
+    expires_at: float
+
+    def view(self, now: float) -> SpotifyNowPlayingOut:
+        np = self.value
+        if not np.is_playing or np.progress_ms is None:
+            return np
+        # прогресс трека продолжает идти, пока ответ лежит в кеше
+        progress = np.progress_ms + int((now - self.stored_at) * 1000)
+        if np.duration_ms is not None:
+            progress = min(progress, np.duration_ms)
+        return np.model_copy(update={"progress_ms": progress})
+
+
+class NowPlayingCache:
+    """Per-user now-playing cache with request coalescing and 429 backoff.
+
+    Concurrent misses for one user share a single upstream call. After a 429
+    nobody calls Spotify until ``Retry-After`` passes (the limit is per app,
+    not per user); meanwhile stale entries are served.
+    """
+
+    def __init__(self, *, playing_ttl: float, idle_ttl: float) -> None:
+        self.playing_ttl = playing_ttl
+        self.idle_ttl = idle_ttl
+        self._entries: dict[int, _Entry] = {}
+        self._inflight: dict[int, asyncio.Future[_Entry]] = {}
+        self._blocked_until = 0.0
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def put(
+        self, user_id: int, value: SpotifyNowPlayingOut, ttl: Optional[float] = None
+    ) -> _Entry:
+        now = time.monotonic()
+        if ttl is None:
+            ttl = self.playing_ttl if value.is_playing else self.idle_ttl
+        self._prune(now)
+        entry = _Entry(value=value, stored_at=now, expires_at=now + ttl)
+        self._entries[user_id] = entry
+        return entry
+
+    def block(self, retry_after: float) -> None:
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def blocked_for(self) -> float:
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._blocked_until = 0.0
+
+    def _prune(self, now: float) -> None:
+        if len(self._entries) < _MAX_CACHE_ENTRIES:
+            return
+        for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            del self._entries[key]
+        if len(self._entries) >= _MAX_CACHE_ENTRIES:
+            oldest = min(self._entries, key=lambda k: self._entries[k].stored_at)
+            del self._entries[oldest]
+
+    async def _load(
+        self, user_id: int, loader: Callable[[], Awaitable[SpotifyNowPlayingOut]]
+    ) -> _Entry:
+        try:
+            value = await loader()
+        except SpotifyRateLimited as exc:
+            self.block(exc.retry_after)
+            raise
+        finally:
+            self._inflight.pop(user_id, None)
+        return self.put(user_id, value)
+
+    async def get(
+        self, user_id: int, loader: Callable[[], Awaitable[SpotifyNowPlayingOut]]
+    ) -> SpotifyNowPlayingOut:
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.expires_at > now:
+            return entry.view(now)
+        blocked_for = self.blocked_for()
+        if blocked_for > 0:
+            if entry is not None:
+                return entry.view(now)
+            raise SpotifyRateLimited(int(blocked_for) + 1)
+
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(user_id, loader))
+            self._inflight[user_id] = task
+        try:
+            # shield: отмена одного запроса не должна обрывать общий вызов
+            fresh = await asyncio.shield(task)
+        except SpotifyRateLimited:
+            if entry is not None:
+                return entry.view(time.monotonic())
+            raise
+        return fresh.view(time.monotonic())
+
+
+now_playing_cache = NowPlayingCache(
+    playing_ttl=settings.spotify_now_playing_ttl_seconds,
+    idle_ttl=settings.spotify_now_playing_idle_ttl_seconds,
+)
+
+
+class _RateBudget:
+    """Spaces upstream calls to at most ``rate_per_second``."""
+
+    def __init__(self, rate_per_second: float) -> None:
+        self._interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class PresencePoller:
+    """Refreshes now-playing for every connected user in the background.
+
+    Users that are playing are polled every ``active_interval`` seconds, idle
+    ones every ``idle_interval``. Results go into ``now_playing_cache`` so page
+    views are served without upstream calls, and changed presence is written
+    with a single upsert per tick.
+    """
+
+    def __init__(
+        self,
+        *,
+        active_interval: float,
+        idle_interval: float,
+        concurrency: int,
+        rate_per_second: float,
+        batch_size: int,
+        cache: NowPlayingCache = now_playing_cache,
+    ) -> None:
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.batch_size = max(1, batch_size)
+        self._concurrency = max(1, concurrency)
+        self._budget = _RateBudget(rate_per_second)
+        self._cache = cache
+        self._next_due: dict[int, float] = {}
+
+    async def _token_for(self, row: Any) -> Optional[str]:
+        if token_is_fresh(row):
+            return row.spotify_access_token
+        async with async_session() as db:
+            user = await db.get(User, row.id)
+            if user is None:
+                return None
+            return await ensure_access_token(db, user)
+
+    async def _poll_one(self, row: Any) -> Optional[SpotifyNowPlayingOut]:
+        token = await self._token_for(row)
+        if not token:
+            return None
+        await self._budget.acquire()
+        return await fetch_now_playing(token, utcnow_naive())
+
+    async def tick(self) -> int:
+        """Poll users that are due. Returns the number of rows updated."""
+
+        if self._cache.blocked_for() > 0:
+            return 0
+        q = (
+            select(
+                User.id,
+                User.spotify_access_token,
+                User.spotify_refresh_token,
+                User.spotify_token_expires_at,
+                SpotifyPresence.user_id.label("presence_user_id"),
+                *(getattr(SpotifyPresence, name) for name in PRESENCE_FIELDS),
+            )
+            .outerjoin(SpotifyPresence, SpotifyPresence.user_id == User.id)
+            .where(User.spotify_is_connected.is_(True))
+        )
+        async with async_session() as db:
+            rows = (await db.execute(q)).all()
+
+        connected = {row.id for row in rows}
+        for user_id in [u for u in self._next_due if u not in connected]:
+            del self._next_due[user_id]
+        now = time.monotonic()
+        due = [row for row in rows if self._next_due.get(row.id, 0.0) <= now]
+        due = due[: self.batch_size]
+        if not due:
+            return 0
+
+        slots = asyncio.Semaphore(self._concurrency)
+
+        async def run(row: Any) -> Optional[SpotifyNowPlayingOut]:
+            async with slots:
+                if self._cache.blocked_for() > 0:
+                    return None
+                try:
+                    return await self._poll_one(row)
+                except SpotifyRateLimited as exc:
+                    self._cache.block(exc.retry_after)
+                except httpx.HTTPError as exc:
+                    logger.warning(
+                        "Spotify presence poll for %s failed: %s", row.id, exc
+                    )
+                return None
+
+        results = await asyncio.gather(*(run(row) for row in due))
+
+        changes: list[dict[str, Any]] = []
+        for row, np in zip(due, results):
+            if np is None:
+                # после 429 пользователь снова в очереди, как только истечёт пауза
+                if self._cache.blocked_for() <= 0:
+                    self._next_due[row.id] = time.monotonic() + self.idle_interval
+                continue
+            interval = self.active_interval if np.is_playing else self.idle_interval
+            self._next_due[row.id] = time.monotonic() + interval
+            self._cache.put(row.id, np, ttl=interval)
+            current = row if row.presence_user_id is not None else None
+            if presence_changed(current, np):
+                changes.append({"user_id": row.id, **presence_values(np, current)})
+        if changes:
+            async with async_session() as db:
+                await save_presence(db, changes)
+                await db.commit()
+        return len(changes)
+
+
+async def _presence_loop(poller: PresencePoller, tick_seconds: float) -> None:
+    while True:
+        try:
+            await poller.tick()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Spotify presence poll failed")
+        await asyncio.sleep(tick_seconds)
+
+
+async def start_spotify_presence_poller() -> Optional[Callable[[], Awaitable[None]]]:
+    """Start the presence poller if enabled and return a stopper."""
+
+    if not settings.spotify_presence_poll_enabled:
+        return None
+    if not settings.spotify_client_id or not settings.spotify_client_secret:
+        logger.warning("Spotify presence poller is enabled but Spotify is not set up")
+        return None
+    poller = PresencePoller(
+        active_interval=settings.spotify_presence_active_interval_seconds,
+        idle_interval=settings.spotify_presence_idle_interval_seconds,
+        concurrency=settings.spotify_presence_concurrency,
+        rate_per_second=settings.spotify_presence_rate_per_second,
+        batch_size=settings.spotify_presence_batch_size,
+    )
+    tick = min(poller.active_interval, 5.0)
+    task = asyncio.get_running_loop().create_task(_presence_loop(poller, tick))
+
+    async def _stop() -> None:
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    return _stop
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import mimetypes
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+import httpx
+from app.core.config import settings
+from app.core.http import get_http_client
+
+
+class StorageError(RuntimeError):
+    pass
+
+
+class PresignNotSupported(StorageError):
+    pass
+
+
+@dataclass
+class PresignedUpload:
+    key: str
+    url: str
+    public_url: str
+    expires_in: int
+    method: str = "PUT"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class StoredObject:
+    size: int
+    content_type: str
+
+
+def _normalize_key(key: str) -> str:
+    parts = [p for p in key.replace("\\", "/").split("/") if p]
+    if not parts or any(p in (".", "..") for p in parts):
+        raise StorageError(f"invalid storage key: {key!r}")
+    return "/".join(parts)
+
+
+class LocalStorage:
+    """Files under ``static_dir`` served by the app itself at ``/static``."""
+
+    name = "local"
+
+    def __init__(self, base_dir: Path, base_url: str = "/static") -> None:
+        self.base_dir = base_dir
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        return self.base_dir / _normalize_key(key)
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{_normalize_key(key)}"
+
+    def key_from_url(self, url: str | None) -> str | None:
+        if not url:
+            return None
+        path = urlsplit(url).path
+        prefix = self.base_url + "/"
+        if not path.startswith(prefix):
+            return None
+        return path[len(prefix) :] or None
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    async def save(self, key: str, data: bytes, content_type: str | None = None) -> str:
+        await asyncio.to_thread(self._write, self._path(key), data)
+        return self.public_url(key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+    async def head(self, key: str) -> StoredObject | None:
+        path = self._path(key)
+        try:
+            size = (await asyncio.to_thread(path.stat)).st_size
+        except FileNotFoundError:
+            return None
+        content_type = mimetypes.guess_type(path.name)[0]
+        return StoredObject(size, content_type or "application/octet-stream")
+
+    def presign_upload(
+        self,
+        key: str,
+        content_type: str,
+        content_length: int,
+        expires_in: int | None = None,
+    ) -> PresignedUpload:
+        raise PresignNotSupported("presigned uploads require object storage")
+
+
+def _sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+class S3Storage:
+    """S3-compatible object storage (AWS, MinIO, Ceph RGW) with path-style URLs.
+
+    Requests are signed with AWS Signature V4; no SDK is required.
+    """
+
+    name = "s3"
+    service = "s3"
+
+    def __init__(
+        self,
+        *,
+        endpoint_url: str,
+        bucket: str,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str = "us-east-1",
+        public_base_url: str = "",
+        presign_expires: int = 900,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        if not endpoint_url or not bucket:
+            raise StorageError("S3 storage requires endpoint URL and bucket")
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.public_base_url = (
+            public_base_url or f"{self.endpoint_url}/{self.bucket}"
+        ).rstrip("/")
+        self.presign_expires = presign_expires
+        self._client = client
+        self._host = urlsplit(self.endpoint_url).netloc
+
+    def _object_path(self, key: str) -> str:
+        return f"/{self.bucket}/{quote(_normalize_key(key), safe='/-_.~')}"
+
+    def public_url(self, key: str) -> str:
+        return f"{self.public_base_url}/{quote(_normalize_key(key), safe='/-_.~')}"
+
+    def key_from_url(self, url: str | None) -> str | None:
+        if not url:
+            return None
+        prefix = self.public_base_url + "/"
+        if not url.startswith(prefix):
+            return None
+        return url[len(prefix) :].split("?", 1)[0] or None
+
+    def _scope(self, now: datetime) -> tuple[str, str, str]:
+        date = now.strftime("%Y%m%d")
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{date}/{self.region}/{self.service}/aws4_request"
+        return amz_date, date, scope
+
+    def _signature(self, date: str, string_to_sign: str) -> str:
+        key = _hmac(f"AWS4{self.secret_access_key}".encode(), date)
+        key = _hmac(key, self.region)
+        key = _hmac(key, self.service)
+        key = _hmac(key, "aws4_request")
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def _sign(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        query: dict[str, str],
+        payload_hash: str,
+        now: datetime,
+    ) -> tuple[str, str, str]:
+        amz_date, date, scope = self._scope(now)
+        canonical_headers = {k.lower(): " ".join(v.split()) for k, v in headers.items()}
+        signed_headers = ";".join(sorted(canonical_headers))
+        canonical_query = "&".join(
+            f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+            for k, v in sorted(query.items())
+        )
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                canonical_query,
+                "".join(
+                    f"{k}:{canonical_headers[k]}\n" for k in sorted(canonical_headers)
+                ),
+                signed_headers,
+                payload_hash,
+            ]
+        )
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                _sha256_hex(canonical_request.encode()),
+            ]
+        )
+        return self._signature(date, string_to_sign), signed_headers, scope
+
+    async def _request(
+        self,
+        method: str,
+        key: str,
+        data: bytes = b"",
+        content_type: str | None = None,
+    ) -> httpx.Response:
+        now = datetime.now(timezone.utc)
+        path = self._object_path(key)
+        payload_hash = _sha256_hex(data)
+        headers = {
+            "host": self._host,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": now.strftime("%Y%m%dT%H%M%SZ"),
+        }
+        if content_type:
+            headers["content-type"] = content_type
+        signature, signed_headers, scope = self._sign(
+            method, path, headers, {}, payload_hash, now
+        )
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key_id}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        url = self.endpoint_url + path
+        client = self._client or get_http_client()
+        return await client.request(
+            method, url, content=data, headers=headers, timeout=30
+        )
+
+    async def save(self, key: str, data: bytes, content_type: str | None = None) -> str:
+        r = await self._request(
+            "PUT", key, data, content_type or "application/octet-stream"
+        )
+        if r.status_code not in (200, 201):
+            raise StorageError(f"S3 PUT {key} failed with {r.status_code}")
+        return self.public_url(key)
+
+    async def delete(self, key: str) -> None:
+        r = await self._request("DELETE", key)
+        if r.status_code not in (200, 204, 404):
+            raise StorageError(f"S3 DELETE {key} failed with {r.status_code}")
+
+    async def head(self, key: str) -> StoredObject | None:
+        r = await self._request("HEAD", key)
+        if r.status_code == 404:
+            return None
+        if r.status_code != 200:
+            raise StorageError(f"S3 HEAD {key} failed with {r.status_code}")
+        return StoredObject(
+            int(r.headers.get("content-length", 0)),
+            r.headers.get("content-type", "application/octet-stream"),
+        )
+
+    def presign_upload(
+        self,
+        key: str,
+        content_type: str,
+        content_length: int,
+        expires_in: int | None = None,
+    ) -> PresignedUpload:
+        """Presigned PUT for exactly ``content_length`` bytes of ``content_type``.
+
+        Both headers are signed, so S3 rejects a body of any other size.
+        """
+
+        expires = int(expires_in or self.presign_expires)
+        now = datetime.now(timezone.utc)
+        amz_date, _, scope = self._scope(now)
+        path = self._object_path(key)
+        headers = {
+            "host": self._host,
+            "content-length": str(content_length),
+            "content-type": content_type,
+        }
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key_id}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires),
+            "X-Amz-SignedHeaders": ";".join(sorted(headers)),
+        }
+        signature, _, _ = self._sign(
+            "PUT", path, headers, query, "UNSIGNED-PAYLOAD", now
+        )
+        query["X-Amz-Signature"] = signature
+        qs = "&".join(
+            f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+            for k, v in sorted(query.items())
+        )
+        return PresignedUpload(
+            key=_normalize_key(key),
+            url=f"{self.endpoint_url}{path}?{qs}",
+            public_url=self.public_url(key),
+            expires_in=expires,
+            headers={"Content-Type": content_type},
+        )
+
+
+Storage = LocalStorage | S3Storage
+
+_storage: Storage | None = None
+
+
+def _build_storage() -> Storage:
+    backend = settings.storage_backend.strip().lower()
+    if backend == "s3":
+        return S3Storage(
+            endpoint_url=settings.s3_endpoint_url,
+            bucket=settings.s3_bucket,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+            region=settings.s3_region,
+            public_base_url=settings.s3_public_base_url,
+            presign_expires=settings.storage_presign_expires,
+        )
+    if backend != "local":
+        raise StorageError(f"unknown storage backend: {settings.storage_backend!r}")
+    return LocalStorage(settings.static_dir_path)
+
+
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        _storage = _build_storage()
+    return _storage
+
+
+def set_storage(storage: Storage | None) -> None:
+    global _storage
+    _storage = storage
@@ -0,0 +1,341 @@
+"""Bulk user import from CSV/XLSX.
+
+Rows are validated as they are read and applied in batches of
+``USER_IMPORT_BATCH_SIZE``. Each batch costs one existence check, one
+multi-row ``INSERT ... ON CONFLICT DO NOTHING`` and, with
+``update_existing``, one executemany ``UPDATE``, then it is committed.
+bcrypt dominates the cost of rows with a password, so the hashing runs in
+a process pool. Rows without a password get an unusable hash and an
+activation link (a password reset token) by email, so no hashing is needed
+at all.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import multiprocessing
+import os
+import secrets
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from app import crud
+from app.auth.security import hash_passwords, hash_token, make_unusable_password
+from app.core.config import settings
+from app.models.models import Group, PasswordResetToken, User
+from app.schemas.schemas import ImportRowError, UserImportResult, UserImportRow
+from app.services.mail import enqueue_mail, wake_mail_sender
+from app.utils.email import build_activation_email
+from app.utils.tabular import describe_error
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Русские заголовки, которые встречаются в выгрузках деканатов
+COLUMN_ALIASES = {
+    "e-mail": "email",
+    "почта": "email",
+    "эл. почта": "email",
+    "фио": "full_name",
+    "роль": "role",
+    "группа": "group",
+    "номер зачетки": "record_book_number",
+    "номер зачетной книжки": "record_book_number",
+    "институт": "institute",
+    "курс": "course",
+    "уровень образования": "education_level",
+    "программа": "program",
+    "кафедра": "department",
+    "должность": "position",
+    "пароль": "password",
+}
+
+_ROLE_ALIASES = {"студент": "student", "преподаватель": "teacher"}
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+def _hash_workers() -> int:
+    return settings.user_import_hash_workers or os.cpu_count() or 1
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # spawn: форк процесса с потоками (мониторинг цикла, пулы) небезопасен
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=_hash_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+async def _hash_in_pool(passwords: list[str]) -> list[str]:
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    pool = _get_hash_pool()
+    size = -(-len(passwords) // _hash_workers())
+    chunks = [passwords[i : i + size] for i in range(0, len(passwords), size)]
+    hashed = await asyncio.gather(
+        *(loop.run_in_executor(pool, hash_passwords, chunk) for chunk in chunks)
+    )
+    return [h for chunk in hashed for h in chunk]
+
+
+def _insert_ignoring_duplicates(db: AsyncSession):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(User).on_conflict_do_nothing(
+            index_elements=[User.email]
+        )
+    if dialect == "sqlite":
+        return sqlite.insert(User).on_conflict_do_nothing(index_elements=[User.email])
+    return insert(User)
+
+
+async def _group_lookup(db: AsyncSession) -> tuple[dict[str, int], set[int]]:
+    rows = (await db.execute(select(Group.id, Group.name))).all()
+    by_name = {name.strip().lower(): gid for gid, name in rows if name}
+    return by_name, {gid for gid, _ in rows}
+
+
+def _parse_row(
+    raw: dict[str, str], groups_by_name: dict[str, int], group_ids: set[int]
+) -> UserImportRow:
+    data: dict[str, Any] = {k: v for k, v in raw.items() if v}
+    if "role" in data:
+        role = data["role"].lower()
+        data["role"] = _ROLE_ALIASES.get(role, role)
+    group = data.pop("group", None)
+    if group and "group_id" not in data:
+        group_id = groups_by_name.get(group.lower())
+        if group_id is None and group.isdigit() and int(group) in group_ids:
+            group_id = int(group)
+        if group_id is None:
+            raise ValueError(f"Группа «{group}» не найдена")
+        data["group_id"] = group_id
+    row = UserImportRow.model_validate(data)
+    if row.group_id is not None and row.group_id not in group_ids:
+        raise ValueError(f"Группа с id {row.group_id} не найдена")
+    if row.password is not None and len(row.password.encode()) > 72:
+        raise ValueError("Пароль длиннее 72 байт")
+    return row
+
+
+async def _apply_batch(
+    db: AsyncSession,
+    batch: list[tuple[int, UserImportRow]],
+    result: UserImportResult,
+    *,
+    update_existing: bool,
+    dry_run: bool,
+) -> list[tuple[int, str, str]]:
+    emails = [row.email.lower() for _, row in batch]
+    existing = dict(
+        (
+            await db.execute(
+                select(func.lower(User.email), User.id).where(
+                    func.lower(User.email).in_(emails)
+                )
+            )
+        ).all()
+    )
+    new = [(line, row) for line, row in batch if row.email.lower() not in existing]
+    known = [(line, row) for line, row in batch if row.email.lower() in existing]
+
+    if not update_existing:
+        result.skipped += len(known)
+        known = []
+    if dry_run:
+        result.created += len(new)
+        result.updated += len(known)
+        return []
+
+    activations: list[tuple[int, str, str]] = []
+    if new:
+        hashed = iter(
+            await _hash_in_pool([row.password for _, row in new if row.password])
+        )
+        values = []
+        for _, row in new:
+            fields = row.model_dump(exclude={"password"})
+            fields["email"] = row.email.lower()
+            fields["hashed_password"] = (
+                next(hashed) if row.password else make_unusable_password()
+            )
+            fields["is_active"] = True
+            values.append(fields)
+        inserted = dict(
+            (
+                await db.execute(
+                    _insert_ignoring_duplicates(db).returning(User.email, User.id),
+                    values,
+                )
+            ).all()
+        )
+        result.created += len(inserted)
+        # строки, которые между проверкой и вставкой успел создать кто-то ещё
+        result.skipped += len(new) - len(inserted)
+        activations = [
+            (inserted[row.email.lower()], row.email.lower(), row.full_name or "")
+            for _, row in new
+            if not row.password and row.email.lower() in inserted
+        ]
+
+    if known:
+        # обновляем только заполненные в файле колонки
+        params = [
+            {
+                "id": existing[row.email.lower()],
+                **row.model_dump(exclude={"email", "password"}, exclude_unset=True),
+            }
+            for _, row in known
+        ]
+        with_password = [
+            (fields, row.password)
+            for fields, (_, row) in zip(params, known)
+            if row.password
+        ]
+        hashed = await _hash_in_pool([password for _, password in with_password])
+        for (fields, _), hashed_password in zip(with_password, hashed):
+            fields["hashed_password"] = hashed_password
+        params = [fields for fields in params if len(fields) > 1]
+        if params:
+            await db.execute(update(User), params)
+        result.updated += len(params)
+        result.skipped += len(known) - len(params)
+    return activations
+
+
+async def _send_activations(
+    db: AsyncSession, activations: list[tuple[int, str, str]]
+) -> None:
+    hours = settings.user_import_activation_hours
+    expires = dt.datetime.now(dt.timezone.utc) + dt.timedelta(hours=hours)
+    base = settings.app_base_url_clean
+    for user_id, email, full_name in activations:
+        token = secrets.token_urlsafe(32)
+        db.add(
+            PasswordResetToken(
+                user_id=user_id,
+                token_hash=hash_token(token),
+                expires_at=expires,
+                used=False,
+            )
+        )
+        subject, text, html = build_activation_email(
+            f"{base}/reset-password?token={token}", full_name, hours
+        )
+        await enqueue_mail(
+            db,
+            to_email=email,
+            subject=subject,
+            text=text,
+            html=html,
+            kind="account_activation",
+        )
+
+
+def _until_read_error(
+    rows: Iterable[tuple[int, dict[str, str]]], failures: list[ValueError]
+) -> Iterator[tuple[int, dict[str, str]]]:
+    """``rows`` up to the first reader error, which is put into ``failures``."""
+
+    try:
+        yield from rows
+    except ValueError as exc:
+        failures.append(exc)
+
+
+async def import_users(
+    db: AsyncSession,
+    rows: Iterable[tuple[int, dict[str, str]]],
+    *,
+    update_existing: bool = False,
+    dry_run: bool = False,
+) -> UserImportResult:
+    """Validate and apply ``rows`` (``(line, {column: value})``) batch by batch.
+
+    Invalid rows are reported in ``errors`` and do not stop the import;
+    every batch that made it to the database stays committed. If the file
+    itself turns out unreadable (a broken encoding, say), ``ValueError`` is
+    raised while nothing has been written yet; after that the rows read so
+    far are applied and the failure is reported as an error of the result.
+    """
+
+    result = UserImportResult(dry_run=dry_run)
+    groups_by_name, group_ids = await _group_lookup(db)
+    await db.commit()
+    seen: set[str] = set()
+    batch: list[tuple[int, UserImportRow]] = []
+    batch_size = settings.user_import_batch_size
+    read_failures: list[ValueError] = []
+    flushed = False
+    line = 1  # заголовок
+
+    async def flush() -> None:
+        nonlocal flushed
+        activations = await _apply_batch(
+            db, batch, result, update_existing=update_existing, dry_run=dry_run
+        )
+        await _send_activations(db, activations)
+        await db.commit()
+        result.activation_sent += len(activations)
+        batch.clear()
+        flushed = True
+
+    for count, (line, raw) in enumerate(_until_read_error(rows, read_failures), 1):
+        if count > settings.user_import_max_rows:
+            result.errors.append(
+                ImportRowError(
+                    row=line,
+                    error=f"Превышен лимит в {settings.user_import_max_rows} строк, "
+                    "остаток файла не обработан",
+                )
+            )
+            break
+        email = (raw.get("email") or "").lower() or None
+        try:
+            row = _parse_row(raw, groups_by_name, group_ids)
+        except (ValueError, ValidationError) as exc:
+            result.errors.append(
+                ImportRowError(row=line, key=email, error=describe_error(exc))
+            )
+            continue
+        if row.email.lower() in seen:
+            result.errors.append(
+                ImportRowError(row=line, key=email, error="Email повторяется в файле")
+            )
+            continue
+        seen.add(row.email.lower())
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            await flush()
+    if read_failures:
+        if not flushed:
+            raise read_failures[0]
+        result.errors.append(
+            ImportRowError(
+                row=line + 1,
+                error=f"{read_failures[0]}; остаток файла не обработан",
+            )
+        )
+    if batch:
+        await flush()
+
+    if not dry_run and (result.created or result.updated):
+        crud.users_count_cache.clear()
+    if result.activation_sent:
+        wake_mail_sender()
+    return result
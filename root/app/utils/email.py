@@ -1,10 +1,3 @@
-import smtplib
-import ssl
-from email.message import EmailMessage
-
-from app.core.config import settings
-
-
 def _build_html(link: str, full_name: str) -> str:
     name = f", {full_name}" if full_name else ""
     return f"""
@@ -18,30 +11,33 @@ def _build_html(link: str, full_name: str) -> str:
   """
 
 
-def send_reset_email(to_email: str, link: str, full_name: str = "") -> None:
-    host = settings.smtp_host
-    port = settings.smtp_port
-    user = settings.smtp_user
-    password = settings.smtp_password
-    starttls = settings.smtp_starttls
-    mail_from = settings.mail_from
+def build_reset_email(link: str, full_name: str = "") -> tuple[str, str, str]:
+    """Return ``(subject, text, html)`` of the password reset message."""
+
+    return (
+        "Сброс пароля — Экосистема ГУУ",
+        f"Ссылка для сброса пароля: {link}\nОна действует 45 минут.",
+        _build_html(link, full_name),
+    )
+
 
-    msg = EmailMessage()
-    msg["Subject"] = "Сброс пароля — Экосистема ГУУ"
-    msg["From"] = mail_from
-    msg["To"] = to_email
-    msg.set_content(f"Ссылка для сброса пароля: {link}\nОна действует 45 минут.")
-    msg.add_alternative(_build_html(link, full_name), subtype="html")
+def build_activation_email(
+    link: str, full_name: str = "", hours: int = 72
+) -> tuple[str, str, str]:
+    """Return ``(subject, text, html)`` of the account activation message."""
 
-    context = ssl.create_default_context()
-    if starttls:
-        with smtplib.SMTP(host, port) as s:
-            s.starttls(context=context)
-            if user:
-                s.login(user, password)
-            s.send_message(msg)
-    else:
-        with smtplib.SMTP_SSL(host, port, context=context) as s:
-            if user:
-                s.login(user, password)
-            s.send_message(msg)
+    name = f", {full_name}" if full_name else ""
+    html = f"""
+  <div style="font-family:Inter,Arial,sans-serif">
+    <h2>Добро пожаловать в Экосистему ГУУ</h2>
+    <p>Здравствуйте{name}!</p>
+    <p>Для вас создан аккаунт. Чтобы войти, задайте пароль по ссылке — она действует {hours} ч.</p>
+    <p><a href="{link}" style="display:inline-block;padding:10px 16px;background:#1d5fff;color:#fff;border-radius:8px;text-decoration:none">Задать пароль</a></p>
+  </div>
+  """
+    return (
+        "Активация аккаунта — Экосистема ГУУ",
+        f"Для вас создан аккаунт. Задайте пароль по ссылке: {link}\n"
+        f"Она действует {hours} ч.",
+        html,
+    )
@@ -1,18 +1,13 @@
 import mimetypes
 import secrets
-from pathlib import Path
 
-from app.core.config import settings
+from app.services.storage import get_storage
 from fastapi import HTTPException, UploadFile, status
 
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
 MAX_IMAGE_SIZE = 5 * 1024 * 1024
 
 
-def _ensure_dir(p: Path) -> None:
-    p.mkdir(parents=True, exist_ok=True)
-
-
 async def _read_limited(upload: UploadFile, limit: int) -> bytes:
     data = await upload.read(limit + 1)
     if len(data) > limit:
@@ -47,9 +42,4 @@ async def save_image(upload: UploadFile, subdir: str, prefix: str) -> str:
         "image/webp": ".webp",
     }.get(upload.content_type, "")
     name = _gen_name(prefix, ext)
-    base = settings.static_dir_path
-    _ensure_dir(base / subdir)
-    path = base / subdir / name
-    with open(path, "wb") as f:
-        f.write(data)
-    return f"/static/{subdir}/{name}"
+    return await get_storage().save(f"{subdir}/{name}", data, upload.content_type)
@@ -0,0 +1,269 @@
+"""Minimal iCalendar (RFC 5545) reader and writer for schedule imports and feeds."""
+
+from __future__ import annotations
+
+import datetime as dt
+import functools
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+@dataclass
+class Property:
+    value: str
+    params: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class VEvent:
+    line: int
+    props: dict[str, list[Property]] = field(default_factory=dict)
+
+    def first(self, name: str) -> Property | None:
+        values = self.props.get(name)
+        return values[0] if values else None
+
+    def all(self, name: str) -> list[Property]:
+        return self.props.get(name, [])
+
+    def text(self, name: str) -> str | None:
+        prop = self.first(name)
+        return unescape(prop.value) if prop and prop.value else None
+
+
+def unescape(value: str) -> str:
+    out: list[str] = []
+    chars = iter(value)
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append("\n" if nxt in ("n", "N") else nxt)
+        else:
+            out.append(ch)
+    return "".join(out).strip()
+
+
+def _unfold(text: str) -> Iterator[tuple[int, str]]:
+    current: str | None = None
+    start = 0
+    for number, raw in enumerate(text.splitlines(), 1):
+        if raw[:1] in (" ", "\t") and current is not None:
+            current += raw[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = raw, number
+    if current is not None:
+        yield start, current
+
+
+def _split_property(line: str) -> tuple[str, dict[str, str], str]:
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ":" and not quoted:
+            head, value = line[:i], line[i + 1 :]
+            break
+    else:
+        raise ValueError(f"Некорректная строка iCalendar: {line[:40]}")
+    name, *params = head.split(";")
+    parsed = {}
+    for param in params:
+        key, _, val = param.partition("=")
+        parsed[key.upper()] = val.strip('"')
+    return name.upper(), parsed, value
+
+
+def iter_vevents(text: str) -> Iterator[VEvent]:
+    """Yield the ``VEVENT`` components of ``text`` with their first line."""
+
+    event: VEvent | None = None
+    depth = 0
+    for number, line in _unfold(text):
+        if not line.strip():
+            continue
+        name, params, value = _split_property(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and depth == 0:
+                event = VEvent(line=number)
+            elif event is not None:
+                depth += 1  # VALARM и прочие вложенные компоненты пропускаем
+        elif name == "END":
+            if depth:
+                depth -= 1
+            elif value.upper() == "VEVENT" and event is not None:
+                yield event
+                event = None
+        elif event is not None and not depth:
+            event.props.setdefault(name, []).append(Property(value, params))
+
+
+def parse_datetime(prop: Property, tz: ZoneInfo) -> dt.datetime:
+    """Wall-clock time of ``prop`` in ``tz`` as a naive datetime."""
+
+    value = prop.value.strip()
+    if prop.params.get("VALUE") == "DATE" or len(value) == 8:
+        return dt.datetime.strptime(value[:8], "%Y%m%d")
+    parsed = dt.datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return (
+            parsed.replace(tzinfo=dt.timezone.utc).astimezone(tz).replace(tzinfo=None)
+        )
+    tzid = prop.params.get("TZID")
+    if tzid:
+        try:
+            source = ZoneInfo(tzid)
+        except (ZoneInfoNotFoundError, ValueError):
+            return parsed
+        return parsed.replace(tzinfo=source).astimezone(tz).replace(tzinfo=None)
+    return parsed
+
+
+def parse_rrule(value: str) -> dict[str, str]:
+    return {
+        key.upper(): val
+        for key, _, val in (part.partition("=") for part in value.split(";"))
+        if key
+    }
+
+
+# --- запись ---------------------------------------------------------------
+
+PRODID = "-//University Ecosystem//Schedule//RU"
+END_CALENDAR = "END:VCALENDAR\r\n"
+
+
+def escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """``line`` with CRLF, folded into 75-octet chunks as RFC 5545 asks."""
+
+    data = line.encode("utf-8")
+    chunks: list[bytes] = []
+    limit = 75
+    while len(data) > limit:
+        cut = limit
+        while data[cut] & 0xC0 == 0x80:  # не режем многобайтовый символ
+            cut -= 1
+        chunks.append(data[:cut])
+        data = data[cut:]
+        limit = 74  # продолжение начинается с пробела
+    chunks.append(data)
+    return b"\r\n ".join(chunks).decode("utf-8") + "\r\n"
+
+
+def content_line(name: str, value: str, **params: str) -> str:
+    head = name + "".join(f";{key.upper()}={val}" for key, val in params.items())
+    return fold(f"{head}:{value}")
+
+
+def format_datetime(value: dt.datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def format_utc(value: dt.datetime) -> str:
+    """``value`` (naive UTC, as stored by the app) in the UTC form."""
+
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _format_offset(offset: dt.timedelta) -> str:
+    minutes = int(offset.total_seconds()) // 60
+    sign = "-" if minutes < 0 else "+"
+    return f"{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}"
+
+
+def _observance(tz: ZoneInfo, moment: dt.datetime) -> tuple:
+    local = moment.astimezone(tz)
+    return local.utcoffset(), bool(local.dst()), local.tzname()
+
+
+def _transitions(
+    tz: ZoneInfo, start: dt.datetime, end: dt.datetime
+) -> Iterator[dt.datetime]:
+    """UTC instants in ``[start, end)`` where the offset or name of ``tz`` changes."""
+
+    step = dt.timedelta(days=1)
+    moment = start
+    while moment < end:
+        following = moment + step
+        if _observance(tz, moment) != _observance(tz, following):
+            lo, hi = moment, following  # смена внутри суток: ищем её минуту
+            while hi - lo > dt.timedelta(minutes=1):
+                mid = lo + (hi - lo) // 2
+                mid -= dt.timedelta(seconds=mid.second, microseconds=mid.microsecond)
+                if _observance(tz, mid) == _observance(tz, lo):
+                    lo = mid
+                else:
+                    hi = mid
+            yield hi
+        moment = following
+
+
+@functools.lru_cache(maxsize=32)
+def vtimezone(tzid: str, year: int) -> str:
+    """``VTIMEZONE`` of ``tzid`` for ``year - 1`` … ``year + 2``.
+
+    RFC 5545 requires one for every ``TZID`` a calendar uses. Each offset
+    change in the window becomes its own observance, preceded by the last
+    change before the window so that the whole window is covered.
+    """
+
+    tz = ZoneInfo(tzid)
+    utc = dt.timezone.utc
+    window = dt.datetime(year - 1, 1, 1, tzinfo=utc)
+    changes = list(_transitions(tz, dt.datetime(1970, 1, 1, tzinfo=utc), window))[-1:]
+    changes += _transitions(tz, window, dt.datetime(year + 3, 1, 1, tzinfo=utc))
+    lines = [content_line("BEGIN", "VTIMEZONE"), content_line("TZID", tzid)]
+    if not changes:
+        offset, _, name = _observance(tz, window)
+        observances = [(dt.datetime(1970, 1, 1), offset, offset, False, name)]
+    else:
+        observances = []
+        for change in changes:
+            before = _observance(tz, change - dt.timedelta(minutes=1))
+            offset, dst, name = _observance(tz, change)
+            start = (change + before[0]).replace(tzinfo=None)
+            observances.append((start, before[0], offset, dst, name))
+    for start, offset_from, offset_to, dst, name in observances:
+        kind = "DAYLIGHT" if dst else "STANDARD"
+        lines += [
+            content_line("BEGIN", kind),
+            content_line("DTSTART", format_datetime(start)),
+            content_line("TZOFFSETFROM", _format_offset(offset_from)),
+            content_line("TZOFFSETTO", _format_offset(offset_to)),
+        ]
+        if name:
+            lines.append(content_line("TZNAME", escape(name)))
+        lines.append(content_line("END", kind))
+    lines.append(content_line("END", "VTIMEZONE"))
+    return "".join(lines)
+
+
+def begin_calendar(name: str, tzid: str, year: int) -> str:
+    return "".join(
+        [
+            content_line("BEGIN", "VCALENDAR"),
+            content_line("VERSION", "2.0"),
+            content_line("PRODID", PRODID),
+            content_line("CALSCALE", "GREGORIAN"),
+            content_line("METHOD", "PUBLISH"),
+            content_line("X-WR-CALNAME", escape(name)),
+            content_line("X-WR-TIMEZONE", tzid),
+            vtimezone(tzid, year),
+        ]
+    )
+
+
+def vevent(*lines: str) -> str:
+    return "BEGIN:VEVENT\r\n" + "".join(lines) + "END:VEVENT\r\n"
@@ -0,0 +1,96 @@
+"""Row-by-row readers for uploaded CSV and XLSX tables."""
+
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import io
+from collections.abc import Iterator, Mapping
+from typing import IO, Any
+
+from pydantic import ValidationError
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - optional dependency
+    openpyxl = None  # type: ignore[assignment]
+
+Row = tuple[int, dict[str, str]]
+
+
+def _normalize_header(name: Any, aliases: Mapping[str, str]) -> str:
+    key = " ".join(str(name or "").strip().lower().replace("ё", "е").split())
+    return aliases.get(key, key.replace(" ", "_"))
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def describe_error(exc: Exception) -> str:
+    """Human-readable message for a row that failed to parse or validate."""
+
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()
+        )
+    return str(exc)
+
+
+def _iter_csv(fileobj: IO[bytes], aliases: Mapping[str, str]) -> Iterator[Row]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        header_line = text.readline()
+        # Excel с русской локалью сохраняет CSV через точку с запятой
+        delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+        header = next(csv.reader([header_line], delimiter=delimiter), [])
+        columns = [_normalize_header(name, aliases) for name in header]
+        for line, values in enumerate(csv.reader(text, delimiter=delimiter), 2):
+            if not any(v.strip() for v in values):
+                continue
+            row = {column: value.strip() for column, value in zip(columns, values)}
+            yield line, row
+    except UnicodeDecodeError as exc:
+        raise ValueError("CSV должен быть в кодировке UTF-8") from exc
+    finally:
+        text.detach()
+
+
+def _iter_xlsx(fileobj: IO[bytes], aliases: Mapping[str, str]) -> Iterator[Row]:
+    if openpyxl is None:
+        raise ValueError("Для импорта XLSX на сервере нужен пакет openpyxl")
+    workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = [_normalize_header(name, aliases) for name in next(rows, ())]
+        for line, values in enumerate(rows, 2):
+            cells = [_cell(v) for v in values]
+            if not any(cells):
+                continue
+            yield line, dict(zip(columns, cells))
+    finally:
+        workbook.close()
+
+
+def iter_table_rows(
+    filename: str, fileobj: IO[bytes], aliases: Mapping[str, str] | None = None
+) -> Iterator[Row]:
+    """Yield ``(line number, {column: value})`` for each non-empty data row.
+
+    Column names are lower-cased and mapped through ``aliases``, so a header
+    like ``ФИО`` can stand for ``full_name``. The file is read lazily: the
+    caller may stop at any row without parsing the rest.
+    """
+
+    aliases = aliases or {}
+    if filename.lower().endswith(".xlsx"):
+        return _iter_xlsx(fileobj, aliases)
+    if filename and not filename.lower().endswith((".csv", ".txt")):
+        raise ValueError("Поддерживаются файлы CSV и XLSX")
+    return _iter_csv(fileobj, aliases)
@@ -0,0 +1,184 @@
+"""Per-query Python overhead: statements built per call vs prebuilt constants.
+
+Runs the queries behind the busiest endpoints (login, current user,
+notifications, schedule, news, events) against a small in-memory SQLite
+database, once written the old way (``select()`` assembled on every call)
+and once through ``app.crud.statements``::
+
+    python benchmarks/cached_statements.py --rounds 2000
+
+The data set is tiny on purpose, so the time is mostly ORM and driver
+overhead rather than query execution.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from app.core.database import Base  # noqa: E402
+from app.crud import statements as st  # noqa: E402
+from app.models import models  # noqa: E402
+from sqlalchemy import and_, desc, func, or_, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+EMAIL = "user1@example.com"
+CURSOR_AT = dt.datetime(2100, 1, 1)
+
+
+def inline_queries(user_id: int, group_id: int, event_ids: list[int]) -> list:
+    N, EA = models.Notification, models.EventAttendance
+    return [
+        (select(models.User).where(models.User.email == EMAIL), None),
+        (
+            select(N)
+            .where(and_(N.user_id == user_id))
+            .order_by(desc(N.created_at), desc(N.id))
+            .limit(21),
+            None,
+        ),
+        (
+            select(N)
+            .where(
+                and_(
+                    N.user_id == user_id,
+                    or_(
+                        N.created_at < CURSOR_AT,
+                        and_(N.created_at == CURSOR_AT, N.id < 10**6),
+                    ),
+                )
+            )
+            .order_by(desc(N.created_at), desc(N.id))
+            .limit(21),
+            None,
+        ),
+        (
+            select(func.count(N.id)).where(
+                and_(N.user_id == user_id, N.read.is_(False))
+            ),
+            None,
+        ),
+        (
+            select(models.Schedule)
+            .where(models.Schedule.group_id == group_id)
+            .order_by(models.Schedule.weekday, models.Schedule.start_time),
+            None,
+        ),
+        (
+            select(models.News)
+            .order_by(models.News.created_at.desc())
+            .offset(0)
+            .limit(10),
+            None,
+        ),
+        (
+            select(EA.event_id, func.count(EA.id))
+            .where(EA.event_id.in_(event_ids))
+            .group_by(EA.event_id),
+            None,
+        ),
+        (
+            select(models.EventFile).where(models.EventFile.event_id.in_(event_ids)),
+            None,
+        ),
+        (select(EA.event_id).where(EA.user_id == user_id), None),
+    ]
+
+
+def cached_queries(user_id: int, group_id: int, event_ids: list[int]) -> list:
+    return [
+        (st.USER_BY_EMAIL, {"email": EMAIL}),
+        (st.NOTIFICATIONS_FIRST_PAGE, {"user_id": user_id, "limit": 21}),
+        (
+            st.NOTIFICATIONS_AFTER_CURSOR,
+            {
+                "user_id": user_id,
+                "cursor_at": CURSOR_AT,
+                "cursor_id": 10**6,
+                "limit": 21,
+            },
+        ),
+        (st.UNREAD_NOTIFICATIONS_COUNT, {"user_id": user_id}),
+        (st.SCHEDULE_BY_GROUP, {"group_id": group_id}),
+        (st.NEWS_PAGE, {"skip": 0, "limit": 10}),
+        (st.ATTENDANCE_COUNTS, {"event_ids": event_ids}),
+        (st.FILES_BY_EVENTS, {"event_ids": event_ids}),
+        (st.ATTENDED_EVENT_IDS, {"user_id": user_id}),
+    ]
+
+
+async def seed(session) -> tuple[int, int, list[int]]:
+    group = models.Group(name="ИВТ-1")
+    session.add(group)
+    await session.flush()
+    user = models.User(
+        email=EMAIL, hashed_password="x", role="student", group_id=group.id
+    )
+    session.add(user)
+    await session.flush()
+    event_ids = []
+    for i in range(5):
+        event = models.Event(
+            title=f"e{i}",
+            starts_at=dt.datetime(2100, 1, 1 + i),
+            ends_at=dt.datetime(2100, 1, 1 + i, 2),
+            created_by=user.id,
+        )
+        session.add(event)
+        await session.flush()
+        event_ids.append(event.id)
+        session.add(models.EventFile(event_id=event.id, file_url=f"/f{i}"))
+    session.add_all(
+        models.Notification(user_id=user.id, title=f"n{i}") for i in range(30)
+    )
+    session.add_all(models.News(title=f"news {i}", content="...") for i in range(15))
+    await session.commit()
+    return user.id, group.id, event_ids
+
+
+async def run(session, build, args, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        # строим запросы в цикле: так, как это происходит в обработчиках
+        for stmt, params in build(*args):
+            await session.execute(stmt, params)
+    return time.perf_counter() - started
+
+
+async def main(rounds: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as session:
+        args = await seed(session)
+        per_round = len(cached_queries(*args))
+        for build in (inline_queries, cached_queries):  # прогрев кеша компиляции
+            await run(session, build, args, 50)
+        # чередуем короткие серии, чтобы шум машины делился поровну
+        inline = cached = 0.0
+        for _ in range(10):
+            inline += await run(session, inline_queries, args, rounds // 10)
+            cached += await run(session, cached_queries, args, rounds // 10)
+    await engine.dispose()
+
+    total = rounds * per_round
+    print(f"{per_round} queries x {rounds} rounds")
+    print(f"built per call   {inline / total * 1e6:8.1f} us/query")
+    print(f"prebuilt         {cached / total * 1e6:8.1f} us/query")
+    print(f"saved            {(inline - cached) / total * 1e6:8.1f} us/query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().rounds))
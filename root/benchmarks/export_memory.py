@@ -0,0 +1,97 @@
+"""Peak memory and time to first byte of a user export.
+
+Seeds a temporary SQLite database with ``--rows`` users, then exports them
+once the old way (all ORM rows loaded, serialized in one go) and once
+through ``app.api.exports.stream_rows``::
+
+    python benchmarks/export_memory.py --rows 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+_db = Path(tempfile.mkdtemp()) / "export.db"
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db}"
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from app.api.exports import stream_rows, users_export_query  # noqa: E402
+from app.core.database import Base, async_session, engine  # noqa: E402
+from app.core.serialization import dumps  # noqa: E402
+from app.models import models  # noqa: E402
+from app.schemas.schemas import UserOut  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+
+async def seed(rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        batch = 5000
+        for start in range(0, rows, batch):
+            await conn.execute(
+                insert(models.User),
+                [
+                    {
+                        "email": f"user{i}@example.com",
+                        "hashed_password": "x",
+                        "full_name": f"Студент {i}",
+                        "role": "student",
+                        "is_active": True,
+                    }
+                    for i in range(start, min(start + batch, rows))
+                ],
+            )
+
+
+async def load_all() -> tuple[int, float]:
+    started = time.perf_counter()
+    async with async_session() as session:
+        users = (await session.scalars(select(models.User))).all()
+        body = dumps([UserOut.model_validate(u).model_dump(mode="json") for u in users])
+    return len(body), time.perf_counter() - started
+
+
+async def stream() -> tuple[int, float]:
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    async for chunk in stream_rows(users_export_query(), "ndjson"):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    return size, first_byte or 0.0
+
+
+async def measure(label: str, run) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    size, first_byte = await run()
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{label:<10} {size / 2**20:7.1f} MiB out  peak {peak / 2**20:7.1f} MiB"
+        f"  first byte {first_byte * 1000:7.0f} ms  total {total:5.2f} s"
+    )
+
+
+async def main(rows: int) -> None:
+    await seed(rows)
+    await measure("load all", load_all)
+    await measure("stream", stream)
+    await engine.dispose()
+    _db.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    asyncio.run(main(parser.parse_args().rows))
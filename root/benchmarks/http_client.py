@@ -0,0 +1,142 @@
+"""Per-call ``httpx.AsyncClient`` vs the shared app client.
+
+Starts a local HTTPS server with a self-signed certificate (the Spotify API is
+HTTPS, so the handshake is the main cost we avoid) and times sequential GET
+requests both ways::
+
+    python benchmarks/http_client.py --requests 200
+
+Requires ``cryptography`` (already pulled in by python-jose).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import ssl
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from app.core.http import build_http_client  # noqa: E402
+
+BODY = b'{"is_playing": false}'
+
+
+async def mock_api(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": BODY})
+
+
+def _self_signed(tmp: Path) -> tuple[Path, Path]:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = dt.datetime.now(dt.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - dt.timedelta(days=1))
+        .not_valid_after(now + dt.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False
+        )
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = tmp / "cert.pem", tmp / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return cert_path, key_path
+
+
+async def _timed(call, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{label:<22} mean {statistics.mean(samples):7.2f} ms   "
+        f"p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms"
+    )
+
+
+async def main(n: int, port: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = _self_signed(Path(tmp))
+        config = uvicorn.Config(
+            mock_api,
+            host="127.0.0.1",
+            port=port,
+            ssl_certfile=str(cert),
+            ssl_keyfile=str(key),
+            log_level="warning",
+        )
+        server = uvicorn.Server(config)
+        serve = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        url = f"https://localhost:{port}/v1/me/player/currently-playing"
+        tls = ssl.create_default_context(cafile=str(cert))
+
+        async def per_call():
+            async with httpx.AsyncClient(verify=tls, timeout=10) as client:
+                (await client.get(url)).raise_for_status()
+
+        shared = build_http_client(verify=tls)
+
+        async def reused():
+            (await shared.get(url)).raise_for_status()
+
+        try:
+            await per_call()
+            await reused()
+            _report("new client per call", await _timed(per_call, n))
+            _report("shared client", await _timed(reused, n))
+        finally:
+            await shared.aclose()
+            server.should_exit = True
+            await serve
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8443)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.port))
@@ -0,0 +1,160 @@
+"""Response serialization cost for the /events, /users and /notifications payloads.
+
+Serves the same in-memory data two ways from a throwaway FastAPI app:
+``response_model`` validation + stdlib JSON (the default) and the trusted
+path (``project_all`` + ``FastJSONResponse``, orjson when installed)::
+
+    python benchmarks/json_responses.py --items 500 --requests 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+from app.core import serialization  # noqa: E402
+from app.core.serialization import project_all, trusted_json_response  # noqa: E402
+from app.schemas import schemas  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+
+def make_data(n: int):
+    now = dt.datetime(2025, 9, 1, 9, 30, 15, 250000)
+    events = [
+        {
+            "id": i,
+            "title": f"Событие {i}",
+            "description": "Описание " * 20,
+            "about": None,
+            "event_type": "lecture",
+            "location": "Ауд. 101",
+            "starts_at": now,
+            "ends_at": now + dt.timedelta(hours=2),
+            "created_by": 1,
+            "created_at": now,
+            "participant_count": i % 50,
+            "files": [
+                schemas.EventFileOut(id=i, event_id=i, file_url=f"/static/f{i}.pdf")
+            ],
+            "is_active": True,
+            "is_registered": bool(i % 2),
+            "speaker": "Иванов И.И.",
+            "image_url": None,
+        }
+        for i in range(n)
+    ]
+    users = [
+        SimpleNamespace(
+            id=i,
+            email=f"user{i}@example.com",
+            full_name=f"Пользователь {i}",
+            role="student",
+            group_id=i % 20,
+            is_active=True,
+            spotify_connected=False,
+            spotify_is_connected=False,
+            **{
+                name: None
+                for name in (
+                    "avatar_url cover_url about record_book_number status "
+                    "institute course education_level track program telegram "
+                    "achievements department position spotify_display_name"
+                ).split()
+            },
+        )
+        for i in range(n)
+    ]
+    notifications = [
+        SimpleNamespace(
+            id=i,
+            title=f"Напоминание {i}",
+            body="Пара начинается через 10 минут",
+            type="schedule",
+            url="/schedule",
+            created_at=now,
+            read=False,
+            read_at=None,
+        )
+        for i in range(min(n, 100))
+    ]
+    return events, users, notifications
+
+
+def build_app(events, users, notifications) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated/events", response_model=List[schemas.EventOut])
+    async def validated_events():
+        return events
+
+    @app.get("/validated/users", response_model=List[schemas.UserOut])
+    async def validated_users():
+        return users
+
+    @app.get("/validated/notifications", response_model=schemas.NotificationsListOut)
+    async def validated_notifications():
+        return schemas.NotificationsListOut(
+            items=[schemas.NotificationOut.from_orm(n) for n in notifications],
+            unread_count=len(notifications),
+            has_more=False,
+        )
+
+    @app.get("/trusted/events", response_model=List[schemas.EventOut])
+    async def trusted_events():
+        return trusted_json_response(project_all(schemas.EventOut, events))
+
+    @app.get("/trusted/users", response_model=List[schemas.UserOut])
+    async def trusted_users():
+        return trusted_json_response(project_all(schemas.UserOut, users))
+
+    @app.get("/trusted/notifications", response_model=schemas.NotificationsListOut)
+    async def trusted_notifications():
+        return trusted_json_response(
+            {
+                "items": project_all(schemas.NotificationOut, notifications),
+                "unread_count": len(notifications),
+                "has_more": False,
+            }
+        )
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, n: int) -> float:
+    await client.get(path)
+    started = time.perf_counter()
+    for _ in range(n):
+        (await client.get(path)).raise_for_status()
+    return (time.perf_counter() - started) / n * 1000
+
+
+async def main(items: int, requests: int) -> None:
+    app = build_app(*make_data(items))
+    transport = httpx.ASGITransport(app=app)
+    backend = "orjson" if serialization.orjson is not None else "json"
+    print(f"{items} items per list, trusted path uses {backend}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        for name in ("events", "users", "notifications"):
+            slow = await measure(c, f"/validated/{name}", requests)
+            fast = await measure(c, f"/trusted/{name}", requests)
+            print(
+                f"/{name:<14} validated {slow:7.2f} ms   trusted {fast:7.2f} ms"
+                f"   x{slow / fast:4.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.requests))
@@ -0,0 +1,106 @@
+"""Requests/sec through the correlation-id + security-headers middleware pair.
+
+Compares the previous ``BaseHTTPMiddleware`` implementations (reproduced
+below) with the pure ASGI ones in ``app.core`` on a trivial JSON endpoint,
+driving the app in-process through ``httpx.ASGITransport``::
+
+    python benchmarks/middleware_stack.py --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+from app.core.config import Settings  # noqa: E402
+from app.core.observability import CorrelationIdMiddleware  # noqa: E402
+from app.core.security_headers import (  # noqa: E402
+    SecurityHeadersMiddleware,
+    build_security_headers,
+)
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+
+class LegacyCorrelationIdMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, header_name: str = "x-request-id") -> None:
+        super().__init__(app)
+        self._header_name = header_name
+
+    async def dispatch(self, request, call_next):
+        request_id = request.headers.get(self._header_name) or uuid.uuid4().hex
+        response = await call_next(request)
+        response.headers[self._header_name] = request_id
+        return response
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    # прежняя версия собирала заголовки из настроек на каждый ответ
+    def __init__(self, app, *, settings: Settings) -> None:
+        super().__init__(app)
+        self._settings = settings
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in build_security_headers(self._settings):
+            response.headers[name] = value
+        return response
+
+
+async def endpoint(request):
+    return JSONResponse({"status": "ok"})
+
+
+def build_app(legacy: bool) -> Starlette:
+    settings = Settings()
+    app = Starlette(routes=[Route("/", endpoint)])
+    if legacy:
+        app.add_middleware(LegacySecurityHeadersMiddleware, settings=settings)
+        app.add_middleware(LegacyCorrelationIdMiddleware)
+    else:
+        app.add_middleware(SecurityHeadersMiddleware, settings=settings)
+        app.add_middleware(CorrelationIdMiddleware)
+    return app
+
+
+async def measure(app: Starlette, n: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        for _ in range(200):
+            await c.get("/")
+        queue = iter(range(n))
+
+        async def worker():
+            for _ in queue:
+                (await c.get("/")).raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return n / (time.perf_counter() - started)
+
+
+async def main(n: int, concurrency: int) -> None:
+    bare = Starlette(routes=[Route("/", endpoint)])
+    for label, app in (
+        ("no middleware", bare),
+        ("BaseHTTPMiddleware", build_app(legacy=True)),
+        ("pure ASGI", build_app(legacy=False)),
+    ):
+        print(f"{label:<20} {await measure(app, n, concurrency):8.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,172 @@
+"""UPDATE throughput: presence on the wide ``users`` row vs ``spotify_presence``.
+
+Creates two scratch tables that mirror the schema before and after the move
+(the old one with all profile columns and the ``ix_users_*`` indexes), fills
+them with the same users and rewrites now-playing for random users::
+
+    python benchmarks/presence_updates.py --url postgresql+asyncpg://... --users 5000
+
+Without ``--url`` a temporary SQLite file is used, which shows the write
+volume but not PostgreSQL HOT-update effects; run it against Postgres for
+representative numbers. The scratch tables are dropped afterwards.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    insert,
+    update,
+)
+from sqlalchemy.ext.asyncio import create_async_engine
+
+metadata = MetaData()
+
+_PROFILE_COLUMNS = (
+    "email full_name role avatar_url cover_url about record_book_number status "
+    "institute course education_level track program telegram achievements "
+    "department position spotify_user_id spotify_access_token "
+    "spotify_refresh_token spotify_scope spotify_display_name"
+).split()
+
+wide = Table(
+    "bench_users_wide",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    *(Column(name, String) for name in _PROFILE_COLUMNS),
+    Column("is_active", Boolean, index=True),
+    Column("spotify_token_expires_at", DateTime, index=True),
+    Column("spotify_is_connected", Boolean, index=True),
+    Column("spotify_is_playing", Boolean, index=True),
+    Column("spotify_last_checked_at", DateTime, index=True),
+    Column("spotify_last_track_id", String, index=True),
+    Column("spotify_last_track_name", String),
+    Column("spotify_last_artist_name", String),
+    Column("spotify_last_album_name", String),
+    Column("spotify_last_track_url", String),
+    Column("spotify_last_album_image_url", String),
+)
+Index("ix_bench_users_wide_email", wide.c.email, unique=True)
+Index("ix_bench_users_wide_role", wide.c.role)
+
+narrow = Table(
+    "bench_spotify_presence",
+    metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("is_playing", Boolean, nullable=False),
+    Column("checked_at", DateTime),
+    Column("track_id", String),
+    Column("track_name", String),
+    Column("artist_name", String),
+    Column("album_name", String),
+    Column("track_url", String),
+    Column("album_image_url", String),
+)
+
+
+def _track(i: int) -> dict[str, object]:
+    return {
+        "track_id": f"track{i:08d}",
+        "track_name": f"Song {i}",
+        "artist_name": "Artist",
+        "album_name": "Album",
+        "track_url": f"https://open.spotify.com/track/{i}",
+        "album_image_url": f"https://i.scdn.co/image/{i}",
+    }
+
+
+async def _seed(conn, users: int) -> None:
+    profile = {name: f"{name}-value" for name in _PROFILE_COLUMNS}
+    await conn.execute(
+        insert(wide),
+        [
+            {**profile, "id": i, "email": f"u{i}@example.com", "is_active": True}
+            for i in range(1, users + 1)
+        ],
+    )
+    await conn.execute(
+        insert(narrow),
+        [{"user_id": i, "is_playing": False} for i in range(1, users + 1)],
+    )
+
+
+_WIDE_NAMES = {
+    "is_playing": "spotify_is_playing",
+    "checked_at": "spotify_last_checked_at",
+}
+
+
+async def _run(
+    engine, table, key, wide_names: bool, ids: list[int], batch: int
+) -> float:
+    started = time.perf_counter()
+    for start in range(0, len(ids), batch):
+        async with engine.begin() as conn:
+            for n, user_id in enumerate(ids[start : start + batch], start):
+                values = {"is_playing": n % 2 == 0, "checked_at": dt.datetime.utcnow()}
+                values.update(_track(n))
+                await conn.execute(
+                    update(table)
+                    .where(key == user_id)
+                    .values(
+                        {
+                            (
+                                _WIDE_NAMES.get(k, "spotify_last_" + k)
+                                if wide_names
+                                else k
+                            ): v
+                            for k, v in values.items()
+                        }
+                    )
+                )
+    return len(ids) / (time.perf_counter() - started)
+
+
+async def main(url: str, users: int, updates: int, batch: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.drop_all)
+        await conn.run_sync(metadata.create_all)
+        await _seed(conn, users)
+    ids = [random.randint(1, users) for _ in range(updates)]
+    try:
+        # прогрев, чтобы первый замер не платил за холодный кеш
+        await _run(engine, narrow, narrow.c.user_id, False, ids[:batch], batch)
+        await _run(engine, wide, wide.c.id, True, ids[:batch], batch)
+        before = await _run(engine, wide, wide.c.id, True, ids, batch)
+        after = await _run(engine, narrow, narrow.c.user_id, False, ids, batch)
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.drop_all)
+        await engine.dispose()
+    print(f"users.spotify_* columns   {before:10.0f} updates/s")
+    print(f"spotify_presence table    {after:10.0f} updates/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+    url = args.url
+    with tempfile.TemporaryDirectory() as tmp:
+        if not url:
+            url = f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        asyncio.run(main(url, args.users, args.updates, args.batch))
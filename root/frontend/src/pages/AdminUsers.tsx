@@ -4,7 +4,7 @@ import Layout from "../components/Layout"
 import {
   Box, Typography, Avatar, Select, MenuItem, TextField, InputLabel, FormControl,
   IconButton, Paper, Table, TableHead, TableRow, TableCell, TableBody, TableContainer, Stack,
-  type SelectChangeEvent,
+  Button, CircularProgress, type SelectChangeEvent,
 } from "@mui/material"
 import DeleteIcon from "@mui/icons-material/Delete"
 import { useAuth } from "../contexts/AuthContext"
@@ -25,12 +25,24 @@ type AdminUser = {
 
 type Group = { id: number; name: string }
 
+type UsersPage = {
+  items: AdminUser[]
+  next_cursor: string | null
+  total: number
+}
+
+type UserSort = "full_name" | "email" | "role"
+
 type UserFilters = {
-  full_name: string
+  search: string
   group_id: string
   role: "" | UserRole
+  sort: UserSort
+  order: "asc" | "desc"
 }
 
+const PAGE_SIZE = 50
+
 function getAvatar(url: string | null | undefined, id: number) {
   if (!url) return ""
   if (url.startsWith("http")) return url
@@ -39,20 +51,47 @@ function getAvatar(url: string | null | undefined, id: number) {
 
 export default function AdminUsers() {
   const [users, setUsers] = useState<AdminUser[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [total, setTotal] = useState(0)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [groups, setGroups] = useState<Group[]>([])
-  const [filters, setFilters] = useState<UserFilters>({ full_name: "", group_id: "", role: "" })
+  const [filters, setFilters] = useState<UserFilters>({
+    search: "",
+    group_id: "",
+    role: "",
+    sort: "full_name",
+    order: "asc",
+  })
   const { user: userContext } = useAuth()
   const isMobile = useMediaQuery("(max-width:1200px)")
 
-  const fetchUsers = useCallback(async () => {
-    const params: Record<string, string> = {}
-    if (filters.full_name) params.full_name = filters.full_name
+  const fetchUsers = useCallback(async (cursor?: string) => {
+    const params: Record<string, string> = {
+      sort: filters.sort,
+      order: filters.order,
+      limit: String(PAGE_SIZE),
+    }
+    if (filters.search) params.search = filters.search
     if (filters.group_id) params.group_id = filters.group_id
     if (filters.role) params.role = filters.role
-    const res = await api.get<AdminUser[]>("/users", { params })
-    setUsers(Array.isArray(res.data) ? res.data : [])
+    if (cursor) params.cursor = cursor
+    const res = await api.get<UsersPage>("/users", { params })
+    const items = Array.isArray(res.data?.items) ? res.data.items : []
+    setUsers(prev => (cursor ? [...prev, ...items] : items))
+    setNextCursor(res.data?.next_cursor ?? null)
+    setTotal(res.data?.total ?? items.length)
   }, [filters])
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      await fetchUsers(nextCursor)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const fetchGroups = useCallback(async () => {
     const res = await api.get<Group[]>("/groups")
     setGroups(Array.isArray(res.data) ? res.data : [])
@@ -91,6 +130,11 @@ export default function AdminUsers() {
     setFilters(prev => ({ ...prev, group_id: event.target.value }))
   }
 
+  const handleSortChange = (event: SelectChangeEvent<string>) => {
+    const [sort, order] = event.target.value.split(":") as [UserSort, UserFilters["order"]]
+    setFilters(prev => ({ ...prev, sort, order }))
+  }
+
   const handleGroupSelectChange = (userId: number) => (event: SelectChangeEvent<string>) => {
     void handleGroupChange(userId, event.target.value)
   }
@@ -131,9 +175,9 @@ export default function AdminUsers() {
           </Typography>
           <Box mb={2} display="flex" gap={2} flexWrap="wrap">
             <TextField
-              label="ФИО"
-              value={filters.full_name}
-              onChange={e => handleFilterChange("full_name")(e.target.value)}
+              label="ФИО или email"
+              value={filters.search}
+              onChange={e => handleFilterChange("search")(e.target.value)}
               sx={{ minWidth: 220 }}
             />
             <FormControl sx={{ minWidth: 150 }}>
@@ -156,7 +200,20 @@ export default function AdminUsers() {
                 <MenuItem value="admin">Админ</MenuItem>
               </Select>
             </FormControl>
+            <FormControl sx={{ minWidth: 180 }}>
+              <InputLabel>Сортировка</InputLabel>
+              <Select value={`${filters.sort}:${filters.order}`} onChange={handleSortChange}>
+                <MenuItem value="full_name:asc">ФИО (А–Я)</MenuItem>
+                <MenuItem value="full_name:desc">ФИО (Я–А)</MenuItem>
+                <MenuItem value="email:asc">Email (A–Z)</MenuItem>
+                <MenuItem value="email:desc">Email (Z–A)</MenuItem>
+                <MenuItem value="role:asc">Роль</MenuItem>
+              </Select>
+            </FormControl>
           </Box>
+          <Typography mb={1} color="text.secondary">
+            Найдено: {total}
+          </Typography>
 
           {isMobile ? (
             <Stack spacing={2}>
@@ -276,6 +333,15 @@ export default function AdminUsers() {
               </Table>
             </TableContainer>
           )}
+          {(nextCursor || loadingMore) && (
+            <Box sx={{ mt: 2 }}>
+              {loadingMore ? (
+                <Stack alignItems="center" sx={{ py: 1 }}><CircularProgress size={22} /></Stack>
+              ) : (
+                <Button fullWidth variant="outlined" onClick={() => void loadMore()}>Показать ещё</Button>
+              )}
+            </Box>
+          )}
         </Box>
       </Box>
     </Layout>
@@ -32,15 +32,12 @@ type Lesson = {
   end_time: string
   parity: "odd" | "even" | "both"
 }
+// Чётность недели считает бэкенд (по ISO-номеру), как напоминания и .ics.
+type ScheduleWeek = { week_start: string; week_end: string; parity: "odd" | "even"; lessons: Lesson[] }
 
 const pad = (n: number) => String(n).padStart(2, "0")
 const fmtTime = (s?: string) => (!s ? "" : s.length >= 16 && s[10] === "T" ? s.slice(11, 16) : s.slice(0, 5))
 const WEEK = ["Воскресенье", "Понедельник","Вторник","Среда","Четверг","Пятница","Суббота"] as const
-const nowParity = () => {
-  const onejan = new Date(new Date().getFullYear(), 0, 1)
-  const week = Math.ceil(((+new Date() - +onejan) / 86400000 + onejan.getDay() + 1) / 7)
-  return week % 2 === 0 ? "even" : "odd"
-}
 const parseMinutes = (s?: string) => {
   if (!s) return null
   const hhmm = s.length >= 16 && s[10] === "T" ? s.slice(11, 16) : s.slice(0, 5)
@@ -148,10 +145,10 @@ export default function Dashboard() {
   const [news, setNews] = useState<NewsItem[]>([])
   const [events, setEvents] = useState<EventItem[]>([])
   const [schedule, setSchedule] = useState<Lesson[]>([])
+  const [parity, setParity] = useState<"odd" | "even" | null>(null)
 
   const [eventsScope, setEventsScope] = useState<"today" | "week">("today")
 
-  const parity = useMemo(nowParity, [])
   const today = useMemo(() => WEEK[time.getDay()], [time])
 
   const todayLessons = useMemo(() => {
@@ -249,13 +246,16 @@ export default function Dashboard() {
     setLoadingSched(true)
     try {
       if (user.role === "student" && user.group_id) {
-        const r = await axios.get(`/schedule/${user.group_id}`)
-        setSchedule(Array.isArray(r.data) ? r.data : [])
+        const r = await axios.get<ScheduleWeek>(`/schedule/${user.group_id}/week`)
+        setSchedule(Array.isArray(r.data?.lessons) ? r.data.lessons : [])
+        setParity(r.data?.parity ?? null)
       } else {
         setSchedule([])
+        setParity(null)
       }
     } catch {
       setSchedule([])
+      setParity(null)
     } finally {
       setLoadingSched(false)
     }
@@ -2,8 +2,10 @@ import asyncio
 import os
 import sys
 import uuid
-from collections.abc import AsyncIterator, Awaitable, Callable
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import ContextManager
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -51,21 +53,9 @@ else:
 
     slowapi_middleware.SlowAPIMiddleware = _NoopSlowAPIMiddleware
 
-from app.core import security_headers as security_headers_module
-
-
-class _NoopSecurityHeadersMiddleware:
-    def __init__(self, app, *args, **kwargs):
-        self.app = app
-
-    async def __call__(self, scope, receive, send):
-        await self.app(scope, receive, send)
-
-
-security_headers_module.SecurityHeadersMiddleware = _NoopSecurityHeadersMiddleware
-
-from app import main
+from app import crud, main
 from app.core.database import Base, async_session, engine
+from app.core.query_stats import QueryStats, track_queries
 from app.models import models
 
 
@@ -95,6 +85,8 @@ async def clean_database(prepare_database: None) -> AsyncIterator[None]:
         for table in reversed(Base.metadata.sorted_tables):
             await conn.execute(table.delete())
         await conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+    crud.users_count_cache.clear()
+    crud.schedule_cache.clear()
 
 
 @pytest.fixture
@@ -106,17 +98,15 @@ def app():
 async def async_client(
     monkeypatch: pytest.MonkeyPatch,
 ) -> AsyncIterator[httpx.AsyncClient]:
-    async def _start_notifications_scheduler(
-        *args, **kwargs
-    ) -> Callable[[], Awaitable[None]]:
+    async def _start_noop_worker(*args, **kwargs) -> Callable[[], Awaitable[None]]:
         async def _stop() -> None:
             return None
 
         return _stop
 
-    monkeypatch.setattr(
-        main, "start_notifications_scheduler", _start_notifications_scheduler
-    )
+    monkeypatch.setattr(main, "start_notifications_scheduler", _start_noop_worker)
+    monkeypatch.setattr(main, "start_mail_outbox_worker", _start_noop_worker)
+    monkeypatch.setattr(main, "start_spotify_presence_poller", _start_noop_worker)
 
     transport = httpx.ASGITransport(app=main.app)
     async with LifespanManager(main.app):
@@ -152,5 +142,19 @@ async def user_factory(db_session) -> Callable[..., Awaitable[models.User]]:
 
 
 @pytest.fixture
+def query_budget() -> Callable[[int], ContextManager[QueryStats]]:
+    """``with query_budget(3): await client.get(...)`` fails on more queries."""
+
+    @contextmanager
+    def _budget(max_queries: int) -> Iterator[QueryStats]:
+        with track_queries(keep_statements=True) as stats:
+            yield stats
+        over = f"{stats.count} queries over a budget of {max_queries}"
+        assert stats.count <= max_queries, over + ":\n" + "\n".join(stats.statements)
+
+    return _budget
+
+
+@pytest.fixture(scope="session")
 def anyio_backend() -> str:
     return "asyncio"
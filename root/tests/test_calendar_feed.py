@@ -0,0 +1,169 @@
+import datetime as dt
+from types import SimpleNamespace
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+
+import pytest
+from app.auth.security import create_access_token
+from app.models import models
+from app.services.calendar_feed import lesson_event
+from app.utils.icalendar import iter_vevents, parse_rrule, vtimezone
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+MONDAY = dt.datetime(2025, 9, 1, 9)  # 36-я ISO-неделя, чётная
+
+
+def _auth(user) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+
+async def _feeds(client, user) -> dict:
+    response = await client.post("/calendar/token", headers=_auth(user))
+    assert response.status_code == 200
+    return {k: urlparse(v).path if v else v for k, v in response.json().items()}
+
+
+def test_parity_lessons_stay_exact_across_53_week_years():
+    lesson = SimpleNamespace(
+        id=1,
+        subject="Матанализ",
+        room=None,
+        teacher=None,
+        lesson_type=None,
+        parity="odd",
+        start_time=dt.datetime(2026, 12, 14, 9),  # 51-я неделя, в 2026 их 53
+        end_time=dt.datetime(2026, 12, 14, 10, 30),
+        repeat_until=dt.date(2027, 1, 31),
+        exception_dates=[],
+        updated_at=None,
+    )
+    (event,) = iter_vevents(lesson_event(lesson, ZoneInfo("Europe/Moscow")))
+    assert parse_rrule(event.first("RRULE").value)["INTERVAL"] == "1"
+    assert event.first("EXDATE").value.split(",") == [
+        "20261221T090000",
+        "20270111T090000",
+        "20270125T090000",
+    ]
+
+
+def test_vtimezone_lists_the_offset_changes_around_the_year():
+    moscow = vtimezone("Europe/Moscow", 2026).splitlines()
+    assert moscow[moscow.index("BEGIN:STANDARD") + 1 :][:3] == [
+        "DTSTART:20141026T020000",  # последний переход перед окном
+        "TZOFFSETFROM:+0400",
+        "TZOFFSETTO:+0300",
+    ]
+    assert "BEGIN:DAYLIGHT" not in moscow
+
+    berlin = vtimezone("Europe/Berlin", 2026).splitlines()
+    assert berlin.count("BEGIN:DAYLIGHT") == 4  # 2025–2028
+    start = berlin.index("DTSTART:20260329T020000")
+    assert berlin[start + 1 : start + 4] == [
+        "TZOFFSETFROM:+0100",
+        "TZOFFSETTO:+0200",
+        "TZNAME:CEST",
+    ]
+
+
+async def test_group_feed_answers_304_until_the_timetable_changes(
+    async_client, db_session, user_factory, query_budget
+):
+    group = models.Group(name="З-1")
+    db_session.add(group)
+    await db_session.flush()
+    student = await user_factory(group_id=group.id)
+    teacher = await user_factory(role="teacher")
+    lessons = [
+        models.Schedule(
+            group_id=group.id,
+            subject="Матанализ",
+            room="301",
+            weekday="Понедельник",
+            parity="odd",
+            start_time=MONDAY,
+            end_time=MONDAY + dt.timedelta(minutes=90),
+            repeat_until=dt.date(2025, 12, 29),
+            exception_dates=[dt.date(2025, 11, 3)],
+        ),
+        models.Schedule(
+            group_id=group.id,
+            subject="Консультация",
+            weekday="Среда",
+            start_time=dt.datetime(2025, 9, 10, 15),
+            end_time=dt.datetime(2025, 9, 10, 16),
+        ),
+    ]
+    db_session.add_all(lessons)
+    await db_session.commit()
+
+    feeds = await _feeds(async_client, student)
+    assert feeds["group_url"].endswith(f"/groups/{group.id}.ics")
+    response = await async_client.get(feeds["group_url"])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/calendar")
+    assert "last-modified" in response.headers
+    assert vtimezone("Europe/Moscow", dt.date.today().year) in response.text
+    recurring, single = iter_vevents(response.text)
+    assert recurring.first("DTSTART").value == "20250908T090000"  # первая нечётная
+    assert recurring.first("DTSTART").params == {"TZID": "Europe/Moscow"}
+    rule = parse_rrule(recurring.first("RRULE").value)
+    assert (rule["INTERVAL"], rule["UNTIL"]) == ("2", "20251229T205959Z")
+    assert recurring.first("EXDATE").value == "20251103T090000"
+    assert recurring.text("LOCATION") == "301"
+    assert single.first("RRULE") is None
+
+    etag = response.headers["etag"]
+    with query_budget(2):
+        cached = await async_client.get(
+            feeds["group_url"], headers={"If-None-Match": etag}
+        )
+    assert cached.status_code == 304
+
+    await async_client.delete(f"/schedule/{lessons[1].id}", headers=_auth(teacher))
+    response = await async_client.get(
+        feeds["group_url"], headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert len(list(iter_vevents(response.text))) == 1
+
+
+async def test_events_feed_lists_registrations_and_tokens_rotate(
+    async_client, db_session, user_factory
+):
+    organizer = await user_factory(role="teacher")
+    student = await user_factory()
+    events = [
+        models.Event(
+            title=title,
+            location="Актовый зал",
+            starts_at=dt.datetime(2025, 10, day, 18),
+            ends_at=dt.datetime(2025, 10, day, 20),
+            created_by=organizer.id,
+        )
+        for title, day in (("День открытых дверей", 1), ("Хакатон", 2))
+    ]
+    db_session.add_all(events)
+    await db_session.flush()
+    db_session.add(models.EventAttendance(user_id=student.id, event_id=events[1].id))
+    await db_session.commit()
+
+    old = await _feeds(async_client, student)
+    assert old["group_url"] is None
+    response = await async_client.get(old["events_url"])
+    (event,) = iter_vevents(response.text)
+    assert event.text("SUMMARY") == "Хакатон"
+    etag = response.headers["etag"]
+
+    db_session.add(models.EventAttendance(user_id=student.id, event_id=events[0].id))
+    await db_session.commit()
+    new = await _feeds(async_client, student)
+    assert (await async_client.get(old["events_url"])).status_code == 404
+    response = await async_client.get(
+        new["events_url"], headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert [e.text("SUMMARY") for e in iter_vevents(response.text)] == [
+        "День открытых дверей",
+        "Хакатон",
+    ]
@@ -0,0 +1,39 @@
+import pytest
+from app.core import database
+from app.core.config import settings
+from sqlalchemy.pool import NullPool
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def test_engine_options_configure_pool_for_server_databases(monkeypatch):
+    monkeypatch.setitem(settings.__dict__, "is_development", False)
+    monkeypatch.setattr(settings, "db_pool_size", 20)
+    monkeypatch.setattr(settings, "db_pool_recycle_seconds", 600)
+
+    options = database.engine_options("postgresql+asyncpg://u:p@db/app")
+    assert options["pool_size"] == 20
+    assert options["pool_recycle"] == 600
+    assert options["pool_pre_ping"] is False
+    assert options["connect_args"] == {"prepared_statement_cache_size": 500}
+
+    monkeypatch.setattr(settings, "db_prepared_statement_cache_size", 0)
+    options = database.engine_options("postgresql+psycopg://u:p@db/app")
+    assert options["connect_args"] == {"prepare_threshold": None}
+
+    # у SQLite свой пул, параметры QueuePool к нему не применяем
+    assert "pool_size" not in database.engine_options("sqlite+aiosqlite:///x.db")
+
+    monkeypatch.setitem(settings.__dict__, "is_development", True)
+    options = database.engine_options("postgresql+asyncpg://u:p@db/app")
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+
+
+async def test_read_sessions_fall_back_to_primary_without_replica():
+    assert not settings.database_read_url
+    assert database.read_engine is database.engine
+    sessions = database.get_read_db()
+    session = await sessions.__anext__()
+    assert session.bind is database.engine
+    await sessions.aclose()
@@ -0,0 +1,128 @@
+import csv
+import datetime as dt
+import io
+import json
+
+import pytest
+from app.api.exports import encode_csv, stream_rows, users_export_query
+from app.auth.security import create_access_token
+from app.models import models
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _auth(user) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+
+def _csv_rows(text: str) -> list[dict[str, str]]:
+    return list(csv.DictReader(io.StringIO(text.lstrip("\ufeff"))))
+
+
+async def test_users_export_is_admin_only_and_streams_csv(async_client, user_factory):
+    student = await user_factory(full_name="Иванов Иван")
+    admin = await user_factory(role="admin", full_name="Админ")
+
+    response = await async_client.get("/exports/users", headers=_auth(student))
+    assert response.status_code == 403
+
+    response = await async_client.get("/exports/users", headers=_auth(admin))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = _csv_rows(response.text)
+    assert [r["email"] for r in rows] == [student.email, admin.email]
+    assert rows[0]["full_name"] == "Иванов Иван"
+
+    response = await async_client.get(
+        "/exports/users?format=ndjson&role=admin", headers=_auth(admin)
+    )
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == [admin.id]
+
+
+def test_csv_cells_never_start_a_formula():
+    row = ['=HYPERLINK("http://x")', "+1", "-2", "@SUM(A1)", "Иванов", -3, None]
+    (cells,) = csv.reader(io.StringIO(encode_csv([], [row]).decode()))
+    assert cells == [
+        '\'=HYPERLINK("http://x")',
+        "'+1",
+        "'-2",
+        "'@SUM(A1)",
+        "Иванов",
+        "-3",
+        "",
+    ]
+
+
+async def test_stream_rows_yields_one_chunk_per_batch(user_factory):
+    for _ in range(5):
+        await user_factory()
+
+    chunks = [
+        chunk
+        async for chunk in stream_rows(users_export_query(), "ndjson", batch_size=2)
+    ]
+    assert len(chunks) == 3
+    assert sum(chunk.count(b"\n") for chunk in chunks) == 5
+
+
+async def test_attendance_export_lists_registered_users(
+    async_client, user_factory, db_session
+):
+    admin = await user_factory(role="admin")
+    teacher = await user_factory(role="teacher")
+    student = await user_factory(full_name="Петров Пётр")
+    event = models.Event(
+        title="Лекция",
+        starts_at=dt.datetime(2100, 1, 1, 10),
+        ends_at=dt.datetime(2100, 1, 1, 12),
+        created_by=admin.id,
+    )
+    db_session.add(event)
+    await db_session.flush()
+    db_session.add(models.EventAttendance(event_id=event.id, user_id=student.id))
+    await db_session.commit()
+
+    url = f"/exports/events/{event.id}/attendance"
+    assert (await async_client.get(url, headers=_auth(teacher))).status_code == 403
+    missing = await async_client.get(
+        "/exports/events/999999/attendance", headers=_auth(admin)
+    )
+    assert missing.status_code == 404
+
+    rows = _csv_rows((await async_client.get(url, headers=_auth(admin))).text)
+    assert [(r["user_id"], r["full_name"]) for r in rows] == [
+        (str(student.id), "Петров Пётр")
+    ]
+
+
+async def test_notification_stats_export_counts_deliveries(
+    async_client, user_factory, db_session
+):
+    admin = await user_factory(role="admin")
+    notification = models.Notification(user_id=admin.id, title="n", type="event")
+    quiet = models.Notification(user_id=admin.id, title="q", type="event")
+    db_session.add_all([notification, quiet])
+    await db_session.flush()
+    db_session.add_all(
+        [
+            models.NotificationDelivery(
+                notification_id=notification.id, channel="inapp"
+            ),
+            models.NotificationDelivery(
+                notification_id=notification.id, channel="push", status="failed"
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    response = await async_client.get(
+        "/exports/notifications?format=ndjson", headers=_auth(admin)
+    )
+    stats = {row["id"]: row for row in map(json.loads, response.text.splitlines())}
+    assert stats[notification.id]["deliveries"] == 2
+    assert stats[notification.id]["delivered"] == 1
+    assert stats[notification.id]["failed"] == 1
+    assert stats[quiet.id]["deliveries"] == 0
@@ -0,0 +1,52 @@
+import datetime as dt
+
+import httpx
+import pytest
+from app.auth.security import create_access_token
+from app.core import http
+from app.services.spotify import now_playing_cache
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+async def test_shared_client_is_reused_and_recreated_after_close():
+    await http.close_http_client()
+    client = http.get_http_client()
+    assert http.get_http_client() is client
+    assert client.timeout.connect == http.settings.http_client_connect_timeout
+
+    await http.close_http_client()
+    assert client.is_closed
+    assert http.get_http_client() is not client
+    await http.close_http_client()
+
+
+async def test_spotify_calls_go_through_shared_client(async_client, user_factory):
+    user = await user_factory(
+        spotify_access_token="old",
+        spotify_refresh_token="refresh",
+        spotify_token_expires_at=dt.datetime(2000, 1, 1),
+        spotify_is_connected=True,
+    )
+    now_playing_cache.clear()
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.method, request.url.path))
+        if request.url.path == "/api/token":
+            return httpx.Response(200, json={"access_token": "new", "expires_in": 3600})
+        assert request.headers["authorization"] == "Bearer new"
+        return httpx.Response(204)
+
+    http.set_http_client(http.build_http_client(transport=httpx.MockTransport(handler)))
+    token = create_access_token(str(user.id))
+    response = await async_client.get(
+        "/spotify/now-playing", headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["is_playing"] is False
+    assert seen == [
+        ("POST", "/api/token"),
+        ("GET", "/v1/me/player/currently-playing"),
+    ]
@@ -0,0 +1,40 @@
+import pytest
+from app.api.deps import get_current_user, get_current_user_released
+from app.auth.security import create_access_token
+from app.core.database import async_session
+from app.core.metrics import REGISTRY
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _checkouts() -> float:
+    return REGISTRY.get_sample_value("db_pool_checkouts_total", {"pool": "primary"})
+
+
+async def test_rejected_requests_do_not_check_out_connections(async_client):
+    before = _checkouts()
+
+    missing = await async_client.get("/events")
+    invalid = await async_client.get(
+        "/events", headers={"Authorization": "Bearer not-a-jwt"}
+    )
+
+    assert missing.status_code == invalid.status_code == 401
+    assert _checkouts() == before
+
+
+async def test_user_lookup_releases_connection_only_on_request(user_factory):
+    user = await user_factory()
+    token = create_access_token(str(user.id))
+
+    async with async_session() as db:
+        # обычная зависимость не платит за лишний COMMIT: обработчик
+        # продолжит работать с БД через это же соединение
+        current = await get_current_user(token, db)
+        assert db.in_transaction()
+
+        released = await get_current_user_released(current, db)
+        # транзакция закрыта, соединение уже в пуле, объект остаётся в сессии
+        assert not db.in_transaction()
+        assert released.email == user.email
+        assert released in db
@@ -0,0 +1,35 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from app.core.loop_monitor import LoopWatchdog
+from app.core.metrics import REGISTRY
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _blocking_password_check() -> None:
+    time.sleep(0.3)
+
+
+async def test_watchdog_reports_stack_of_blocking_code(caplog):
+    def sample(name: str) -> float:
+        return REGISTRY.get_sample_value(name) or 0.0
+
+    stalls_before = sample("event_loop_stalls_total")
+    lag_before = sample("event_loop_lag_seconds_sum")
+    watchdog = LoopWatchdog(interval=0.02, threshold=0.1)
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        _blocking_password_check()
+        await asyncio.sleep(0.05)
+        await watchdog.stop()
+
+    messages = [r.getMessage() for r in caplog.records]
+    assert len(messages) == 1
+    assert "Event loop blocked" in messages[0]
+    assert "_blocking_password_check" in messages[0]
+    assert sample("event_loop_stalls_total") == stalls_before + 1
+    assert sample("event_loop_lag_seconds_sum") - lag_before >= 0.25
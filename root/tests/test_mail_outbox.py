@@ -0,0 +1,103 @@
+import datetime as dt
+from email.message import EmailMessage
+
+import pytest
+from app.models import models
+from app.services import mail
+from sqlalchemy import select
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+async def test_forgot_password_is_deduplicated(async_client, user_factory, db_session):
+    user = await user_factory(email="student@example.com")
+
+    for _ in range(3):
+        response = await async_client.post(
+            "/password/forgot", json={"email": user.email}
+        )
+        assert response.json() == {"ok": True}
+
+    rows = (await db_session.execute(select(models.MailOutbox))).scalars().all()
+    tokens = (
+        (await db_session.execute(select(models.PasswordResetToken))).scalars().all()
+    )
+    assert len(rows) == 1
+    assert len(tokens) == 1
+    assert rows[0].kind == "password_reset"
+    assert "reset-password?token=" in rows[0].body_text
+
+
+async def test_outbox_batch_sends_and_retries(db_session, monkeypatch):
+    monkeypatch.setattr(mail.settings, "mail_max_attempts", 2)
+    for address in ("a@example.com", "b@example.com"):
+        await mail.enqueue_mail(
+            db_session, to_email=address, subject="s", text="t", kind="test"
+        )
+    await db_session.commit()
+
+    batches = []
+
+    async def sender(messages):
+        batches.append([m["To"] for m in messages])
+        return [None if m["To"] == "a@example.com" else OSError("x") for m in messages]
+
+    assert await mail.process_outbox_batch(db_session, sender) == 2
+    assert batches == [["a@example.com", "b@example.com"]]
+
+    rows = {
+        r.to_email: r
+        for r in (await db_session.execute(select(models.MailOutbox))).scalars()
+    }
+    assert rows["a@example.com"].status == "sent"
+    assert rows["a@example.com"].body_text is None
+    assert rows["b@example.com"].status == "pending"
+    assert rows["b@example.com"].attempts == 1
+    # повторная попытка запланирована с задержкой и пока не выбирается
+    assert await mail.process_outbox_batch(db_session, sender) == 0
+
+    await db_session.refresh(rows["b@example.com"])
+    rows["b@example.com"].next_attempt_at = dt.datetime(2000, 1, 1)
+    await db_session.commit()
+    assert await mail.process_outbox_batch(db_session, sender) == 1
+    await db_session.refresh(rows["b@example.com"])
+    assert rows["b@example.com"].status == "failed"
+
+
+class _FakeSMTP:
+    def __init__(self, fail_connect: bool = False) -> None:
+        self.fail_connect = fail_connect
+        self.is_connected = False
+        self.sent: list[str] = []
+
+    async def connect(self) -> None:
+        if self.fail_connect:
+            raise OSError("connection refused")
+        self.is_connected = True
+
+    async def send_message(self, msg) -> None:
+        self.sent.append(msg["To"])
+
+    async def quit(self) -> None:
+        self.is_connected = False
+
+    def close(self) -> None:
+        self.is_connected = False
+
+
+async def test_pool_reports_a_failed_chunk_per_message(monkeypatch):
+    pool = mail.SMTPConnectionPool(size=2)
+    good = _FakeSMTP()
+    clients = [_FakeSMTP(fail_connect=True), good]
+    monkeypatch.setattr(pool, "_new_client", lambda: clients.pop(0))
+    messages = []
+    for address in ("a@example.com", "b@example.com", "c@example.com"):
+        msg = EmailMessage()
+        msg["To"] = address
+        messages.append(msg)
+
+    results = await pool.send(messages)
+
+    # первая пачка не смогла подключиться, вторая ушла: ошибка у каждого письма
+    assert [type(r) for r in results] == [OSError, OSError, type(None)]
+    assert good.sent == ["c@example.com"]
@@ -0,0 +1,50 @@
+import pytest
+from app.core import metrics
+from app.core.config import settings
+from prometheus_client.parser import text_string_to_metric_families
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _samples(text: str) -> list:
+    return [
+        sample
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    ]
+
+
+async def test_metrics_use_route_templates_and_track_pool(async_client):
+    await async_client.get("/events")
+    await async_client.get("/events/424242")
+    await async_client.get("/no-such-page-123")
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    samples = _samples(response.text)
+    routes = {
+        s.labels["route"]
+        for s in samples
+        if s.name == "http_request_duration_seconds_count"
+    }
+    assert {"/events", "/events/{id}", metrics.UNMATCHED_ROUTE} <= routes
+    assert not any("424242" in r or "no-such-page" in r for r in routes)
+    # сам /metrics в гистограмму не попадает
+    assert "/metrics" not in routes
+
+    in_flight = [s for s in samples if s.name == "http_requests_in_flight"]
+    assert in_flight and all(s.value == 0 for s in in_flight)
+    checkouts = [s for s in samples if s.name == "db_pool_checkouts_total"]
+    assert checkouts and checkouts[0].value > 0
+
+
+async def test_metrics_token_is_required_when_configured(async_client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+
+    assert (await async_client.get("/metrics")).status_code == 401
+    response = await async_client.get(
+        "/metrics", headers={"Authorization": "Bearer scrape-secret"}
+    )
+    assert response.status_code == 200
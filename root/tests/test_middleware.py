@@ -0,0 +1,67 @@
+import httpx
+import pytest
+from app.core.config import Settings
+from app.core.observability import CorrelationIdMiddleware, get_request_id
+from app.core.security_headers import SecurityHeadersMiddleware
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+async def plain(request):
+    return PlainTextResponse(
+        "ok", headers={"X-Frame-Options": "SAMEORIGIN", "Permissions-Policy": "x=()"}
+    )
+
+
+async def stream(request):
+    async def body():
+        # контекст запроса должен быть виден и во время стриминга
+        yield (get_request_id() or "").encode()
+        yield b"|done"
+
+    return StreamingResponse(body(), media_type="text/plain")
+
+
+def _client(settings: Settings) -> httpx.AsyncClient:
+    app = Starlette(routes=[Route("/", plain), Route("/stream", stream)])
+    app.add_middleware(SecurityHeadersMiddleware, settings=settings)
+    app.add_middleware(CorrelationIdMiddleware, header_name="X-Request-ID")
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://testserver"
+    )
+
+
+async def test_security_headers_are_precomputed_and_override_app_values():
+    settings = Settings(
+        security_csp="default-src 'self';",
+        security_csp_report_only=False,
+        security_csp_report_uri="/csp",
+        security_hsts_preload=True,
+        security_permissions_policy="",
+    )
+    async with _client(settings) as client:
+        response = await client.get("/")
+
+    headers = response.headers
+    assert headers["content-security-policy"] == "default-src 'self'; report-uri /csp"
+    assert "content-security-policy-report-only" not in headers
+    assert headers["strict-transport-security"] == (
+        "max-age=31536000; includeSubDomains; preload"
+    )
+    assert headers.get_list("x-frame-options") == ["DENY"]
+    assert "permissions-policy" not in headers
+
+
+async def test_request_id_is_echoed_and_visible_while_streaming():
+    async with _client(Settings()) as client:
+        given = await client.get("/stream", headers={"X-Request-ID": "abc123"})
+        generated = await client.get("/stream")
+
+    assert given.headers["x-request-id"] == "abc123"
+    assert given.text == "abc123|done"
+    request_id = generated.headers["x-request-id"]
+    assert len(request_id) == 32
+    assert generated.text == f"{request_id}|done"
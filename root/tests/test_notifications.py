@@ -0,0 +1,39 @@
+import datetime as dt
+
+import pytest
+from app.auth.security import create_access_token
+from app.models import models
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+async def test_notifications_cursor_walks_all_pages(
+    async_client, user_factory, db_session
+):
+    user = await user_factory()
+    other = await user_factory()
+    base = dt.datetime(2100, 1, 1)
+    # две пары с одинаковым created_at проверяют сравнение по id
+    db_session.add_all(
+        models.Notification(
+            user_id=user.id, title=f"n{i}", created_at=base + dt.timedelta(i // 2)
+        )
+        for i in range(5)
+    )
+    db_session.add(models.Notification(user_id=other.id, title="чужое"))
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+    titles, url = [], "/notifications?limit=2"
+    while True:
+        page = (await async_client.get(url, headers=headers)).json()
+        titles += [item["title"] for item in page["items"]]
+        assert page["unread_count"] == 5
+        if not page["has_more"]:
+            break
+        last = page["items"][-1]
+        created = dt.datetime.fromisoformat(last["created_at"])
+        ms = int(created.replace(tzinfo=dt.timezone.utc).timestamp() * 1000)
+        url = f"/notifications?limit=2&cursor={ms}:{last['id']}"
+
+    assert titles == ["n4", "n3", "n2", "n1", "n0"]
@@ -0,0 +1,69 @@
+import pytest
+from app.auth.security import create_access_token
+from app.core.config import settings
+from app.core.profiler import StackSampler
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _auth(user) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+
+def test_sampler_collapses_stacks_of_running_code():
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    total = sum(range(10**6))  # занимаем основной поток, пока идёт выборка
+    sampler.stop()
+
+    lines = sampler.collapsed().splitlines()
+    assert total and lines and sampler.samples
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    assert "test_sampler_collapses_stacks_of_running_code" in sampler.collapsed()
+
+
+async def test_profile_endpoint_is_admin_only(async_client, user_factory):
+    student = await user_factory()
+    admin = await user_factory(role="admin")
+
+    response = await async_client.get(
+        "/debug/profile?seconds=0.05", headers=_auth(student)
+    )
+    assert response.status_code == 403
+
+    response = await async_client.get(
+        "/debug/profile?seconds=0.1&interval_ms=1", headers=_auth(admin)
+    )
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.folded"')
+    assert "run_forever" in response.text
+
+
+async def test_request_profile_is_triggered_by_header(
+    async_client, user_factory, monkeypatch
+):
+    admin = await user_factory(role="admin")
+    response = await async_client.get(
+        "/events", headers={**_auth(admin), "X-Profile": "secret"}
+    )
+    # без настроенного токена заголовок игнорируется
+    assert "x-profile-id" not in response.headers
+
+    monkeypatch.setattr(settings, "profiling_request_token", "secret")
+    response = await async_client.get(
+        "/events", headers={**_auth(admin), "X-Profile": "wrong"}
+    )
+    assert "x-profile-id" not in response.headers
+
+    response = await async_client.get(
+        "/events", headers={**_auth(admin), "X-Profile": "secret"}
+    )
+    profile_id = response.headers["x-profile-id"]
+
+    profile = await async_client.get(
+        f"/debug/profiles/{profile_id}", headers=_auth(admin)
+    )
+    assert profile.status_code == 200
+    missing = await async_client.get("/debug/profiles/nope", headers=_auth(admin))
+    assert missing.status_code == 404
@@ -0,0 +1,68 @@
+import datetime as dt
+import logging
+
+import pytest
+from app.auth.security import create_access_token
+from app.core.config import settings
+from app.models import models
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+async def _seed_events(db_session, author: models.User, count: int) -> None:
+    for i in range(count):
+        event = models.Event(
+            title=f"Событие {i}",
+            starts_at=dt.datetime(2100, 1, 1 + i, 10, 0),
+            ends_at=dt.datetime(2100, 1, 1 + i, 11, 0),
+            created_by=author.id,
+        )
+        db_session.add(event)
+        await db_session.flush()
+        db_session.add(models.EventFile(event_id=event.id, file_url=f"/static/{i}"))
+    await db_session.commit()
+
+
+async def test_events_list_stays_within_query_budget(
+    async_client, user_factory, db_session, query_budget
+):
+    user = await user_factory()
+    await _seed_events(db_session, user, 5)
+    headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+    # пользователь, события, счётчики, файлы, мои записи — не растёт с числом событий
+    with query_budget(5) as stats:
+        response = await async_client.get("/events", headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert f'desc="{stats.count} queries"' in timing
+
+
+async def test_query_budget_reports_statements_when_exceeded(
+    async_client, user_factory, query_budget
+):
+    user = await user_factory()
+    headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+    with pytest.raises(AssertionError, match="over a budget of 0"):
+        with query_budget(0):
+            await async_client.get("/events", headers=headers)
+
+
+async def test_slow_queries_are_logged_with_plan(
+    async_client, user_factory, monkeypatch, caplog
+):
+    user = await user_factory()
+    headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-6)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        await async_client.get("/events", headers=headers)
+
+    slow = [r.getMessage() for r in caplog.records if "Slow query" in r.getMessage()]
+    assert slow
+    # SQLite отвечает на EXPLAIN QUERY PLAN строками вида "SCAN events"
+    assert any("SCAN" in m or "SEARCH" in m for m in slow)
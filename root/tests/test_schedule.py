@@ -0,0 +1,258 @@
+import datetime as dt
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+from app import crud
+from app.auth.security import create_access_token
+from app.core.config import settings
+from app.models import models
+from app.services.notifications import generate_schedule_reminders
+from app.services.schedule import WEEKDAYS, expand, week_parity
+from sqlalchemy import select
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+MONDAY = dt.datetime(2025, 9, 1, 9)  # 36-я ISO-неделя, чётная
+
+
+def _lesson(**kwargs) -> SimpleNamespace:
+    defaults = dict(
+        id=1,
+        group_id=1,
+        subject="Матанализ",
+        teacher=None,
+        room=None,
+        weekday="Понедельник",
+        parity="both",
+        lesson_type="Лекция",
+        start_time=MONDAY,
+        end_time=MONDAY + dt.timedelta(minutes=90),
+        repeat_until=None,
+        exception_dates=[],
+    )
+    return SimpleNamespace(**{**defaults, **kwargs})
+
+
+def _days(occurrences) -> list[int]:
+    return [o["start_time"].day for o in occurrences]
+
+
+def test_single_lesson_occurs_once():
+    lesson = _lesson()
+    assert _days(
+        expand([lesson], dt.datetime(2025, 9, 1), dt.datetime(2025, 9, 2))
+    ) == [1]
+    assert expand([lesson], dt.datetime(2025, 9, 2), dt.datetime(2025, 9, 30)) == []
+
+
+def test_weekly_lesson_respects_parity_exceptions_and_end_date():
+    weekly = _lesson(repeat_until=dt.date(2025, 9, 29))
+    september = (dt.datetime(2025, 9, 1), dt.datetime(2025, 10, 1))
+    assert _days(expand([weekly], *september)) == [1, 8, 15, 22, 29]
+
+    odd = _lesson(repeat_until=dt.date(2025, 12, 31), parity="odd")
+    assert _days(expand([odd], *september)) == [8, 22]
+    assert all(week_parity(o["start_time"]) == "odd" for o in expand([odd], *september))
+
+    skipped = _lesson(
+        repeat_until=dt.date(2025, 9, 29), exception_dates=[dt.date(2025, 9, 15)]
+    )
+    assert _days(expand([skipped], *september)) == [1, 8, 22, 29]
+
+
+def test_expansion_starts_at_the_requested_range():
+    lesson = _lesson(repeat_until=dt.date(2030, 1, 1))
+    # лекция ещё идёт в начале диапазона — она попадает в выдачу
+    start = dt.datetime(2029, 12, 17, 10)
+    occurrences = expand([lesson], start, dt.datetime(2030, 1, 1))
+    assert [o["start_time"].date() for o in occurrences] == [
+        dt.date(2029, 12, 17),
+        dt.date(2029, 12, 24),
+        dt.date(2029, 12, 31),
+    ]
+    assert occurrences[0]["weekday"] == "Понедельник"
+
+
+async def test_schedule_range_endpoint_expands_recurrences(async_client, db_session):
+    group = models.Group(name="Д-1")
+    db_session.add(group)
+    await db_session.flush()
+    db_session.add_all(
+        [
+            models.Schedule(
+                group_id=group.id,
+                subject="Матанализ",
+                weekday="Понедельник",
+                start_time=MONDAY,
+                end_time=MONDAY + dt.timedelta(minutes=90),
+                repeat_until=dt.date(2025, 12, 31),
+                exception_dates=[dt.date(2025, 9, 8)],
+            ),
+            models.Schedule(
+                group_id=group.id,
+                subject="Консультация",
+                weekday="Среда",
+                start_time=dt.datetime(2025, 9, 10, 15),
+                end_time=dt.datetime(2025, 9, 10, 16),
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    stored = await async_client.get(f"/schedule/{group.id}")
+    assert len(stored.json()) == 2
+
+    response = await async_client.get(
+        f"/schedule/{group.id}", params={"from": "2025-09-01", "to": "2025-09-15"}
+    )
+    assert response.status_code == 200
+    assert [(o["subject"], o["start_time"][:10]) for o in response.json()] == [
+        ("Матанализ", "2025-09-01"),
+        ("Консультация", "2025-09-10"),
+        ("Матанализ", "2025-09-15"),
+    ]
+
+    bad = await async_client.get(f"/schedule/{group.id}", params={"from": "2025-09-01"})
+    assert bad.status_code == 400
+
+
+async def test_reminders_fire_for_recurring_lessons(db_session, user_factory):
+    group = models.Group(name="Е-1")
+    db_session.add(group)
+    await db_session.flush()
+    student = await user_factory(group_id=group.id)
+    local_now = dt.datetime.now(ZoneInfo(settings.schedule_timezone))
+    soon = local_now.replace(tzinfo=None, second=0, microsecond=0)
+    soon += dt.timedelta(minutes=3)
+    first = soon - dt.timedelta(weeks=5)
+    db_session.add(
+        models.Schedule(
+            group_id=group.id,
+            subject="Физика",
+            weekday=WEEKDAYS[first.weekday()],
+            start_time=first,
+            end_time=first + dt.timedelta(minutes=90),
+            repeat_until=(soon + dt.timedelta(weeks=5)).date(),
+        )
+    )
+    await db_session.commit()
+
+    assert await generate_schedule_reminders(db_session) == 1
+    titles = (
+        await db_session.scalars(
+            select(models.Notification.title).where(
+                models.Notification.user_id == student.id
+            )
+        )
+    ).all()
+    assert titles == ["Скоро пара: Физика"]
+
+
+async def test_week_view_is_cached_until_the_group_changes(
+    async_client, db_session, user_factory, query_budget
+):
+    teacher = await user_factory(role="teacher")
+    group = models.Group(name="Ж-1")
+    db_session.add(group)
+    await db_session.flush()
+    lessons = [
+        models.Schedule(
+            group_id=group.id,
+            subject=subject,
+            weekday="Понедельник",
+            parity=parity,
+            start_time=MONDAY,
+            end_time=MONDAY + dt.timedelta(minutes=90),
+            repeat_until=dt.date(2025, 12, 31),
+        )
+        for subject, parity in (("Каждую неделю", "both"), ("По нечётным", "odd"))
+    ]
+    db_session.add_all(lessons)
+    await db_session.commit()
+
+    params = {"date": "2025-09-10"}
+    response = await async_client.get(f"/schedule/{group.id}/week", params=params)
+    week = response.json()
+    assert (week["week_start"], week["week_end"]) == ("2025-09-08", "2025-09-14")
+    assert week["parity"] == "odd"
+    assert [lesson["subject"] for lesson in week["lessons"]] == [
+        "Каждую неделю",
+        "По нечётным",
+    ]
+
+    with query_budget(0):
+        cached = await async_client.get(f"/schedule/{group.id}/week", params=params)
+    assert cached.json() == week
+
+    response = await async_client.patch(
+        f"/schedule/{lessons[1].id}",
+        json={"parity": "even"},
+        headers={"Authorization": f"Bearer {create_access_token(str(teacher.id))}"},
+    )
+    assert response.status_code == 200
+    week = (await async_client.get(f"/schedule/{group.id}/week", params=params)).json()
+    assert [lesson["subject"] for lesson in week["lessons"]] == ["Каждую неделю"]
+
+
+class _LaggingReplica:
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("после записи кеш должен заполняться с основной базы")
+
+
+async def test_schedule_refill_after_a_write_reads_the_primary(db_session):
+    group = models.Group(name="З-1")
+    db_session.add(group)
+    await db_session.flush()
+    db_session.add(
+        models.Schedule(
+            group_id=group.id,
+            subject="Физика",
+            weekday="Понедельник",
+            start_time=MONDAY,
+            end_time=MONDAY + dt.timedelta(minutes=90),
+        )
+    )
+    await db_session.commit()
+    crud.invalidate_schedule(group.id)
+
+    lessons = await crud.get_schedule_by_group(_LaggingReplica(), group.id)
+    assert [lesson["subject"] for lesson in lessons] == ["Физика"]
+
+
+async def test_api_stores_local_times_and_derives_the_weekday(
+    async_client, db_session, user_factory
+):
+    teacher = await user_factory(role="teacher")
+    group = models.Group(name="И-1")
+    db_session.add(group)
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(str(teacher.id))}"}
+
+    created = await async_client.post(
+        "/schedule",
+        json={
+            "group_id": group.id,
+            "subject": "Физика",
+            "weekday": "пн",
+            "start_time": "2025-09-01T06:00:00Z",
+            "end_time": "2025-09-01T07:30:00Z",
+        },
+        headers=headers,
+    )
+    assert created.json()["start_time"] == "2025-09-01T09:00:00"  # как при импорте
+    assert created.json()["weekday"] == "Понедельник"
+
+    updated = await async_client.patch(
+        f"/schedule/{created.json()['id']}",
+        json={"end_time": "2025-09-01T10:00:00+03:00"},
+        headers=headers,
+    )
+    assert updated.json()["end_time"] == "2025-09-01T10:00:00"
+
+    moved = await async_client.patch(
+        f"/schedule/{created.json()['id']}",
+        json={"start_time": "2025-09-03T09:00:00", "end_time": "2025-09-03T10:30:00"},
+        headers=headers,
+    )
+    assert moved.json()["weekday"] == "Среда"
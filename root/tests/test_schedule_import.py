@@ -0,0 +1,227 @@
+import datetime as dt
+import json
+
+import pytest
+from app.auth.security import create_access_token
+from app.models import models
+from sqlalchemy import select
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _auth(user) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+
+def _lesson(group_id: int, day: int, hour: int, **extra) -> dict:
+    start = dt.datetime(2025, 9, day, hour)
+    return {
+        "group_id": group_id,
+        "subject": f"Предмет {day}-{hour}",
+        "start_time": start.isoformat(),
+        "end_time": (start + dt.timedelta(minutes=90)).isoformat(),
+        **extra,
+    }
+
+
+async def _groups(db_session, *names: str) -> list[models.Group]:
+    groups = [models.Group(name=name) for name in names]
+    db_session.add_all(groups)
+    await db_session.commit()
+    return groups
+
+
+async def _lessons(db_session, group_id: int) -> list[models.Schedule]:
+    return (
+        await db_session.scalars(
+            select(models.Schedule)
+            .where(models.Schedule.group_id == group_id)
+            .order_by(models.Schedule.start_time)
+            .execution_options(populate_existing=True)
+        )
+    ).all()
+
+
+async def _post(client, admin, name: str, body: bytes, **data):
+    return await client.post(
+        "/schedule/import",
+        files={"file": (name, body, "application/octet-stream")},
+        data={k: str(v) for k, v in data.items()},
+        headers=_auth(admin),
+    )
+
+
+async def test_json_import_diffs_against_existing_lessons(
+    async_client, user_factory, db_session, query_budget
+):
+    admin = await user_factory(role="admin")
+    first, second = await _groups(db_session, "А-1", "Б-1")
+    lessons = [_lesson(first.id, day, 9) for day in range(1, 6)]
+    lessons += [_lesson(second.id, 1, 9)]
+
+    response = await _post(async_client, admin, "t.json", json.dumps(lessons).encode())
+    assert response.status_code == 200
+    assert response.json()["created"] == 6
+    assert response.json()["groups"] == [first.id, second.id]
+    assert (await _lessons(db_session, first.id))[0].weekday == "Понедельник"
+
+    lessons[0]["room"] = "101"
+    del lessons[1]
+    lessons.append(_lesson(first.id, 8, 11, parity="знаменатель"))
+    with query_budget(10):
+        response = await _post(
+            async_client, admin, "t.json", json.dumps({"lessons": lessons}).encode()
+        )
+    summary = response.json()
+    assert (summary["created"], summary["updated"], summary["deleted"]) == (1, 1, 1)
+    assert summary["unchanged"] == 4
+
+    stored = await _lessons(db_session, first.id)
+    assert [lesson.start_time.day for lesson in stored] == [1, 3, 4, 5, 8]
+    assert stored[0].room == "101"
+    assert stored[-1].parity == "even"
+
+
+async def test_offset_aware_times_are_stored_in_schedule_timezone(
+    async_client, user_factory, db_session
+):
+    admin = await user_factory(role="admin")
+    (group,) = await _groups(db_session, "Г-1")
+    lesson = _lesson(
+        group.id,
+        1,
+        9,
+        start_time="2025-09-01T06:00:00Z",
+        end_time="2025-09-01T07:30:00+00:00",
+    )
+
+    response = await _post(async_client, admin, "t.json", json.dumps([lesson]).encode())
+    assert response.status_code == 200
+    (stored,) = await _lessons(db_session, group.id)
+    assert stored.start_time == dt.datetime(2025, 9, 1, 9)  # Europe/Moscow
+    assert stored.end_time == dt.datetime(2025, 9, 1, 10, 30)
+
+
+async def test_invalid_rows_reject_the_whole_upload(
+    async_client, user_factory, db_session
+):
+    admin = await user_factory(role="admin")
+    (group,) = await _groups(db_session, "В-1")
+    body = json.dumps(
+        [
+            _lesson(group.id, 1, 9),
+            _lesson(group.id, 2, 9, end_time="2025-09-02T08:00:00"),
+            _lesson(group.id, 1, 9),
+            {"group_id": group.id},
+        ]
+    ).encode()
+
+    response = await _post(async_client, admin, "t.json", body)
+    assert response.status_code == 422
+    assert [e["row"] for e in response.json()["detail"]] == [2, 3, 4]
+    assert await _lessons(db_session, group.id) == []
+
+
+async def test_csv_import_only_replaces_the_semester_window(
+    async_client, user_factory, db_session
+):
+    admin = await user_factory(role="admin")
+    (group,) = await _groups(db_session, "ИВТ-21")
+    db_session.add(
+        models.Schedule(
+            group_id=group.id,
+            subject="Прошлый семестр",
+            weekday="Вторник",
+            start_time=dt.datetime(2025, 5, 6, 9),
+            end_time=dt.datetime(2025, 5, 6, 10, 30),
+        )
+    )
+    await db_session.commit()
+    table = (
+        "Группа;Дисциплина;Аудитория;День;Начало;Окончание;Неделя\n"
+        "ивт-21;Матанализ;301;пн;2025-09-01 09:00;2025-09-01 10:30;числитель\n"
+    ).encode("utf-8")
+
+    response = await _post(
+        async_client,
+        admin,
+        "t.csv",
+        table,
+        date_from="2025-09-01",
+        date_to="2025-12-31",
+        dry_run="true",
+    )
+    assert response.json()["created"] == 1
+    assert len(await _lessons(db_session, group.id)) == 1
+
+    response = await _post(
+        async_client,
+        admin,
+        "t.csv",
+        table,
+        date_from="2025-09-01",
+        date_to="2025-12-31",
+    )
+    assert (response.json()["created"], response.json()["deleted"]) == (1, 0)
+    stored = await _lessons(db_session, group.id)
+    assert [(s.subject, s.parity) for s in stored] == [
+        ("Прошлый семестр", "both"),
+        ("Матанализ", "odd"),
+    ]
+
+
+async def test_ics_import_maps_recurrence_and_timezones(
+    async_client, user_factory, db_session
+):
+    admin = await user_factory(role="admin")
+    student = await user_factory()
+    (group,) = await _groups(db_session, "Г-1")
+    calendar = "\r\n".join(
+        [
+            "BEGIN:VCALENDAR",
+            "BEGIN:VEVENT",
+            "SUMMARY:Физика\\, лекция",
+            "LOCATION:Ауд. 5",
+            "DTSTART;TZID=Europe/Moscow:20250902T090000",
+            "DTEND;TZID=Europe/Moscow:20250902T103000",
+            "RRULE:FREQ=WEEKLY;INTERVAL=2;UNTIL=20251223T060000Z",
+            "EXDATE;TZID=Europe/Moscow:20250916T090000,20250930T090000",
+            "BEGIN:VALARM",
+            "SUMMARY:ignored",
+            "END:VALARM",
+            "END:VEVENT",
+            "BEGIN:VEVENT",
+            "SUMMARY:Химия",
+            "ORGANIZER;CN=Иванова И.И.:mailto:ivanova@example.com",
+            "DTSTART:20250903T070000Z",
+            "DTEND:20250903T083000Z",
+            "RRULE:FREQ=WEEKLY",
+            "END:VEVENT",
+            "END:VCALENDAR",
+        ]
+    ).encode()
+
+    response = await _post(async_client, student, "g.ics", calendar, group_id=group.id)
+    assert response.status_code == 403
+
+    response = await _post(async_client, admin, "g.ics", calendar, group_id=group.id)
+    assert response.status_code == 422  # у химии бесконечное повторение
+
+    response = await _post(
+        async_client,
+        admin,
+        "g.ics",
+        calendar,
+        group_id=group.id,
+        date_from="2025-09-01",
+        date_to="2025-12-31",
+    )
+    assert response.status_code == 200, response.text
+    physics, chemistry = await _lessons(db_session, group.id)
+    assert (physics.subject, physics.room) == ("Физика, лекция", "Ауд. 5")
+    assert physics.parity == "even"  # 2 сентября 2025 — 36-я ISO-неделя
+    assert physics.repeat_until == dt.date(2025, 12, 23)
+    assert physics.exception_dates == [dt.date(2025, 9, 16), dt.date(2025, 9, 30)]
+    assert chemistry.start_time == dt.datetime(2025, 9, 3, 10)
+    assert (chemistry.teacher, chemistry.parity) == ("Иванова И.И.", "both")
+    assert chemistry.repeat_until == dt.date(2025, 12, 31)
@@ -0,0 +1,50 @@
+import datetime as dt
+
+import pytest
+from app.auth.security import create_access_token
+from app.core.config import settings
+from app.models import models
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+async def test_trusted_json_matches_validated_responses(
+    async_client, user_factory, db_session, monkeypatch
+):
+    admin = await user_factory(role="admin", full_name="Админ")
+    await user_factory(full_name="Студент", spotify_display_name="DJ")
+    event = models.Event(
+        title="Лекция",
+        starts_at=dt.datetime(2100, 1, 1, 10, 0),
+        ends_at=dt.datetime(2100, 1, 1, 11, 30, 0, 123456),
+        created_by=admin.id,
+    )
+    db_session.add(event)
+    await db_session.flush()
+    db_session.add(models.EventFile(event_id=event.id, file_url="/static/a.pdf"))
+    db_session.add_all(
+        models.Notification(user_id=admin.id, title=f"n{i}", read=i == 0)
+        for i in range(3)
+    )
+    await db_session.commit()
+
+    headers = {"Authorization": f"Bearer {create_access_token(str(admin.id))}"}
+    paths = ["/events", "/users", "/notifications?limit=2"]
+
+    async def fetch_all():
+        out = []
+        for path in paths:
+            response = await async_client.get(path, headers=headers)
+            assert response.status_code == 200, path
+            out.append(response.json())
+        return out
+
+    monkeypatch.setattr(settings, "fast_json_enabled", False)
+    validated = await fetch_all()
+    monkeypatch.setattr(settings, "fast_json_enabled", True)
+    trusted = await fetch_all()
+
+    assert trusted == validated
+    assert validated[0][0]["files"][0]["file_url"] == "/static/a.pdf"
+    assert len(validated[1]["items"]) == 2
+    assert validated[2]["has_more"] is True
@@ -0,0 +1,181 @@
+import asyncio
+import datetime as dt
+
+import httpx
+import pytest
+from app.auth.security import create_access_token
+from app.core import http
+from app.core.database import async_session
+from app.models import models
+from app.schemas.schemas import SpotifyNowPlayingOut
+from app.services.spotify import (
+    NowPlayingCache,
+    PresencePoller,
+    SpotifyRateLimited,
+    ensure_access_token,
+)
+from sqlalchemy import select
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _playing(track_id: str = "t1") -> SpotifyNowPlayingOut:
+    return SpotifyNowPlayingOut(
+        is_playing=True,
+        progress_ms=1000,
+        duration_ms=200000,
+        track_id=track_id,
+        fetched_at=dt.datetime.utcnow(),
+    )
+
+
+async def test_concurrent_requests_share_one_upstream_call():
+    cache = NowPlayingCache(playing_ttl=60, idle_ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return _playing()
+
+    results = await asyncio.gather(*(cache.get(1, loader) for _ in range(10)))
+    assert calls == 1
+    assert {r.track_id for r in results} == {"t1"}
+
+    await cache.get(1, loader)
+    assert calls == 1
+
+
+async def test_rate_limit_serves_stale_and_backs_off():
+    cache = NowPlayingCache(playing_ttl=0, idle_ttl=0)
+    calls = 0
+
+    async def ok():
+        nonlocal calls
+        calls += 1
+        return _playing()
+
+    async def limited():
+        nonlocal calls
+        calls += 1
+        raise SpotifyRateLimited(30)
+
+    await cache.get(1, ok)
+    stale = await cache.get(1, limited)
+    assert stale.track_id == "t1"
+    assert calls == 2
+
+    # пока действует Retry-After, Spotify не вызывается ни для кого
+    assert (await cache.get(1, ok)).track_id == "t1"
+    with pytest.raises(SpotifyRateLimited):
+        await cache.get(2, ok)
+    assert calls == 2
+
+
+async def test_concurrent_token_refresh_hits_spotify_once(user_factory):
+    user = await user_factory(
+        spotify_access_token="old",
+        spotify_refresh_token="refresh",
+        spotify_token_expires_at=dt.datetime(2000, 1, 1),
+    )
+    posts = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal posts
+        posts += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"access_token": "new", "expires_in": 3600})
+
+    http.set_http_client(http.build_http_client(transport=httpx.MockTransport(handler)))
+
+    async def refresh() -> str | None:
+        async with async_session() as db:
+            return await ensure_access_token(db, await db.get(models.User, user.id))
+
+    try:
+        tokens = await asyncio.gather(*(refresh() for _ in range(5)))
+    finally:
+        await http.close_http_client()
+
+    assert tokens == ["new"] * 5
+    assert posts == 1
+
+
+async def test_presence_poller_writes_changes_in_one_tick(user_factory, db_session):
+    users = [
+        await user_factory(
+            spotify_access_token=f"token-{i}",
+            spotify_token_expires_at=dt.datetime(2100, 1, 1),
+            spotify_is_connected=True,
+        )
+        for i in range(3)
+    ]
+    await user_factory(spotify_is_connected=False)
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        token = request.headers["authorization"].removeprefix("Bearer ")
+        calls.append(token)
+        if token == "token-0":
+            return httpx.Response(204)
+        item = {"id": f"track-{token}", "name": "Song", "artists": [{"name": "A"}]}
+        return httpx.Response(200, json={"is_playing": True, "item": item})
+
+    http.set_http_client(http.build_http_client(transport=httpx.MockTransport(handler)))
+    cache = NowPlayingCache(playing_ttl=60, idle_ttl=60)
+    poller = PresencePoller(
+        active_interval=10,
+        idle_interval=60,
+        concurrency=2,
+        rate_per_second=0,
+        batch_size=10,
+        cache=cache,
+    )
+    try:
+        assert await poller.tick() == 3
+        assert sorted(calls) == ["token-0", "token-1", "token-2"]
+        # никто ещё не «созрел» для следующего опроса
+        assert await poller.tick() == 0
+        assert len(calls) == 3
+    finally:
+        await http.close_http_client()
+
+    presence = {
+        p.user_id: p
+        for p in (await db_session.execute(select(models.SpotifyPresence))).scalars()
+    }
+    assert [presence[u.id].is_playing for u in users] == [False, True, True]
+    assert presence[users[1].id].track_id == "track-token-1"
+    assert (await cache.get(users[2].id, None)).track_name == "Song"
+
+
+async def test_callback_stores_tokens_on_the_single_token_model(
+    async_client, user_factory, db_session
+):
+    user = await user_factory()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/token":
+            assert b"grant_type=authorization_code" in request.content
+            return httpx.Response(
+                200,
+                json={"access_token": "a", "refresh_token": "r", "expires_in": 3600},
+            )
+        return httpx.Response(200, json={"id": "sp-user", "display_name": "DJ"})
+
+    http.set_http_client(http.build_http_client(transport=httpx.MockTransport(handler)))
+    state = create_access_token(str(user.id), expires_delta=10)
+    response = await async_client.get(
+        "/spotify/callback",
+        params={"code": "c", "state": state},
+        follow_redirects=False,
+    )
+
+    assert response.status_code == 302
+    assert response.headers["location"].endswith("/profile?spotify=connected")
+    await db_session.refresh(user)
+    assert user.spotify_is_connected
+    assert user.spotify_refresh_token == "r"
+    assert user.spotify_display_name == "DJ"
+    assert user.spotify_token_expires_at > dt.datetime.utcnow()
@@ -0,0 +1,73 @@
+import gzip
+import secrets
+
+import pytest
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+@pytest.fixture
+def static_file():
+    folder = settings.static_dir_path / "event_files"
+    folder.mkdir(parents=True, exist_ok=True)
+    created = []
+
+    def _make(name: str, data: bytes):
+        path = folder / name
+        path.write_bytes(data)
+        created.append(path)
+        return f"/static/event_files/{name}"
+
+    yield _make, created
+    for path in created:
+        path.unlink(missing_ok=True)
+
+
+async def test_randomized_upload_is_immutable_and_revalidates(
+    async_client, static_file
+):
+    make, _ = static_file
+    url = make(f"event_1_{secrets.token_hex(8)}.txt", b"hello world")
+
+    response = await async_client.get(url)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == ("public, max-age=31536000, immutable")
+
+    etag = response.headers["etag"]
+    cached = await async_client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["cache-control"].endswith("immutable")
+
+
+async def test_stable_name_requires_revalidation(async_client, static_file):
+    make, _ = static_file
+    url = make("readme.txt", b"static")
+
+    response = await async_client.get(url)
+    assert response.headers["cache-control"] == "public, no-cache"
+
+
+async def test_precompressed_sibling_and_range(async_client, static_file):
+    make, created = static_file
+    name = f"event_1_{secrets.token_hex(8)}.txt"
+    body = b"0123456789" * 100
+    url = make(name, body)
+    gz_path = created[0].with_name(name + ".gz")
+    gz_path.write_bytes(gzip.compress(body))
+    created.append(gz_path)
+
+    compressed = await async_client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.status_code == 200
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert compressed.content == body
+
+    identity = await async_client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+    partial = await async_client.get(
+        url, headers={"Range": "bytes=0-9", "Accept-Encoding": "gzip"}
+    )
+    assert partial.status_code == 206
+    assert partial.content == b"0123456789"
@@ -0,0 +1,256 @@
+import datetime as dt
+
+import httpx
+import pytest
+from app.api.routes import MAX_IMAGE_SIZE
+from app.auth.security import create_access_token
+from app.models import models
+from app.services.storage import (
+    LocalStorage,
+    PresignNotSupported,
+    S3Storage,
+    StorageError,
+    set_storage,
+)
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+class FakeS3:
+    def __init__(self) -> None:
+        self.objects: dict[str, tuple[bytes, str]] = {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if not request.headers.get("authorization", "").startswith(
+            "AWS4-HMAC-SHA256 Credential=key/"
+        ):
+            return httpx.Response(403)
+        if request.method == "PUT":
+            self.objects[request.url.path] = (
+                request.content,
+                request.headers.get("content-type", ""),
+            )
+            return httpx.Response(200)
+        if request.method == "DELETE":
+            self.objects.pop(request.url.path, None)
+            return httpx.Response(204)
+        if request.method == "HEAD":
+            if request.url.path not in self.objects:
+                return httpx.Response(404)
+            data, content_type = self.objects[request.url.path]
+            return httpx.Response(
+                200,
+                headers={
+                    "content-length": str(len(data)),
+                    "content-type": content_type,
+                },
+            )
+        return httpx.Response(405)
+
+
+@pytest.fixture
+def fake_s3():
+    fake = FakeS3()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake))
+    storage = S3Storage(
+        endpoint_url="http://minio:9000",
+        bucket="uploads",
+        access_key_id="key",
+        secret_access_key="secret",
+        public_base_url="https://cdn.example.com/uploads",
+        client=client,
+    )
+    return fake, storage
+
+
+async def test_s3_storage_put_and_delete(fake_s3):
+    fake, storage = fake_s3
+
+    url = await storage.save("avatars/user_1_avatar_ab.png", b"png", "image/png")
+
+    assert url == "https://cdn.example.com/uploads/avatars/user_1_avatar_ab.png"
+    assert fake.objects["/uploads/avatars/user_1_avatar_ab.png"] == (
+        b"png",
+        "image/png",
+    )
+    assert storage.key_from_url(url) == "avatars/user_1_avatar_ab.png"
+
+    await storage.delete("avatars/user_1_avatar_ab.png")
+    assert fake.objects == {}
+
+
+async def test_s3_presigned_put_is_query_signed(fake_s3):
+    _, storage = fake_s3
+
+    presigned = storage.presign_upload(
+        "covers/c.jpg", "image/jpeg", 1024, expires_in=60
+    )
+
+    url = httpx.URL(presigned.url)
+    assert url.path == "/uploads/covers/c.jpg"
+    assert url.params["X-Amz-Expires"] == "60"
+    assert url.params["X-Amz-SignedHeaders"] == "content-length;content-type;host"
+    assert len(url.params["X-Amz-Signature"]) == 64
+    assert presigned.headers == {"Content-Type": "image/jpeg"}
+
+
+async def test_local_storage_roundtrip(tmp_path):
+    storage = LocalStorage(tmp_path)
+
+    url = await storage.save("news_images/news_1.jpg", b"jpg")
+
+    assert url == "/static/news_images/news_1.jpg"
+    assert (tmp_path / "news_images" / "news_1.jpg").read_bytes() == b"jpg"
+    await storage.delete(storage.key_from_url(url))
+    assert not (tmp_path / "news_images" / "news_1.jpg").exists()
+    with pytest.raises(PresignNotSupported):
+        storage.presign_upload("news_images/x.jpg", "image/jpeg", 3)
+    with pytest.raises(StorageError):
+        await storage.save("../escape.txt", b"")
+
+
+@pytest.fixture
+def s3_uploads(fake_s3):
+    set_storage(fake_s3[1])
+    yield fake_s3
+    set_storage(None)
+
+
+def _auth(user) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+
+async def test_presign_declares_and_limits_the_upload_size(
+    async_client, user_factory, s3_uploads
+):
+    user = await user_factory()
+    body = {"kind": "avatar", "content_type": "image/png", "size": 2048}
+
+    response = await async_client.post(
+        "/uploads/presign", json=body, headers=_auth(user)
+    )
+    assert response.status_code == 200
+    presigned = response.json()
+    assert presigned["key"].startswith(f"avatars/user_{user.id}_avatar_")
+    assert "content-length" in httpx.URL(presigned["url"]).params[
+        "X-Amz-SignedHeaders"
+    ].split(";")
+
+    too_large = {**body, "size": MAX_IMAGE_SIZE + 1}
+    response = await async_client.post(
+        "/uploads/presign", json=too_large, headers=_auth(user)
+    )
+    assert response.status_code == 413
+    response = await async_client.post(
+        "/uploads/presign",
+        json={**body, "content_type": "text/html"},
+        headers=_auth(user),
+    )
+    assert response.status_code == 415
+
+
+async def test_commit_checks_the_uploaded_object(
+    async_client, user_factory, s3_uploads
+):
+    fake, storage = s3_uploads
+    user = await user_factory()
+    avatar = f"avatars/user_{user.id}_avatar_ab.png"
+
+    response = await async_client.post(
+        "/users/me/avatar/commit", json={"key": avatar}, headers=_auth(user)
+    )
+    assert response.status_code == 400  # объект ещё не загружен
+
+    await storage.save(avatar, b"<script>", "text/html")
+    response = await async_client.post(
+        "/users/me/avatar/commit", json={"key": avatar}, headers=_auth(user)
+    )
+    assert response.status_code == 415
+    assert fake.objects == {}
+
+    await storage.save(avatar, b"png", "image/png")
+    response = await async_client.post(
+        "/users/me/avatar/commit", json={"key": avatar}, headers=_auth(user)
+    )
+    assert response.json()["avatar_url"] == storage.public_url(avatar)
+
+    cover = f"covers/user_{user.id}_cover_ab.jpg"
+    await storage.save(cover, b"x" * (MAX_IMAGE_SIZE + 1), "image/jpeg")
+    response = await async_client.post(
+        "/users/me/cover/commit", json={"key": cover}, headers=_auth(user)
+    )
+    assert response.status_code == 413
+    assert f"/uploads/{cover}" not in fake.objects
+
+    response = await async_client.post(
+        "/users/me/cover/commit",
+        json={"key": f"covers/user_{user.id + 1}_cover_ab.jpg"},
+        headers=_auth(user),
+    )
+    assert response.status_code == 400
+
+
+async def test_commit_event_file_accepts_documents(
+    async_client, user_factory, db_session, s3_uploads
+):
+    fake, storage = s3_uploads
+    teacher = await user_factory(role="teacher")
+    event = models.Event(
+        title="Семинар",
+        starts_at=dt.datetime(2025, 10, 1, 18),
+        ends_at=dt.datetime(2025, 10, 1, 20),
+        created_by=teacher.id,
+    )
+    db_session.add(event)
+    await db_session.commit()
+    key = f"event_files/event_{event.id}_slides.pdf"
+    await storage.save(key, b"%PDF", "application/pdf")
+
+    response = await async_client.post(
+        f"/events/{event.id}/files/commit", json={"key": key}, headers=_auth(teacher)
+    )
+    assert response.status_code == 200
+    assert response.json()["file_url"] == storage.public_url(key)
+
+    page = f"event_files/event_{event.id}_page.html"
+    await storage.save(page, b"<script>", "text/html")
+    response = await async_client.post(
+        f"/events/{event.id}/files/commit", json={"key": page}, headers=_auth(teacher)
+    )
+    assert response.status_code == 415
+    assert f"/uploads/{page}" not in fake.objects
+
+
+async def test_event_file_presign_sanitizes_the_key(
+    async_client, user_factory, db_session, s3_uploads
+):
+    teacher = await user_factory(role="teacher")
+    event = models.Event(
+        title="Семинар",
+        starts_at=dt.datetime(2025, 10, 1, 18),
+        ends_at=dt.datetime(2025, 10, 1, 20),
+        created_by=teacher.id,
+    )
+    db_session.add(event)
+    await db_session.commit()
+    body = {"kind": "event_file", "event_id": event.id, "size": 1024}
+
+    keys = []
+    for filename in ("Слайды.PDF", "a./../x", "a.x/y", "README"):
+        response = await async_client.post(
+            "/uploads/presign",
+            json={**body, "filename": filename, "content_type": "application/pdf"},
+            headers=_auth(teacher),
+        )
+        assert response.status_code == 200
+        keys.append(response.json()["key"])
+    prefix = f"event_files/event_{event.id}_"
+    assert all(key.startswith(prefix) and key.count("/") == 1 for key in keys)
+    assert [key.rsplit(".", 1)[1] for key in keys] == ["pdf", "bin", "bin", "bin"]
+
+    response = await async_client.post(
+        "/uploads/presign",
+        json={**body, "filename": "x.html", "content_type": "text/html"},
+        headers=_auth(teacher),
+    )
+    assert response.status_code == 415
@@ -0,0 +1,168 @@
+import pytest
+from app.auth.security import create_access_token, verify_password
+from app.core.config import settings
+from app.models import models
+from sqlalchemy import func, select
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _auth(user) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+
+def _upload(text: str, name: str = "students.csv") -> dict:
+    return {"file": (name, text.encode("utf-8-sig"), "text/csv")}
+
+
+async def _group(db_session, name: str) -> models.Group:
+    group = models.Group(name=name)
+    db_session.add(group)
+    await db_session.commit()
+    return group
+
+
+async def test_import_creates_users_and_reports_bad_rows(
+    async_client, user_factory, db_session, monkeypatch
+):
+    monkeypatch.setattr(settings, "user_import_batch_size", 2)
+    admin = await user_factory(role="admin")
+    group = await _group(db_session, "ИВТ-21")
+    table = (
+        "ФИО;E-mail;Группа;Роль\n"
+        "Иванов Иван;Ivanov@example.com;ивт-21;студент\n"
+        "Петров Пётр;petrov@example.com;ИВТ-21;\n"
+        "Без почты;not-an-email;ИВТ-21;\n"
+        "Сидоров;sidorov@example.com;Нет такой;\n"
+        "Иванов Иван;ivanov@example.com;ИВТ-21;\n"
+        ";;;\n"
+        "Смирнова Анна;smirnova@example.com;;admin\n"
+        "Кузнецова Ольга;kuznetsova@example.com;;преподаватель\n"
+    )
+
+    response = await async_client.post(
+        "/users/import", files=_upload(table), headers=_auth(admin)
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["skipped"]) == (3, 0)
+    assert result["activation_sent"] == 3
+    assert [(e["row"], e["key"]) for e in result["errors"]] == [
+        (4, "not-an-email"),
+        (5, "sidorov@example.com"),
+        (6, "ivanov@example.com"),
+        (8, "smirnova@example.com"),
+    ]
+
+    users = {
+        u.email: u
+        for u in (
+            await db_session.scalars(
+                select(models.User).where(models.User.id != admin.id)
+            )
+        )
+    }
+    assert set(users) == {
+        "ivanov@example.com",
+        "petrov@example.com",
+        "kuznetsova@example.com",
+    }
+    assert users["ivanov@example.com"].group_id == group.id
+    assert users["kuznetsova@example.com"].role == "teacher"
+    # до активации войти нельзя ни с каким паролем
+    assert not verify_password("", users["ivanov@example.com"].hashed_password)
+
+    tokens = await db_session.scalar(select(func.count(models.PasswordResetToken.id)))
+    mails = (
+        await db_session.scalars(
+            select(models.MailOutbox.kind).where(
+                models.MailOutbox.to_email == "petrov@example.com"
+            )
+        )
+    ).all()
+    assert tokens == 3
+    assert mails == ["account_activation"]
+
+
+async def test_import_skips_or_updates_existing_users(
+    async_client, user_factory, db_session
+):
+    admin = await user_factory(role="admin")
+    group = await _group(db_session, "ЭК-11")
+    existing = await user_factory(
+        email="Known@example.com", full_name="Старое имя", role="teacher"
+    )
+    table = "email,full_name,group\nknown@example.com,Новое имя,ЭК-11\n"
+
+    response = await async_client.post(
+        "/users/import", files=_upload(table), headers=_auth(admin)
+    )
+    assert (response.json()["created"], response.json()["skipped"]) == (0, 1)
+
+    response = await async_client.post(
+        "/users/import",
+        files=_upload(table),
+        data={"update_existing": "true", "dry_run": "true"},
+        headers=_auth(admin),
+    )
+    assert response.json()["updated"] == 1
+    await db_session.refresh(existing)
+    assert existing.full_name == "Старое имя"
+
+    response = await async_client.post(
+        "/users/import",
+        files=_upload(table),
+        data={"update_existing": "true"},
+        headers=_auth(admin),
+    )
+    assert response.json()["updated"] == 1
+    await db_session.refresh(existing)
+    assert (existing.full_name, existing.group_id) == ("Новое имя", group.id)
+    # колонки роли в файле нет — роль не трогаем
+    assert existing.role == "teacher"
+
+
+async def test_import_requires_admin_and_a_table(async_client, user_factory):
+    student = await user_factory()
+    admin = await user_factory(role="admin")
+
+    response = await async_client.post(
+        "/users/import", files=_upload("email\n"), headers=_auth(student)
+    )
+    assert response.status_code == 403
+
+    response = await async_client.post(
+        "/users/import", files=_upload("email\n", "users.pdf"), headers=_auth(admin)
+    )
+    assert response.status_code == 400
+
+
+async def test_unreadable_tail_keeps_the_applied_batches(
+    async_client, user_factory, db_session, monkeypatch
+):
+    monkeypatch.setattr(settings, "user_import_batch_size", 1)
+    admin = await user_factory(role="admin")
+    head = "ФИО;E-mail\nИванов Иван;ivanov@example.com\n" + ";\n" * 5000
+    body = head.encode("utf-8") + "Петров;petrov@example.com\n".encode("cp1251")
+
+    response = await async_client.post(
+        "/users/import",
+        files={"file": ("students.csv", body, "text/csv")},
+        headers=_auth(admin),
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 1
+    (error,) = result["errors"]
+    assert "UTF-8" in error["error"]
+    emails = await db_session.scalars(
+        select(models.User.email).where(models.User.id != admin.id)
+    )
+    assert emails.all() == ["ivanov@example.com"]
+
+    response = await async_client.post(
+        "/users/import",
+        files={"file": ("students.csv", "email\nх@example.com\n".encode("cp1251"))},
+        headers=_auth(admin),
+    )
+    assert response.status_code == 400
@@ -0,0 +1,83 @@
+import base64
+
+import pytest
+from app.auth.security import create_access_token
+from app.models import models
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+async def _walk(client, headers, query: str) -> list[dict]:
+    items, cursor = [], None
+    while True:
+        url = f"/users?limit=3&{query}" + (f"&cursor={cursor}" if cursor else "")
+        response = await client.get(url, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 3
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+async def test_users_directory_pages_by_keyset(async_client, user_factory):
+    admin = await user_factory(role="admin", full_name="Админов Админ")
+    names = ["Борисова", "Алексеев", None, "Волков", "Алексеев", "Глебова"]
+    for name in names:
+        await user_factory(full_name=name)
+    headers = {"Authorization": f"Bearer {create_access_token(str(admin.id))}"}
+
+    ascending = await _walk(async_client, headers, "sort=full_name")
+    expected = sorted([admin.full_name, *names], key=lambda n: n or "")
+    assert [u["full_name"] for u in ascending] == expected
+    # одинаковые ФИО разводятся по id и не теряются на границе страниц
+    assert len({u["id"] for u in ascending}) == 7
+
+    descending = await _walk(async_client, headers, "sort=full_name&order=desc")
+    assert [u["id"] for u in descending] == [u["id"] for u in reversed(ascending)]
+
+    by_email = await _walk(async_client, headers, "sort=email")
+    assert [u["email"] for u in by_email] == sorted(u["email"] for u in ascending)
+
+    first = (await async_client.get("/users?limit=3", headers=headers)).json()
+    assert first["total"] == 7
+
+
+async def test_users_directory_search_and_cached_total(
+    async_client, user_factory, db_session
+):
+    admin = await user_factory(role="admin", email="boss@example.com")
+    await user_factory(full_name="Иванов", email="ivanov@example.com")
+    await user_factory(full_name="Петров", email="petrov@uni.example")
+    headers = {"Authorization": f"Bearer {create_access_token(str(admin.id))}"}
+
+    page = (await async_client.get("/users?search=uni.ex", headers=headers)).json()
+    assert [u["full_name"] for u in page["items"]] == ["Петров"]
+    assert page["total"] == 1
+
+    page = (await async_client.get("/users", headers=headers)).json()
+    assert page["total"] == 3
+    db_session.add(models.User(email="late@example.com", hashed_password="x"))
+    await db_session.commit()
+    # счётчик берётся из кеша, а сама страница — всегда свежая
+    page = (await async_client.get("/users", headers=headers)).json()
+    assert page["total"] == 3
+    assert len(page["items"]) == 4
+
+    bad = await async_client.get("/users?cursor=%%%", headers=headers)
+    assert bad.status_code == 400
+
+    by_email = (
+        await async_client.get("/users?limit=1&sort=email", headers=headers)
+    ).json()["next_cursor"]
+    crafted = base64.urlsafe_b64encode(b'["full_name",{"a":1},1]').decode()
+    for cursor, sort in (
+        (by_email, "full_name"),
+        (by_email, "id"),
+        (crafted, "full_name"),
+    ):
+        bad = await async_client.get(
+            f"/users?cursor={cursor}&sort={sort}", headers=headers
+        )
+        assert bad.status_code == 400